@@ -13,6 +13,8 @@ const char* THINGSPEAK_SERVER = "https://api.thingspeak.com";
 const char* MQTT_SERVER = "broker.hivemq.com";
 const int   MQTT_PORT = 1883;
 const char* MQTT_TOPIC = "home/trungvu/airquality";
+const char* MQTT_TOPIC_BIN = "home/trungvu/airquality/bin";  // compact binary payload
+#define MQTT_USE_BINARY 0   // 1 = publish binary payload instead of JSON
 
 
 // --- Pins ---
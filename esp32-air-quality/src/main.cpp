@@ -44,6 +44,9 @@ void setup() {
   initSensors();
   delay(1000);
   
+  // New boot ID so the server can tell reboots from redelivered readings
+  initPublishSequence();
+  
   // Connect to WiFi
   display.clearDisplay();
   display.setCursor(0, 0);
@@ -97,7 +100,11 @@ void loop() {
       Serial.println();
       
       // MQTT send (commented out - prepared for future use)
+#if MQTT_USE_BINARY
+      sendToMQTTBinary(temperature, humidity, airValue, dustDensity);
+#else
       sendToMQTT(temperature, humidity, airValue, dustDensity);
+#endif
     } else {
       Serial.println("WiFi disconnected! Attempting to reconnect...");
       connectWiFi();
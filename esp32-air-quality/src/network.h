@@ -14,6 +14,15 @@ WiFiClientSecure secureClient;
 // --- MQTT client (prepared but not activated) ---
 PubSubClient mqttClient(wifiClient);
 
+// --- Publish sequence (lets the server drop redelivered readings) ---
+uint32_t bootId = 0;       // random per boot, set by initPublishSequence()
+uint32_t publishSeq = 0;   // incremented for every new reading
+
+void initPublishSequence() {
+  bootId = esp_random();
+  publishSeq = 0;
+}
+
 // --- Connect to WiFi ---
 bool connectWiFi() {
   Serial.println();
@@ -111,13 +120,55 @@ void sendToMQTT(float temp, float hum, int airVal, float dust) {
     payload += "\"temperature\":" + String(temp, 2) + ",";
     payload += "\"humidity\":" + String(hum, 2) + ",";
     payload += "\"airValue\":" + String(airVal) + ",";
-    payload += "\"dustDensity\":" + String(dust, 2);
+    payload += "\"dustDensity\":" + String(dust, 2) + ",";
+    payload += "\"seq\":" + String(publishSeq) + ",";
+    char bootHex[9];
+    snprintf(bootHex, sizeof(bootHex), "%08x", bootId);
+    payload += "\"bootId\":\"" + String(bootHex) + "\"";
     payload += "}";
     
     mqttClient.publish(MQTT_TOPIC, payload.c_str());
+    publishSeq++;
     Serial.println("Data sent to MQTT");
   }
 }
 
+// --- Compact binary payload (version 2, little-endian, 24 bytes) ---
+// Must match BINARY_V2 in server/app/models/sensor_payload.py
+#pragma pack(push, 1)
+struct SensorPayloadV2 {
+  uint8_t  magic;        // 0xA5
+  uint8_t  version;      // 2
+  uint16_t airValue;
+  float    temperature;
+  float    humidity;
+  float    dustDensity;
+  uint32_t seq;
+  uint32_t bootId;
+};
+#pragma pack(pop)
+
+void sendToMQTTBinary(float temp, float hum, int airVal, float dust) {
+  if (!mqttClient.connected()) {
+    connectMQTT();
+  }
+  
+  if (mqttClient.connected()) {
+    SensorPayloadV2 payload;
+    payload.magic = 0xA5;
+    payload.version = 2;
+    payload.airValue = (uint16_t)constrain(airVal, 0, 65535);
+    payload.temperature = temp;
+    payload.humidity = hum;
+    payload.dustDensity = dust;
+    payload.seq = publishSeq;
+    payload.bootId = bootId;
+    
+    mqttClient.publish(MQTT_TOPIC_BIN, (const uint8_t*)&payload, sizeof(payload));
+    publishSeq++;
+    Serial.println("Binary data sent to MQTT");
+  }
+}
+
 
 #endif
@@ -0,0 +1,183 @@
+"""
+Cold archive job
+Copies completed days of raw readings into the cold archive before raw retention removes them
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.config import settings
+from app.database.mongo_client import db, retention_days
+from app.utils.cold_archive import ARCHIVE_COLUMNS, ColdArchive, EPOCH, cold_archive, day_start
+
+logger = logging.getLogger(__name__)
+
+# Readings fetched per MongoDB batch while archiving a station-day
+ARCHIVE_BATCH_SIZE = 5000
+
+# Days before the watermark checked for late readings (spool replays, imports) on every run
+LATE_READING_DAYS = 7
+
+
+class ReadingArchiver:
+    """
+    Background job that archives each completed day once
+
+    Days before the archive watermark are served from the archive by
+    get_history/iter_history, so a day is only archived once it is
+    `after_days` old and most late readings (spool replays) have arrived.
+    Readings stored for an archived day later are found by comparing
+    per-day counts and merged into the archived day.
+    """
+
+    def __init__(self, archive: ColdArchive, after_days: int = 1, interval: float = 3600.0):
+        self.archive = archive
+        self.after_days = after_days
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        # Every completed day old enough is archived; raw readings may expire
+        self.caught_up = False
+        self.stats = {
+            "runs": 0,
+            "days_archived": 0,
+            "days_rearchived": 0,
+            "late_readings": 0,
+            "errors": 0,
+            "last_duration_seconds": None
+        }
+
+        raw_days = retention_days("raw")
+        if raw_days and after_days + 1 >= raw_days:
+            logger.warning(
+                f"ARCHIVE_AFTER_DAYS={after_days} leaves no margin before RETENTION_RAW_DAYS={raw_days}, "
+                "readings may expire before they are archived"
+            )
+
+    def start(self):
+        """Start the archive task"""
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Cold archive started (every {self.interval:.0f}s, into '{self.archive.directory}')")
+
+    async def stop(self):
+        """Stop the archive task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Archive, then wait for the next interval"""
+        while True:
+            try:
+                await self.archive_days()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error archiving readings: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def archive_days(self):
+        """Archive every completed day after the watermark"""
+        started = time.perf_counter()
+        until = day_start(datetime.utcnow()) - timedelta(days=self.after_days)
+
+        day = self.archive.archived_until
+        if day is None:
+            # First run: from the oldest raw reading still stored
+            oldest = await db.readings().find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+            if not oldest:
+                return
+            day = day_start(oldest["timestamp"])
+
+        if day < until:
+            station_ids = await db.get_station_ids()
+            while day < until:
+                # A failure raises before the watermark moves, the day is retried on the next run
+                for station_id in station_ids:
+                    await self.archive_station_day(station_id, day)
+                day += timedelta(days=1)
+                self.archive.set_archived_until(day)
+                self.stats["days_archived"] += 1
+
+        await self.archive_late_readings()
+
+        if not self.caught_up:
+            self.caught_up = True
+            # Without rollups, no compaction job applies the raw retention
+            if not settings.rollup_enabled:
+                await db.ensure_raw_ttl()
+        self.stats["runs"] += 1
+        self.stats["last_duration_seconds"] = round(time.perf_counter() - started, 3)
+
+    async def archive_late_readings(self):
+        """Merge readings stored after their day was archived into the archive"""
+        archived_until = self.archive.archived_until
+        if archived_until is None:
+            return
+
+        start = archived_until - timedelta(days=LATE_READING_DAYS)
+        raw_days = retention_days("raw")
+        if raw_days:
+            # Days the raw TTL has started on hold fewer readings than their archive
+            start = max(start, day_start(datetime.utcnow()) - timedelta(days=raw_days - 1))
+        if start >= archived_until:
+            return
+
+        cursor = db.readings().aggregate([
+            {"$match": {"timestamp": {"$gte": start, "$lt": archived_until}}},
+            {"$group": {
+                "_id": {"station_id": "$station_id", "day": {"$dateTrunc": {"date": "$timestamp", "unit": "day"}}},
+                "count": {"$sum": 1}
+            }}
+        ])
+        async for row in cursor:
+            station_id, day = row["_id"]["station_id"], row["_id"]["day"]
+            if row["count"] > await asyncio.to_thread(self.archive.day_count, station_id, day):
+                added = await self.archive_station_day(station_id, day)
+                if added:
+                    self.stats["days_rearchived"] += 1
+                    self.stats["late_readings"] += added
+                    logger.info(f"Archived {added} late readings for {station_id} on {day:%Y-%m-%d}")
+
+    async def archive_station_day(self, station_id: str, day: datetime) -> int:
+        """
+        Copy one station-day from MongoDB into the archive, returns the readings added
+        Readings the archive already holds for the day (late arrivals, imports) are kept
+        """
+        # Straight from MongoDB: iter_history would serve an archived day from the archive
+        cursor = db.readings().find(
+            {"station_id": station_id, "timestamp": {"$gte": day, "$lt": day + timedelta(days=1)}},
+            {"_id": 0, **{name: 1 for name in ARCHIVE_COLUMNS}},
+            sort=[("timestamp", 1)]
+        ).batch_size(ARCHIVE_BATCH_SIZE)
+
+        columns = {name: [] for name in ARCHIVE_COLUMNS}
+        async for reading in cursor:
+            for name, values in columns.items():
+                if name == "timestamp":
+                    values.append((reading["timestamp"] - EPOCH).total_seconds())
+                else:
+                    values.append(reading.get(name) or 0)
+
+        if not columns["timestamp"]:
+            return 0
+        return len(await asyncio.to_thread(self.archive.merge_day, station_id, day, columns))
+
+    def get_stats(self) -> Dict:
+        """Archive progress"""
+        return {
+            **self.stats,
+            **self.archive.get_stats(),
+            "caught_up": self.caught_up
+        }
+
+
+# Global instance, None when archiving is disabled
+reading_archiver = (
+    ReadingArchiver(cold_archive, settings.archive_after_days, settings.archive_interval_minutes * 60)
+    if cold_archive is not None else None
+)
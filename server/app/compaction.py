@@ -0,0 +1,125 @@
+"""
+Rollup compaction for tiered retention
+Recomputes rollups from raw readings for completed hours, well before the raw TTL removes them
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.config import settings
+from app.archiver import reading_archiver
+from app.database.mongo_client import db, rollup_bucket
+
+logger = logging.getLogger(__name__)
+
+# Watermark document in the 'compaction' collection
+COMPACTION_ID = "rollups"
+
+# Minimum age of a completed hour before it is compacted
+COMPACTION_LAG = timedelta(minutes=5)
+
+# Hours compacted per aggregation, keeps each $merge small
+COMPACTION_CHUNK = timedelta(hours=6)
+
+
+class RollupCompactor:
+    """
+    Background job that makes the rollups exact for every completed hour
+
+    Rollups are updated incrementally on ingest; compaction recomputes them
+    from raw readings, so readings missed by the incremental path (crashes,
+    rollups disabled, imports) are included before raw retention expires.
+    Progress is kept as a watermark so each hour is compacted once.
+    """
+
+    def __init__(self, interval: float = 600.0):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.compacted_until: Optional[datetime] = None
+        self.stats = {
+            "runs": 0,
+            "hours_compacted": 0,
+            "errors": 0,
+            "last_duration_seconds": None
+        }
+
+    def start(self):
+        """Start the compaction task"""
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Rollup compaction started (every {self.interval:.0f}s)")
+
+    async def stop(self):
+        """Stop the compaction task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        """Compact, then wait for the next interval"""
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Error compacting rollups: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def compact(self):
+        """Rebuild rollups for completed hours after the watermark"""
+        started = time.perf_counter()
+        # Leave the current hour (and batches still being flushed) to the incremental updates
+        until = rollup_bucket(datetime.utcnow() - COMPACTION_LAG, "1h")
+
+        state = await db.db.compaction.find_one({"_id": COMPACTION_ID})
+        start = state["compacted_until"] if state else None
+        if start is None:
+            # First run: from the oldest raw reading still stored
+            oldest = await db.readings().find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+            if not oldest:
+                return
+            start = rollup_bucket(oldest["timestamp"], "1h")
+        else:
+            # Hours whose raw readings started to expire (e.g. server down for days) keep their rollups
+            raw_start = await db.complete_raw_start()
+            if raw_start and start < raw_start:
+                logger.warning(f"Rollup compaction skipped {start} - {raw_start}, raw readings already expired")
+                start = raw_start
+
+        while start < until:
+            end = min(start + COMPACTION_CHUNK, until)
+            await db.rebuild_rollups(start, end)
+            await db.db.compaction.update_one(
+                {"_id": COMPACTION_ID},
+                {"$set": {"compacted_until": end, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            self.stats["hours_compacted"] += int((end - start) / timedelta(hours=1))
+            start = end
+
+        self.compacted_until = start
+
+        # Every older hour is rolled up (and archived), raw readings may expire from now on
+        if reading_archiver is None or reading_archiver.caught_up:
+            await db.ensure_raw_ttl()
+        self.stats["runs"] += 1
+        self.stats["last_duration_seconds"] = round(time.perf_counter() - started, 3)
+
+    def get_stats(self) -> Dict:
+        """Compaction progress"""
+        return {
+            **self.stats,
+            "compacted_until": self.compacted_until
+        }
+
+
+# Global instance, None when rollups are disabled
+rollup_compactor = (
+    RollupCompactor(interval=settings.compaction_interval_minutes * 60)
+    if settings.rollup_enabled else None
+)
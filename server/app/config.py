@@ -9,14 +9,87 @@ class Settings(BaseSettings):
     # MongoDB
     mongodb_url: str = "mongodb://localhost:27017"
     mongodb_db_name: str = "air_quality_db"
+    # standard: plain 'sensor_readings' collection
+    # timeseries: native time-series collection (MongoDB 5.0+), see migrate_timeseries.py
+    sensor_storage: str = "standard"
+    sensor_timeseries_collection: str = "sensor_readings_ts"
+    # 1-minute / 1-hour rollups, updated on ingest and used for long ranges
+    rollup_enabled: bool = True
+    rollup_min_hours: int = 6
+    
+    # Retention tiers in days, 0 keeps data forever
+    retention_raw_days: int = 7
+    retention_1m_days: int = 90
+    retention_1h_days: int = 0
+    compaction_interval_minutes: int = 10
+    
+    # Cold archive: completed days of readings as per-station NumPy column files,
+    # written once a day is archive_after_days old (keep below retention_raw_days)
+    archive_enabled: bool = False
+    archive_dir: str = "archive"
+    archive_after_days: int = 1
+    archive_interval_minutes: int = 60
     
     # MQTT
     mqtt_broker: str = "broker.hivemq.com"
     mqtt_port: int = 1883
     mqtt_topic: str = "home/trungvu/airquality"
+    # Optional parallel topic for the compact binary payload format
+    mqtt_binary_topic: Optional[str] = None
     mqtt_client_id: str = "server_listener"
+    # Set to join an MQTT v5 shared subscription group ($share/<group>/<topic>);
+    # each process then gets a unique client ID and a disjoint slice of readings
+    mqtt_shared_group: Optional[str] = None
+    mqtt_mode: str = "thread"  # thread (paho loop_start) | asyncio (aiomqtt)
+    mqtt_reconnect_min_seconds: float = 1.0
+    mqtt_reconnect_max_seconds: float = 60.0
+    
+    # Ingest pipeline (one queue per station, drained by a fixed pool of batch writers)
+    ingest_max_stations: int = 1000
+    ingest_queue_size: int = 10000
+    ingest_batch_size: int = 500
+    # Readings taken from one station per round-robin pass while filling a batch
+    ingest_station_batch_size: int = 100
+    ingest_writers: int = 2
+    ingest_flush_interval_seconds: float = 1.0
+    ingest_overflow_policy: str = "drop_oldest"  # drop_oldest | drop_newest | block | spool
+    
+    # Readings kept in memory per station for prediction and short-range stats
+    # (12 hours at the ESP32's 2-second loop)
+    ring_buffer_capacity: int = 21600
+    
+    # Latest reading cache: with a shared subscription, cached readings are
+    # re-read from MongoDB after this long because other processes store them too;
+    # stations found without readings are also remembered this long
+    latest_cache_ttl_seconds: float = 2.0
+    
+    # /data/history and /data/stats results shared by identical requests within
+    # the same time bucket; size is bounded by the number of cached readings
+    query_cache_bucket_seconds: float = 30.0
+    query_cache_max_readings: int = 500000
+    
+    # Keep the device registry in sync with writes from other processes through
+    # a MongoDB change stream (requires a replica set, e.g. MongoDB Atlas)
+    device_change_stream: bool = False
+    
+    # Duplicate detection
+    dedup_window_size: int = 100000
+    # Unsequenced readings with identical content count as duplicates only within this window,
+    # kept well below the ESP32's 2 s publish period so unchanged consecutive readings are kept
+    dedup_hash_window_seconds: float = 0.5
+    
+    # Ingest spool (on-disk buffer while MongoDB is slow or down)
+    spool_enabled: bool = True
+    spool_dir: str = "spool"
+    spool_max_bytes: int = 512 * 1024 * 1024
+    spool_segment_bytes: int = 8 * 1024 * 1024
+    spool_fsync: str = "interval"  # always | interval | never
+    spool_fsync_interval_seconds: float = 1.0
+    spool_replay_interval_seconds: float = 5.0
+    spool_replay_batch_size: int = 1000
     
     # Station
+    # Default station for readings whose topic/payload do not name one
     station_id: str = "station_01"
     
     # Alert
@@ -31,7 +104,8 @@ class Settings(BaseSettings):
     
     # Prediction
     prediction_interval_minutes: int = 30
-    history_hours_for_training: int = 168  # 7 days
+    # 7 days; beyond retention_raw_days training uses the cold archive or rollup averages
+    history_hours_for_training: int = 168
     
     class Config:
         env_file = ".env"
@@ -2,15 +2,132 @@
 MongoDB client and database operations
 """
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import DESCENDING
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from bson import ObjectId
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Sequence, Tuple
+import asyncio
 import logging
 
 from app.config import settings
+from app.utils.cold_archive import cold_archive, day_start
 
 logger = logging.getLogger(__name__)
 
+# Reading fields summarised in the rollup collections
+ROLLUP_FIELDS = ("temperature", "humidity", "air_value", "dust_density", "aqi")
+
+# Fields summarised by /data/stats
+STAT_FIELDS = ROLLUP_FIELDS
+
+# Statistics available from /data/stats -> $group accumulator
+STAT_AGGREGATES = {
+    "min": "$min",
+    "max": "$max",
+    "avg": "$avg",
+    "stddev": "$stdDevPop"
+}
+DEFAULT_STAT_AGGREGATES = ("min", "max", "avg")
+
+# Rollup resolution -> (collection, $dateTrunc unit)
+ROLLUP_RESOLUTIONS = {
+    "1m": ("sensor_rollups_1m", "minute"),
+    "1h": ("sensor_rollups_1h", "hour")
+}
+
+# Longest range served from 1-minute rollups before switching to hourly ones
+MAX_1M_TIER_HOURS = 48
+
+
+def retention_days(tier: str) -> int:
+    """Configured retention of a tier (raw, 1m, 1h) in days, 0 means forever"""
+    return {
+        "raw": settings.retention_raw_days,
+        "1m": settings.retention_1m_days,
+        "1h": settings.retention_1h_days
+    }[tier]
+
+
+def tier_holds(tier: str, start_time: datetime) -> bool:
+    """Whether a tier still keeps data from start_time"""
+    days = retention_days(tier)
+    return days <= 0 or start_time >= datetime.utcnow() - timedelta(days=days)
+
+
+def select_history_tier(hours: int) -> str:
+    """Cheapest tier that still has the whole range at a useful resolution"""
+    start_time = datetime.utcnow() - timedelta(hours=hours)
+    if not settings.rollup_enabled:
+        return "raw"
+    if hours < settings.rollup_min_hours and tier_holds("raw", start_time):
+        return "raw"
+    if hours <= MAX_1M_TIER_HOURS and tier_holds("1m", start_time):
+        return "1m"
+    return "1h"
+
+
+def archive_boundary(start_time: datetime) -> Optional[datetime]:
+    """End of the cold archive if it holds the start of a range, None otherwise"""
+    if cold_archive is None or cold_archive.archived_until is None:
+        return None
+    if start_time >= cold_archive.archived_until:
+        return None
+    return cold_archive.archived_until
+
+
+def projection(fields: Optional[Sequence[str]]) -> Optional[Dict]:
+    """MongoDB projection for a list of fields, None returns whole documents"""
+    if not fields:
+        return None
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def rollup_pipeline(match: Dict, unit: str, collection: str) -> List[Dict]:
+    """Aggregation that groups raw readings into buckets and merges them into a rollup collection"""
+    group = {
+        "_id": {
+            "station_id": "$station_id",
+            "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}
+        },
+        "count": {"$sum": 1}
+    }
+    project = {
+        "_id": 0,
+        "station_id": "$_id.station_id",
+        "bucket": "$_id.bucket",
+        "count": 1
+    }
+    for field in ROLLUP_FIELDS:
+        value = {"$ifNull": [f"${field}", 0]}
+        group[f"{field}_sum"] = {"$sum": value}
+        group[f"{field}_min"] = {"$min": value}
+        group[f"{field}_max"] = {"$max": value}
+        project[field] = {
+            "sum": f"${field}_sum",
+            "min": f"${field}_min",
+            "max": f"${field}_max"
+        }
+
+    return [
+        {"$match": match},
+        {"$group": group},
+        {"$project": project},
+        {"$merge": {
+            "into": collection,
+            "on": ["station_id", "bucket"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+
+def rollup_bucket(timestamp: datetime, resolution: str) -> datetime:
+    """Start of the rollup bucket holding a timestamp"""
+    if resolution == "1h":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
 
 class MongoDB:
     client: Optional[AsyncIOMotorClient] = None
@@ -41,14 +158,108 @@ class MongoDB:
             cls.client.close()
             logger.info("MongoDB connection closed")
     
+    @classmethod
+    def readings(cls):
+        """Collection holding sensor readings for the configured storage mode"""
+        if settings.sensor_storage == "timeseries":
+            return cls.db[settings.sensor_timeseries_collection]
+        return cls.db.sensor_readings
+    
+    @classmethod
+    async def ensure_timeseries_collection(cls, name: str):
+        """Create the time-series collection for readings if it does not exist"""
+        existing = await cls.db.list_collections(filter={"name": name}).to_list(length=None)
+        if existing:
+            if existing[0].get("type") != "timeseries":
+                logger.error(f"Collection '{name}' exists but is not a time-series collection")
+            return
+        
+        await cls.db.create_collection(
+            name,
+            timeseries={
+                "timeField": "timestamp",
+                "metaField": "station_id",
+                "granularity": "seconds"
+            }
+        )
+        logger.info(f"Created time-series collection '{name}'")
+    
+    @classmethod
+    async def ensure_ttl(cls, collection, field: str, days: int, timeseries: bool = False):
+        """Expire documents `days` after `field`, 0 keeps them forever"""
+        seconds = days * 86400 if days > 0 else None
+        
+        if timeseries:
+            # Time-series collections expire whole buckets through a collection option
+            await cls.db.command({"collMod": collection.name, "expireAfterSeconds": seconds or "off"})
+            return
+        
+        name = f"{field}_ttl"
+        indexes = await collection.index_information()
+        if name not in indexes:
+            if not seconds:
+                return
+            await collection.create_index([(field, 1)], name=name, expireAfterSeconds=seconds)
+        elif not seconds:
+            await collection.drop_index(name)
+            logger.info(f"Retention for '{collection.name}' removed")
+            return
+        elif indexes[name].get("expireAfterSeconds") != seconds:
+            await cls.db.command({
+                "collMod": collection.name,
+                "index": {"name": name, "expireAfterSeconds": seconds}
+            })
+        else:
+            return
+        logger.info(f"Retention for '{collection.name}': {days} days")
+    
+    @classmethod
+    async def ensure_raw_ttl(cls):
+        """Apply the raw readings retention"""
+        await cls.ensure_ttl(cls.readings(), "timestamp", retention_days("raw"),
+                             timeseries=settings.sensor_storage == "timeseries")
+    
     @classmethod
     async def create_indexes(cls):
         """Create indexes for better query performance"""
-        # Index for sensor_readings
-        await cls.db.sensor_readings.create_index([
+        if settings.sensor_storage == "timeseries":
+            await cls.ensure_timeseries_collection(settings.sensor_timeseries_collection)
+        
+        # Index for sensor_readings, _id breaks timestamp ties for keyset pagination
+        await cls.readings().create_index([
             ("station_id", 1),
-            ("timestamp", DESCENDING)
+            ("timestamp", DESCENDING),
+            ("_id", DESCENDING)
         ])
+        # The new index serves every query the old (station_id, timestamp) one did
+        try:
+            await cls.readings().drop_index("station_id_1_timestamp_-1")
+            logger.info("Dropped superseded index 'station_id_1_timestamp_-1'")
+        except OperationFailure:
+            pass
+        
+        # Rejects a second copy of a sequenced reading (QoS redelivery, spool replay)
+        # Time-series collections do not support unique indexes
+        if settings.sensor_storage != "timeseries":
+            await cls.readings().create_index(
+                [("station_id", 1), ("dedup_key", 1)],
+                unique=True,
+                partialFilterExpression={"dedup_key": {"$exists": True}}
+            )
+        
+        # One document per station and bucket in each rollup collection
+        for collection, _ in ROLLUP_RESOLUTIONS.values():
+            await cls.db[collection].create_index(
+                [("station_id", 1), ("bucket", 1)],
+                unique=True
+            )
+        
+        # Retention tiers; with rollups or the cold archive, the raw TTL is set by
+        # those jobs once every older reading is rolled up and archived
+        if not settings.rollup_enabled and not settings.archive_enabled:
+            await cls.ensure_raw_ttl()
+        for resolution, (collection, _) in ROLLUP_RESOLUTIONS.items():
+            await cls.ensure_ttl(cls.db[collection], "bucket", retention_days(resolution))
         
         # Index for predictions
         await cls.db.predictions.create_index([
@@ -61,6 +272,8 @@ class MongoDB:
             ("station_id", 1),
             ("device_id", 1)
         ])
+        # Single-device lookups and mutations filter on device_id alone
+        await cls.db.devices.create_index("device_id", unique=True)
         
         logger.info("MongoDB indexes created")
     
@@ -68,21 +281,90 @@ class MongoDB:
     async def insert_sensor_reading(cls, data: Dict) -> str:
         """Insert a sensor reading"""
         try:
-            result = await cls.db.sensor_readings.insert_one(data)
+            result = await cls.readings().insert_one(data)
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Error inserting sensor reading: {e}")
             raise
     
     @classmethod
-    async def get_latest_reading(cls, station_id: str) -> Optional[Dict]:
-        """Get the latest sensor reading for a station"""
+    async def ping(cls) -> bool:
+        """Check that MongoDB answers"""
         try:
-            reading = await cls.db.sensor_readings.find_one(
+            await cls.client.admin.command('ping')
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB ping failed: {e}")
+            return False
+    
+    @classmethod
+    async def insert_sensor_readings(cls, documents: List[Dict], ignore_duplicates: bool = False) -> Tuple[int, List[int]]:
+        """
+        Insert a batch of sensor readings
+        Returns the number inserted and, with ignore_duplicates, the indexes
+        of documents skipped because they were already stored
+        """
+        try:
+            result = await cls.readings().insert_many(documents, ordered=False)
+            return len(result.inserted_ids), []
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            only_duplicates = all(error.get("code") == 11000 for error in write_errors)
+            if ignore_duplicates and only_duplicates and not e.details.get("writeConcernErrors"):
+                return e.details.get("nInserted", 0), [error["index"] for error in write_errors]
+            logger.error(f"Error inserting sensor readings: {len(write_errors)} write errors")
+            raise
+        except Exception as e:
+            logger.error(f"Error inserting sensor readings: {e}")
+            raise
+    
+    @classmethod
+    async def find_stored_readings(cls, documents: List[Dict]) -> List[int]:
+        """
+        Indexes of documents already stored under the same _id or dedup_key
+        Time-series collections enforce neither, so replays check first
+        """
+        if not documents:
+            return []
+
+        timestamps = [document["timestamp"] for document in documents]
+        dedup_keys = [document["dedup_key"] for document in documents if document.get("dedup_key")]
+        matches = [{"_id": {"$in": [document["_id"] for document in documents if "_id" in document]}}]
+        if dedup_keys:
+            matches.append({"dedup_key": {"$in": dedup_keys}})
+
+        # station_id and timestamp let MongoDB skip unrelated buckets
+        cursor = cls.readings().find(
+            {
+                "station_id": {"$in": list({document["station_id"] for document in documents})},
+                "timestamp": {"$gte": min(timestamps), "$lte": max(timestamps)},
+                "$or": matches
+            },
+            {"_id": 1, "station_id": 1, "dedup_key": 1}
+        )
+        stored_ids = set()
+        stored_keys = set()
+        async for stored in cursor:
+            stored_ids.add(stored["_id"])
+            if stored.get("dedup_key"):
+                stored_keys.add((stored["station_id"], stored["dedup_key"]))
+
+        return [
+            index for index, document in enumerate(documents)
+            if document.get("_id") in stored_ids
+            or (document["station_id"], document.get("dedup_key")) in stored_keys
+        ]
+
+    @classmethod
+    async def get_latest_reading(cls, station_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """Get the latest sensor reading for a station, optionally only some fields"""
+        try:
+            reading = await cls.readings().find_one(
                 {"station_id": station_id},
+                projection(fields),
                 sort=[("timestamp", DESCENDING)]
             )
-            if reading:
+            if reading and "_id" in reading:
                 reading["_id"] = str(reading["_id"])
             return reading
         except Exception as e:
@@ -90,30 +372,137 @@ class MongoDB:
             return None
     
     @classmethod
-    async def get_history(cls, station_id: str, hours: int = 24) -> List[Dict]:
-        """Get historical sensor readings"""
+    async def get_history(cls, station_id: str, hours: int = 24, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Get historical sensor readings, optionally only some fields"""
         try:
             start_time = datetime.utcnow() - timedelta(hours=hours)
             
-            cursor = cls.db.sensor_readings.find(
+            # Archived days come from the memory-mapped files, MongoDB serves the rest
+            cold = []
+            boundary = archive_boundary(start_time)
+            if boundary:
+                cold = await asyncio.to_thread(
+                    lambda: cold_archive.documents(cold_archive.read(station_id, start_time, boundary), station_id, fields)
+                )
+                start_time = boundary
+            
+            cursor = cls.readings().find(
                 {
                     "station_id": station_id,
                     "timestamp": {"$gte": start_time}
                 },
+                projection(fields),
                 sort=[("timestamp", DESCENDING)]
             )
             
             readings = await cursor.to_list(length=None)
             
             # Convert ObjectId to string
-            for reading in readings:
-                reading["_id"] = str(reading["_id"])
+            if not fields or "_id" in fields:
+                for reading in readings:
+                    reading["_id"] = str(reading["_id"])
             
+            readings.extend(reversed(cold))
             return readings
         except Exception as e:
             logger.error(f"Error getting history: {e}")
             return []
     
+    @classmethod
+    async def get_history_page(
+        cls,
+        station_id: str,
+        limit: int = 100,
+        before: Optional[Tuple[datetime, ObjectId]] = None
+    ) -> Tuple[List[Dict], Optional[Tuple[datetime, ObjectId]]]:
+        """
+        Get one page of sensor readings, newest first
+        Pages are keyed on (timestamp, _id), so every page costs one index seek
+        Returns the readings and the key to pass as `before` for the next page
+        """
+        query = {"station_id": station_id}
+        if before:
+            timestamp, last_id = before
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$lt": last_id}}
+            ]
+        
+        try:
+            cursor = cls.readings().find(
+                query,
+                sort=[("timestamp", DESCENDING), ("_id", DESCENDING)],
+                limit=limit + 1
+            )
+            readings = await cursor.to_list(length=limit + 1)
+        except Exception as e:
+            logger.error(f"Error getting history page: {e}")
+            return [], None
+        
+        next_key = None
+        if len(readings) > limit:
+            readings = readings[:limit]
+            next_key = (readings[-1]["timestamp"], readings[-1]["_id"])
+        
+        for reading in readings:
+            reading["_id"] = str(reading["_id"])
+        
+        return readings, next_key
+    
+    @classmethod
+    async def iter_history(
+        cls,
+        station_id: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict]]:
+        """Yield sensor readings oldest first, one batch at a time, without loading the whole range"""
+        boundary = archive_boundary(start_time)
+        if boundary:
+            cold_end = min(boundary, end_time) if end_time else boundary
+            # One archived day in memory at a time
+            day = day_start(start_time)
+            while day < cold_end:
+                columns = await asyncio.to_thread(cold_archive.read_day, station_id, day, start_time, cold_end)
+                day += timedelta(days=1)
+                if columns is None:
+                    continue
+                for offset in range(0, len(columns["timestamp"]), batch_size):
+                    yield cold_archive.documents(
+                        {name: column[offset:offset + batch_size] for name, column in columns.items()}, station_id, fields
+                    )
+            if end_time and end_time <= boundary:
+                return
+            start_time = boundary
+        
+        query = {"station_id": station_id, "timestamp": {"$gte": start_time}}
+        if end_time:
+            query["timestamp"]["$lt"] = end_time
+        cursor = cls.readings().find(
+            query,
+            projection(fields) or {"_id": 0},
+            sort=[("timestamp", ASCENDING)]
+        ).batch_size(batch_size)
+        batch = []
+        async for reading in cursor:
+            batch.append(reading)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    @classmethod
+    async def get_station_ids(cls) -> List[str]:
+        """Get IDs of all stations that have sent readings"""
+        try:
+            return sorted(await cls.readings().distinct("station_id"))
+        except Exception as e:
+            logger.error(f"Error getting station IDs: {e}")
+            return []
+    
     @classmethod
     async def insert_prediction(cls, data: Dict) -> str:
         """Insert an AQI prediction"""
@@ -125,14 +514,15 @@ class MongoDB:
             raise
     
     @classmethod
-    async def get_latest_prediction(cls, station_id: str) -> Optional[Dict]:
-        """Get the latest prediction for a station"""
+    async def get_latest_prediction(cls, station_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """Get the latest prediction for a station, optionally only some fields"""
         try:
             prediction = await cls.db.predictions.find_one(
                 {"station_id": station_id},
+                projection(fields),
                 sort=[("prediction_timestamp", DESCENDING)]
             )
-            if prediction:
+            if prediction and "_id" in prediction:
                 prediction["_id"] = str(prediction["_id"])
             return prediction
         except Exception as e:
@@ -140,22 +530,224 @@ class MongoDB:
             return None
     
     @classmethod
-    async def get_training_data(cls, station_id: str, hours: int = 168) -> List[Dict]:
-        """Get historical data for model training"""
-        return await cls.get_history(station_id, hours)
+    async def get_training_data(cls, station_id: str, hours: int = 168, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Get historical data for model training, newest first
+        Raw readings older than the raw retention are only kept by the cold archive;
+        without it, that part of the range is filled with one averaged reading per rollup bucket
+        """
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        if not settings.rollup_enabled or tier_holds("raw", start_time) or archive_boundary(start_time):
+            return await cls.get_history(station_id, hours, fields)
+        
+        readings = await cls.get_history(station_id, retention_days("raw") * 24, fields)
+        oldest = readings[-1]["timestamp"] if readings else datetime.utcnow()
+        
+        resolution = "1m" if tier_holds("1m", start_time) else "1h"
+        values = [field for field in (fields or ROLLUP_FIELDS) if field in ROLLUP_FIELDS]
+        buckets = await cls.get_rollups(station_id, start_time, resolution, fields=values)
+        
+        # Only buckets that end before the oldest raw reading, so no minute is counted twice
+        for bucket in reversed(buckets):
+            if bucket["bucket"] >= rollup_bucket(oldest, resolution):
+                continue
+            reading = {"station_id": station_id, "timestamp": bucket["bucket"]}
+            for field in values:
+                reading[field] = bucket[field]["sum"] / bucket["count"]
+            readings.append(reading)
+        return readings
+    
+    # ==================== Rollups ====================
+    
+    @classmethod
+    async def update_rollups(cls, documents: List[Dict]):
+        """Add stored readings to the 1-minute and 1-hour rollups"""
+        if not documents:
+            return
+        
+        for resolution, (collection, _) in ROLLUP_RESOLUTIONS.items():
+            # Fold the batch per bucket first, usually a single upsert per station
+            buckets: Dict[Tuple[str, datetime], Dict] = {}
+            for document in documents:
+                key = (document["station_id"], rollup_bucket(document["timestamp"], resolution))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = {"count": 0, "sum": {}, "min": {}, "max": {}}
+                bucket["count"] += 1
+                for field in ROLLUP_FIELDS:
+                    value = document.get(field) or 0
+                    bucket["sum"][field] = bucket["sum"].get(field, 0) + value
+                    bucket["min"][field] = min(bucket["min"].get(field, value), value)
+                    bucket["max"][field] = max(bucket["max"].get(field, value), value)
+            
+            operations = []
+            for (station_id, start), bucket in buckets.items():
+                update = {
+                    "$inc": {"count": bucket["count"]},
+                    "$min": {},
+                    "$max": {}
+                }
+                for field in ROLLUP_FIELDS:
+                    update["$inc"][f"{field}.sum"] = bucket["sum"][field]
+                    update["$min"][f"{field}.min"] = bucket["min"][field]
+                    update["$max"][f"{field}.max"] = bucket["max"][field]
+                operations.append(UpdateOne({"station_id": station_id, "bucket": start}, update, upsert=True))
+            
+            try:
+                await cls.db[collection].bulk_write(operations, ordered=False)
+            except Exception as e:
+                # Rollups are derived data, backfill_rollups.py rebuilds them
+                logger.error(f"Error updating {resolution} rollups: {e}")
+    
+    @classmethod
+    async def complete_raw_start(cls) -> Optional[datetime]:
+        """
+        First hour whose raw readings are certainly all still stored
+        None if raw readings never expire or there are none
+        """
+        if retention_days("raw") <= 0:
+            return None
+        oldest = await cls.readings().find_one({}, {"timestamp": 1}, sort=[("timestamp", ASCENDING)])
+        if not oldest:
+            return None
+        # The TTL monitor may be halfway through the oldest hour
+        return rollup_bucket(oldest["timestamp"], "1h") + timedelta(hours=1)
+    
+    @classmethod
+    async def rebuild_rollups(cls, start_time: Optional[datetime], end_time: datetime, station_id: Optional[str] = None):
+        """
+        Recompute rollup buckets in [start_time, end_time) from raw readings
+        Times should be hour-aligned; replaces the buckets, so only pass hours
+        whose raw readings have not started to expire (see complete_raw_start)
+        """
+        
+        match = {"timestamp": {"$lt": end_time}}
+        if start_time:
+            match["timestamp"]["$gte"] = start_time
+        if station_id:
+            match["station_id"] = station_id
+        
+        for resolution, (collection, unit) in ROLLUP_RESOLUTIONS.items():
+            cursor = cls.readings().aggregate(rollup_pipeline(match, unit, collection), allowDiskUse=True)
+            await cursor.to_list(length=None)
+    
+    @classmethod
+    async def get_rollups(
+        cls,
+        station_id: str,
+        start_time: datetime,
+        resolution: str = "1h",
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Dict]:
+        """Get rollup buckets for a station from start_time on, oldest first"""
+        collection, _ = ROLLUP_RESOLUTIONS[resolution]
+        try:
+            cursor = cls.db[collection].find(
+                {
+                    "station_id": station_id,
+                    "bucket": {"$gte": rollup_bucket(start_time, resolution)}
+                },
+                projection(("bucket", "count", *fields)) if fields else {"_id": 0},
+                sort=[("bucket", ASCENDING)]
+            )
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error getting rollups: {e}")
+            return []
+    
+    @classmethod
+    async def get_rollup_stats(
+        cls,
+        station_id: str,
+        hours: int = 24,
+        fields: Sequence[str] = ROLLUP_FIELDS,
+        aggregates: Sequence[str] = DEFAULT_STAT_AGGREGATES,
+        resolution: str = "1m"
+    ) -> Optional[Dict]:
+        """Min/max/avg per field over the last hours, summed from rollup buckets"""
+        collection, _ = ROLLUP_RESOLUTIONS[resolution]
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        
+        group = {"_id": None, "count": {"$sum": "$count"}}
+        for field in fields:
+            group[f"{field}_sum"] = {"$sum": f"${field}.sum"}
+            group[f"{field}_min"] = {"$min": f"${field}.min"}
+            group[f"{field}_max"] = {"$max": f"${field}.max"}
+        
+        try:
+            cursor = cls.db[collection].aggregate([
+                {"$match": {
+                    "station_id": station_id,
+                    "bucket": {"$gte": rollup_bucket(start_time, resolution)}
+                }},
+                {"$group": group}
+            ])
+            result = await cursor.to_list(length=1)
+        except Exception as e:
+            logger.error(f"Error getting rollup stats: {e}")
+            return None
+        
+        if not result or not result[0]["count"]:
+            return None
+        
+        totals = result[0]
+        totals.update({f"{field}_avg": totals[f"{field}_sum"] / totals["count"] for field in fields})
+        return {
+            "count": totals["count"],
+            **{field: {aggregate: totals[f"{field}_{aggregate}"] for aggregate in aggregates} for field in fields}
+        }
+    
+    @classmethod
+    async def get_reading_stats(
+        cls,
+        station_id: str,
+        hours: int = 24,
+        fields: Sequence[str] = STAT_FIELDS,
+        aggregates: Sequence[str] = DEFAULT_STAT_AGGREGATES
+    ) -> Optional[Dict]:
+        """Statistics per field over the last hours, computed by MongoDB in one $group"""
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        
+        group = {"_id": None, "count": {"$sum": 1}}
+        for field in fields:
+            for aggregate in aggregates:
+                group[f"{field}_{aggregate}"] = {STAT_AGGREGATES[aggregate]: {"$ifNull": [f"${field}", 0]}}
+        
+        try:
+            cursor = cls.readings().aggregate([
+                {"$match": {
+                    "station_id": station_id,
+                    "timestamp": {"$gte": start_time}
+                }},
+                {"$group": group}
+            ])
+            result = await cursor.to_list(length=1)
+        except Exception as e:
+            logger.error(f"Error getting reading stats: {e}")
+            return None
+        
+        if not result:
+            return None
+        
+        totals = result[0]
+        return {
+            "count": totals["count"],
+            **{field: {aggregate: totals[f"{field}_{aggregate}"] for aggregate in aggregates} for field in fields}
+        }
     
     # ==================== Device Management ====================
     
     @classmethod
-    async def get_devices(cls, station_id: str) -> List[Dict]:
-        """Get all devices for a station"""
+    async def get_devices(cls, station_id: str, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Get all devices for a station, optionally only some fields"""
         try:
-            cursor = cls.db.devices.find({"station_id": station_id})
+            cursor = cls.db.devices.find({"station_id": station_id}, projection(fields))
             devices = await cursor.to_list(length=None)
             
             # Convert ObjectId to string
-            for device in devices:
-                device["_id"] = str(device["_id"])
+            if not fields or "_id" in fields:
+                for device in devices:
+                    device["_id"] = str(device["_id"])
             
             return devices
         except Exception as e:
@@ -163,11 +755,11 @@ class MongoDB:
             return []
     
     @classmethod
-    async def get_device(cls, device_id: str) -> Optional[Dict]:
-        """Get a specific device by device_id"""
+    async def get_device(cls, device_id: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """Get a specific device by device_id, optionally only some fields"""
         try:
-            device = await cls.db.devices.find_one({"device_id": device_id})
-            if device:
+            device = await cls.db.devices.find_one({"device_id": device_id}, projection(fields))
+            if device and "_id" in device:
                 device["_id"] = str(device["_id"])
             return device
         except Exception as e:
@@ -185,24 +777,47 @@ class MongoDB:
             raise
     
     @classmethod
-    async def update_device(cls, device_id: str, update_data: Dict) -> bool:
-        """Update device information"""
+    async def update_device(cls, device_id: str, update_data: Dict) -> Optional[Dict]:
+        """Update device information, returns the updated device or None if it does not exist"""
         try:
             # Add updated_at timestamp
             update_data["updated_at"] = datetime.utcnow()
             
-            result = await cls.db.devices.update_one(
+            return await cls.db.devices.find_one_and_update(
                 {"device_id": device_id},
-                {"$set": update_data}
+                {"$set": update_data},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
             )
-            return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error updating device: {e}")
             raise
     
+    @classmethod
+    async def bulk_update_devices(cls, updates: Sequence[Tuple[Dict, Dict]]) -> Tuple[int, int, List[Dict]]:
+        """
+        Apply (filter, fields) updates in order with one bulk_write
+        Filters on device_id update one device, others every matching device
+        Returns matched and modified counts and the resulting devices
+        """
+        try:
+            now = datetime.utcnow()
+            operations = [
+                (UpdateOne if "device_id" in query else UpdateMany)(query, {"$set": {**fields, "updated_at": now}})
+                for query, fields in updates
+            ]
+            result = await cls.db.devices.bulk_write(operations, ordered=True)
+            
+            cursor = cls.db.devices.find({"$or": [query for query, _ in updates]}, {"_id": 0})
+            devices = await cursor.to_list(length=None)
+            return result.matched_count, result.modified_count, devices
+        except Exception as e:
+            logger.error(f"Error bulk updating devices: {e}")
+            raise
+    
     @classmethod
     async def delete_device(cls, device_id: str) -> bool:
-        """Delete a device"""
+        """Delete a device, returns False if it does not exist"""
         try:
             result = await cls.db.devices.delete_one({"device_id": device_id})
             return result.deleted_count > 0
@@ -211,14 +826,15 @@ class MongoDB:
             raise
     
     @classmethod
-    async def toggle_device(cls, device_id: str, is_on: bool) -> bool:
-        """Toggle device on/off state"""
+    async def toggle_device(cls, device_id: str, is_on: bool) -> Optional[Dict]:
+        """Toggle device on/off state, returns the updated device or None if it does not exist"""
         try:
-            result = await cls.db.devices.update_one(
+            return await cls.db.devices.find_one_and_update(
                 {"device_id": device_id},
-                {"$set": {"is_on": is_on, "updated_at": datetime.utcnow()}}
+                {"$set": {"is_on": is_on, "updated_at": datetime.utcnow()}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
             )
-            return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error toggling device: {e}")
             raise
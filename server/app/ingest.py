@@ -0,0 +1,712 @@
+"""
+Ingest pipeline for sensor readings
+Buffers readings in bounded per-station queues and writes them to MongoDB in batches
+"""
+import asyncio
+import logging
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.database.mongo_client import db
+from app.utils.dedup import DedupWindow
+from app.utils.latest_cache import latest_cache
+from app.utils.ring_buffer import ring_buffers
+from app.utils.query_cache import query_cache
+from app.utils.metrics import metrics
+from app.utils.spool import DiskSpool
+from app.utils.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+# Queue overflow policies
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block", "spool")
+
+# Queue item: (document, MQTT arrival time, enqueue time), times from time.perf_counter()
+QueueItem = Tuple[Dict, Optional[float], float]
+
+
+class SpoolReplayer:
+    """
+    Owns the on-disk spool: readings go there while MongoDB is unavailable
+    and are replayed in bulk once it answers again
+    """
+
+    def __init__(self, spool: DiskSpool, replay_interval: float = 5.0, batch_size: int = 1000):
+        self.spool = spool
+        self.replay_interval = replay_interval
+        self.batch_size = batch_size
+
+        # Cleared when a write fails, new batches then go straight to the spool
+        self.db_available = True
+        self.duplicates = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Open the spool and start the replay task"""
+        self.spool.open()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Ingest spool started in '{self.spool.directory}' (fsync={self.spool.fsync_policy})")
+
+    async def stop(self):
+        """Stop replaying and close the spool, pending segments stay on disk"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.spool.close()
+        logger.info(f"Ingest spool stopped: {self.spool.get_stats()}")
+
+    async def write(self, documents: List[Dict]) -> bool:
+        """Spool readings, returns False if the disk budget is exhausted"""
+        return await self.spool.append(documents)
+
+    async def _run(self):
+        """Periodically fsync and replay the backlog"""
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            try:
+                await self.spool.sync_if_due()
+                if self.spool.has_backlog() or not self.db_available:
+                    await self.replay()
+            except Exception as e:
+                logger.error(f"Error replaying spool: {e}")
+
+    async def replay(self):
+        """Replay sealed segments into MongoDB, oldest first"""
+        if not await db.ping():
+            self.db_available = False
+            return
+
+        if not self.db_available:
+            logger.info("MongoDB reachable again, resuming direct writes")
+        self.db_available = True
+
+        for path in await self.spool.seal():
+            documents = await asyncio.to_thread(lambda: list(self.spool.read_segment(path)))
+
+            for start in range(0, len(documents), self.batch_size):
+                batch = documents[start:start + self.batch_size]
+                try:
+                    skipped = await self._insert(batch)
+                    self.duplicates += len(skipped)
+                except BulkWriteError as e:
+                    # Rejected documents would fail again on every replay
+                    skipped = [error["index"] for error in e.details.get("writeErrors", [])]
+                    logger.error(f"Spool replay: {len(skipped)} readings rejected by MongoDB")
+                except Exception as e:
+                    logger.warning(f"Spool replay interrupted, will retry: {e}")
+                    self.db_available = False
+                    return
+
+                if settings.rollup_enabled:
+                    skipped = set(skipped)
+                    await db.update_rollups([document for index, document in enumerate(batch) if index not in skipped])
+
+            self.spool.remove_segment(path, len(documents))
+            logger.info(f"Replayed {len(documents)} spooled readings from {path}")
+
+    async def _insert(self, batch: List[Dict]) -> List[int]:
+        """Insert a replay batch, returns the indexes of readings already stored"""
+        if settings.sensor_storage != "timeseries":
+            # Documents carry their _id, so already stored ones are skipped
+            _, skipped = await db.insert_sensor_readings(batch, ignore_duplicates=True)
+            return skipped
+
+        # Time-series collections have no unique _id or dedup_key index to reject them
+        stored = set(await db.find_stored_readings(batch))
+        pending = [index for index in range(len(batch)) if index not in stored]
+        if pending:
+            try:
+                await db.insert_sensor_readings([batch[index] for index in pending])
+            except BulkWriteError as e:
+                # Report rejected readings by their index in the whole batch
+                for error in e.details.get("writeErrors", []):
+                    error["index"] = pending[error["index"]]
+                raise
+        return sorted(stored)
+
+    def get_stats(self) -> Dict:
+        """Spool counters plus database availability"""
+        return {
+            **self.spool.get_stats(),
+            "replay_duplicates": self.duplicates,
+            "db_available": self.db_available
+        }
+
+
+class IngestPipeline:
+    """Bounded queue of one station's readings, drained by the station's IngestWriter"""
+
+    def __init__(
+        self,
+        name: str,
+        writer: "IngestWriter",
+        max_queue_size: int = 10000,
+        overflow_policy: str = "drop_oldest",
+        spool: Optional[SpoolReplayer] = None,
+        on_lost: Optional[Callable[[List[Dict]], None]] = None
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy '{overflow_policy}'. Must be one of {OVERFLOW_POLICIES}")
+        if overflow_policy == "spool" and spool is None:
+            raise ValueError("Overflow policy 'spool' requires the ingest spool to be enabled")
+
+        self.name = name
+        self.writer = writer
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = overflow_policy
+        self.spool = spool
+        # Called with accepted readings that were dropped or could not be stored
+        self.on_lost = on_lost
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._stopping = False
+
+        self.stats = {
+            "accepted": 0,
+            "dropped": 0,
+            "written": 0,
+            "failed": 0,
+            "spooled": 0,
+            "duplicates": 0
+        }
+
+    def stop(self):
+        """Stop accepting readings, the writer drains what is queued"""
+        self._stopping = True
+
+    async def put(self, document: Dict, received_at: Optional[float] = None) -> bool:
+        """
+        Queue a reading for storage
+        received_at is the MQTT arrival time, used for latency metrics
+        Returns False if the reading was dropped by the overflow policy
+        """
+        if self._stopping:
+            logger.warning("Ingest pipeline not running, dropping reading")
+            self.stats["dropped"] += 1
+            return False
+
+        item = (document, received_at, time.perf_counter())
+
+        if self.overflow_policy == "block":
+            await self.queue.put(item)
+            self.stats["accepted"] += 1
+            self.writer.notify()
+            return True
+
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if self.overflow_policy == "spool":
+                # Overflow goes to disk and is stored by the replayer later
+                if await self.spool.write([document]):
+                    self.stats["spooled"] += 1
+                    self.stats["accepted"] += 1
+                    return True
+                self.stats["dropped"] += 1
+                return False
+
+            self.stats["dropped"] += 1
+
+            if self.overflow_policy == "drop_newest":
+                logger.warning(f"Ingest queue '{self.name}' full, dropping newest reading")
+                return False
+
+            # drop_oldest: make room for the fresh reading, the queue length stays the same
+            oldest = self.queue.get_nowait()
+            self.queue.task_done()
+            self._lost([oldest[0]])
+            self.queue.put_nowait(item)
+            logger.warning(f"Ingest queue '{self.name}' full, dropped oldest reading")
+            self.stats["accepted"] += 1
+            return True
+
+        self.stats["accepted"] += 1
+        self.writer.notify()
+        return True
+
+    def take(self, limit: int) -> List[QueueItem]:
+        """Remove up to `limit` queued readings, oldest first"""
+        items = []
+        while len(items) < limit and not self.queue.empty():
+            items.append(self.queue.get_nowait())
+            self.queue.task_done()
+        return items
+
+    def _lost(self, documents: List[Dict]):
+        if self.on_lost:
+            self.on_lost(documents)
+
+    def get_stats(self) -> Dict:
+        """Pipeline counters and current queue depth"""
+        return {
+            **self.stats,
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.max_queue_size,
+            "overflow_policy": self.overflow_policy
+        }
+
+
+class IngestWriter:
+    """
+    Batch writer shared by a group of station queues
+
+    Readings are collected round-robin across the stations, at most
+    `station_batch_size` per station and pass, so a chatty station cannot
+    starve the others, and each batch is stored with one multi-station
+    insert_many and one rollup update. A batch is written once
+    `batch_size` readings are queued or `flush_interval` passed since the
+    first one arrived.
+    """
+
+    def __init__(
+        self,
+        name: str = "writer-0",
+        batch_size: int = 500,
+        station_batch_size: int = 100,
+        flush_interval: float = 1.0,
+        spool: Optional[SpoolReplayer] = None
+    ):
+        self.name = name
+        self.batch_size = batch_size
+        self.station_batch_size = station_batch_size
+        self.flush_interval = flush_interval
+        self.spool = spool
+
+        self.pipelines: Dict[str, IngestPipeline] = {}
+        # Readings queued across this writer's stations
+        self.queued = 0
+        self._order: List[IngestPipeline] = []
+        self._next = 0
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.stats = {
+            "batches": 0,
+            "errors": 0
+        }
+
+    def start(self):
+        """Start the batch writer task"""
+        self._ready = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write everything still queued, then stop"""
+        if not self._task:
+            return
+        self._stopping = True
+        self._ready.set()
+        await self._task
+        self._task = None
+        logger.info(f"Ingest {self.name} stopped: {self.stats}")
+
+    def add(self, pipeline: IngestPipeline):
+        """Drain a station's queue from now on"""
+        self.pipelines[pipeline.name] = pipeline
+        self._order.append(pipeline)
+
+    def notify(self):
+        """A reading was queued on one of the stations"""
+        self.queued += 1
+        # Wake up for the first reading (starts the interval) and for a full batch
+        if self.queued == 1 or self.queued >= self.batch_size:
+            self._ready.set()
+
+    async def _run(self):
+        """Collect batches and flush them until stopped and drained"""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.queued:
+                if self._stopping:
+                    break
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            # Fill the batch until it is full or the interval passes
+            deadline = loop.time() + self.flush_interval
+            while self.queued < self.batch_size and not self._stopping:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            items = self._collect()
+            if not items:
+                continue
+            try:
+                await self._flush(items)
+            except Exception as e:
+                # The writer must outlive a bad batch, or every queue it drains fills for good
+                self.stats["errors"] += 1
+                logger.error(f"Error flushing batch of {len(items)} sensor readings in {self.name}: {e}")
+
+    def _collect(self) -> List[QueueItem]:
+        """Up to batch_size readings, round-robin over the stations starting after the last one served"""
+        items: List[QueueItem] = []
+        count = len(self._order)
+        while len(items) < self.batch_size:
+            taken = 0
+            for offset in range(count):
+                pipeline = self._order[(self._next + offset) % count]
+                station_items = pipeline.take(min(self.station_batch_size, self.batch_size - len(items)))
+                items.extend(station_items)
+                taken += len(station_items)
+                if len(items) >= self.batch_size:
+                    break
+            if not taken:
+                break
+        if count:
+            self._next = (self._next + 1) % count
+        # Recount instead of tracking every take, drop_oldest and block
+        self.queued = sum(pipeline.queue.qsize() for pipeline in self._order)
+        return items
+
+    def _count(self, items: List[QueueItem], stat: str):
+        """Add items to a per-station counter"""
+        for document, _, _ in items:
+            pipeline = self.pipelines.get(document["station_id"])
+            if pipeline:
+                pipeline.stats[stat] += 1
+
+    def _lost(self, documents: List[Dict]):
+        for document in documents:
+            pipeline = self.pipelines.get(document["station_id"])
+            if pipeline:
+                pipeline._lost([document])
+
+    async def _flush(self, items: List[QueueItem]):
+        """Write a batch to MongoDB (or the spool) and broadcast the readings"""
+        for _, _, enqueued_at in items:
+            metrics.observe_since("queue_wait", enqueued_at)
+        batch = [document for document, _, _ in items]
+
+        if self.spool and not self.spool.db_available:
+            # Skip the round trip while MongoDB is known to be down
+            await self._spool_batch(items)
+            return
+
+        started = time.perf_counter()
+        try:
+            inserted, duplicates = await db.insert_sensor_readings(batch, ignore_duplicates=True)
+        except BulkWriteError as e:
+            # ordered=False: every document without a write error was stored
+            write_errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in write_errors if error.get("code") != 11000}
+            inserted = e.details.get("nInserted", 0)
+            logger.error(f"{len(failed)} of {len(batch)} sensor readings in {self.name} were not stored")
+            if failed:
+                # Only the failed documents: stored ones would come back as duplicates and miss the rollups
+                failed_items = [items[index] for index in sorted(failed)]
+                if self.spool:
+                    await self._spool_batch(failed_items)
+                else:
+                    self._count(failed_items, "failed")
+                    self._lost([document for document, _, _ in failed_items])
+
+            kept = [index for index in range(len(items)) if index not in failed]
+            position = {index: offset for offset, index in enumerate(kept)}
+            duplicates = [position[error["index"]] for error in write_errors if error.get("code") == 11000]
+            items = [items[index] for index in kept]
+        except Exception as e:
+            logger.error(f"Error storing batch of {len(batch)} sensor readings in {self.name}: {e}")
+            if self.spool:
+                self.spool.db_available = False
+                await self._spool_batch(items)
+            else:
+                self._count(items, "failed")
+                self._lost(batch)
+            return
+        metrics.observe_since("db_insert", started)
+
+        self.stats["batches"] += 1
+        logger.info(f"Stored batch of {inserted} sensor readings in {self.name}")
+
+        if duplicates:
+            # Already stored by another process or a spool replay
+            skipped = set(duplicates)
+            self._count([item for index, item in enumerate(items) if index in skipped], "duplicates")
+            items = [item for index, item in enumerate(items) if index not in skipped]
+        self._count(items, "written")
+
+        if settings.rollup_enabled:
+            started = time.perf_counter()
+            await db.update_rollups([document for document, _, _ in items])
+            metrics.observe_since("rollup_update", started)
+
+        await self._broadcast_all(items)
+
+    async def _spool_batch(self, items: List[QueueItem]):
+        """Keep a batch on disk until MongoDB can take it"""
+        batch = [document for document, _, _ in items]
+
+        started = time.perf_counter()
+        if not await self.spool.write(batch):
+            self._count(items, "failed")
+            self._lost(batch)
+            return
+        metrics.observe_since("spool_write", started)
+
+        self._count(items, "spooled")
+        logger.warning(f"Spooled batch of {len(batch)} sensor readings in {self.name}")
+
+        await self._broadcast_all(items)
+
+    async def _broadcast_all(self, items: List[QueueItem]):
+        """Broadcast stored readings and record their end-to-end latency"""
+        for document, received_at, _ in items:
+            try:
+                latest_cache.update(document)
+                ring_buffers.append(document)
+                query_cache.add_reading(document)
+            except Exception as e:
+                # The reading is stored, the next one brings the caches up to date
+                self.stats["errors"] += 1
+                logger.error(f"Error updating caches for '{document.get('station_id')}': {e}")
+            await self._broadcast(document)
+            metrics.observe_since("end_to_end", received_at)
+
+    async def _broadcast(self, document: Dict):
+        """Send a stored reading to WebSocket clients"""
+        try:
+            # Copy so the stored document keeps its ObjectId / datetime
+            broadcast_data = document.copy()
+
+            if '_id' in broadcast_data:
+                broadcast_data['_id'] = str(broadcast_data['_id'])
+
+            if isinstance(broadcast_data.get('timestamp'), datetime):
+                broadcast_data['timestamp'] = broadcast_data['timestamp'].isoformat()
+
+            await manager.broadcast({
+                "type": "sensor_update",
+                "data": broadcast_data
+            })
+        except Exception as e:
+            logger.error(f"Error broadcasting sensor data: {e}")
+
+
+class StationIngestRouter:
+    """Route readings to one queue per station, drained by a fixed pool of batch writers"""
+
+    def __init__(
+        self,
+        max_stations: int = 1000,
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        station_batch_size: int = 100,
+        writers: int = 2,
+        flush_interval: float = 1.0,
+        overflow_policy: str = "drop_oldest",
+        spool: Optional[SpoolReplayer] = None,
+        dedup_window_size: int = 100000,
+        dedup_hash_window: float = 0.5
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy '{overflow_policy}'. Must be one of {OVERFLOW_POLICIES}")
+        if overflow_policy == "spool" and spool is None:
+            raise ValueError("Overflow policy 'spool' requires the ingest spool to be enabled")
+
+        self.max_stations = max_stations
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.spool = spool
+
+        # A station always goes to the same writer, so its readings stay in order
+        self.writers = [
+            IngestWriter(
+                name=f"writer-{index}",
+                batch_size=batch_size,
+                station_batch_size=station_batch_size,
+                flush_interval=flush_interval,
+                spool=spool
+            )
+            for index in range(max(1, writers))
+        ]
+        self.pipelines: Dict[str, IngestPipeline] = {}
+        self._running = False
+        self.rejected = 0
+
+        self.dedup = DedupWindow(max_size=dedup_window_size)
+        self.dedup_hash_window = dedup_hash_window
+        self.duplicates_dropped = 0
+
+    def start(self):
+        """Accept readings, pipelines are created on the first reading of each station"""
+        if self.spool:
+            self.spool.start()
+        for writer in self.writers:
+            writer.start()
+        self._running = True
+        logger.info(
+            f"Ingest router started (max stations={self.max_stations}, writers={len(self.writers)}, "
+            f"batch={self.batch_size}, interval={self.flush_interval}s, overflow={self.overflow_policy})"
+        )
+
+    async def stop(self):
+        """Stop accepting readings and write everything still queued"""
+        self._running = False
+        for pipeline in self.pipelines.values():
+            pipeline.stop()
+        await asyncio.gather(*(writer.stop() for writer in self.writers))
+
+        # Writers may still spool while draining
+        if self.spool:
+            await self.spool.stop()
+        logger.info(f"Ingest router stopped ({len(self.pipelines)} stations)")
+
+    async def put(self, document: Dict, received_at: Optional[float] = None) -> bool:
+        """Drop duplicates and queue a reading on its station's pipeline"""
+        if self.is_duplicate(document):
+            self.duplicates_dropped += 1
+            logger.debug(f"Dropping duplicate reading for {document['station_id']}")
+            return False
+
+        pipeline = self._get_pipeline(document["station_id"])
+        if pipeline is None:
+            self.rejected += 1
+            return False
+        if not await pipeline.put(document, received_at):
+            return False
+
+        # Only accepted readings: a redelivery of a dropped one must get through
+        key, ttl = self._dedup_key(document)
+        self.dedup.add(key, ttl)
+        return True
+
+    def is_duplicate(self, document: Dict) -> bool:
+        """Check the reading against the recent window"""
+        key, _ = self._dedup_key(document)
+        return self.dedup.contains(key)
+
+    def forget(self, documents: List[Dict]):
+        """Take readings that were dropped or failed to store out of the window"""
+        for document in documents:
+            self.dedup.discard(self._dedup_key(document)[0])
+
+    def _dedup_key(self, document: Dict) -> Tuple[Hashable, Optional[float]]:
+        """
+        Window key and expiry of a reading
+        Sequenced readings are keyed by boot + seq; others by their content,
+        which only counts as a duplicate within a short window because
+        identical consecutive readings are normal
+        """
+        station_id = document["station_id"]
+        dedup_key = document.get("dedup_key")
+        if dedup_key:
+            return (station_id, dedup_key), None
+
+        content = (
+            station_id,
+            document["temperature"],
+            document["humidity"],
+            document["air_value"],
+            document["dust_density"]
+        )
+        return content, self.dedup_hash_window
+
+    def _get_pipeline(self, station_id: str) -> Optional[IngestPipeline]:
+        """Get or lazily create the queue for a station"""
+        pipeline = self.pipelines.get(station_id)
+        if pipeline is not None:
+            return pipeline
+
+        if not self._running:
+            logger.warning("Ingest router not running, dropping reading")
+            return None
+
+        if len(self.pipelines) >= self.max_stations:
+            logger.warning(f"Station limit ({self.max_stations}) reached, dropping reading for {station_id}")
+            return None
+
+        writer = self.writers[zlib.crc32(station_id.encode()) % len(self.writers)]
+        pipeline = IngestPipeline(
+            name=station_id,
+            writer=writer,
+            max_queue_size=self.max_queue_size,
+            overflow_policy=self.overflow_policy,
+            spool=self.spool,
+            on_lost=self.forget
+        )
+        writer.add(pipeline)
+        self.pipelines[station_id] = pipeline
+        return pipeline
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Current queue depth per station"""
+        return {station_id: pipeline.queue.qsize() for station_id, pipeline in self.pipelines.items()}
+
+    def get_stats(self) -> Dict:
+        """Totals across stations plus per-station counters"""
+        stations = {station_id: pipeline.get_stats() for station_id, pipeline in self.pipelines.items()}
+
+        totals = {key: 0 for key in (
+            "accepted", "dropped", "written", "failed", "spooled", "duplicates", "queue_depth"
+        )}
+        for station_stats in stations.values():
+            for key in totals:
+                totals[key] += station_stats[key]
+        for key in ("batches", "errors"):
+            totals[key] = sum(writer.stats[key] for writer in self.writers)
+
+        return {
+            **totals,
+            "writers": {writer.name: {**writer.stats, "stations": len(writer.pipelines)} for writer in self.writers},
+            "rejected": self.rejected,
+            "duplicates_dropped": self.duplicates_dropped,
+            "dedup_window": len(self.dedup),
+            "station_count": len(stations),
+            "overflow_policy": self.overflow_policy,
+            "spool": self.spool.get_stats() if self.spool else None,
+            "stations": stations
+        }
+
+
+# Singleton instances
+spool_replayer = SpoolReplayer(
+    DiskSpool(
+        directory=settings.spool_dir,
+        max_bytes=settings.spool_max_bytes,
+        segment_bytes=settings.spool_segment_bytes,
+        fsync_policy=settings.spool_fsync,
+        fsync_interval=settings.spool_fsync_interval_seconds
+    ),
+    replay_interval=settings.spool_replay_interval_seconds,
+    batch_size=settings.spool_replay_batch_size
+) if settings.spool_enabled else None
+
+ingest_router = StationIngestRouter(
+    max_stations=settings.ingest_max_stations,
+    max_queue_size=settings.ingest_queue_size,
+    batch_size=settings.ingest_batch_size,
+    station_batch_size=settings.ingest_station_batch_size,
+    writers=settings.ingest_writers,
+    flush_interval=settings.ingest_flush_interval_seconds,
+    overflow_policy=settings.ingest_overflow_policy,
+    spool=spool_replayer,
+    dedup_window_size=settings.dedup_window_size,
+    dedup_hash_window=settings.dedup_hash_window_seconds
+)
+
+metrics.register_gauge("ingest_queue_depth", ingest_router.queue_depths)
+metrics.register_gauge("ingest_queue_depth_total", lambda: sum(ingest_router.queue_depths().values()))
+metrics.register_gauge("ingest_errors_total", lambda: sum(writer.stats["errors"] for writer in ingest_router.writers))
+if spool_replayer:
+    metrics.register_gauge("spool_bytes", lambda: spool_replayer.spool.total_bytes)
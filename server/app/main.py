@@ -5,15 +5,23 @@ Air Quality Monitoring Server
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 import logging
 import asyncio
 
 from app.config import settings
 from app.database.mongo_client import db
 from app.mqtt_listener import mqtt_listener
-from app.routers import data_api, prediction_api, auth, simulation_api, device_api
-from app.models.aqi_model import lstm_predictor
+from app.ingest import ingest_router
+from app.compaction import rollup_compactor
+from app.archiver import reading_archiver
+from app.routers import data_api, prediction_api, auth, simulation_api, device_api, metrics_api, export_api
+from app.models.aqi_model import lstm_predictor, PREDICTION_FIELDS
 from app.utils.websocket_manager import manager
+from app.utils.latest_cache import latest_cache
+from app.utils.ring_buffer import ring_buffers
+from app.utils.query_cache import query_cache
+from app.utils.device_registry import device_registry
 from fastapi import WebSocket, WebSocketDisconnect
 
 # Configure logging
@@ -33,12 +41,20 @@ async def periodic_prediction_task():
             
             logger.info("Running periodic AQI prediction...")
             
-            # Get recent data
-            recent_data = await db.get_history(settings.station_id, hours=12)
+            # Get recent data, from memory unless the ring buffer misses part of the 12 hours
+            window = ring_buffers.window(settings.station_id, since=datetime.utcnow() - timedelta(hours=12))
+            if window is not None:
+                recent_count = len(window['air_value'])
+            else:
+                recent_data = await db.get_history(settings.station_id, hours=12, fields=PREDICTION_FIELDS)
+                recent_count = len(recent_data)
             
-            if len(recent_data) >= 10:
+            if recent_count >= 10:
                 # Make prediction
-                predicted_aqi = lstm_predictor.predict_next_hour(recent_data)
+                if window is not None:
+                    predicted_aqi = lstm_predictor.predict_next_hour_from_window(window)
+                else:
+                    predicted_aqi = lstm_predictor.predict_next_hour(recent_data)
                 
                 if predicted_aqi:
                     from datetime import datetime
@@ -54,7 +70,7 @@ async def periodic_prediction_task():
                         "predicted_aqi": predicted_aqi,
                         "predicted_category": category,
                         "model_type": "LSTM" if lstm_predictor.model else "Simple Average",
-                        "data_points_used": len(recent_data),
+                        "data_points_used": recent_count,
                         "auto_generated": True
                     }
                     
@@ -69,7 +85,7 @@ async def periodic_prediction_task():
                         settings.alert_threshold_aqi
                     )
             else:
-                logger.warning(f"Not enough data for prediction: {len(recent_data)} readings")
+                logger.warning(f"Not enough data for prediction: {recent_count} readings")
                 
         except Exception as e:
             logger.error(f"Error in periodic prediction: {e}")
@@ -87,6 +103,13 @@ async def lifespan(app: FastAPI):
     # Connect to MongoDB
     await db.connect_db()
     
+    # Latest-value endpoints answer from memory from the first request on
+    await latest_cache.warm()
+    await ring_buffers.warm(hours=12)
+    
+    # Start ingest router before readings start arriving
+    ingest_router.start()
+    
     # Start MQTT listener
     loop = asyncio.get_event_loop()
     mqtt_listener.start(loop)
@@ -100,6 +123,16 @@ async def lifespan(app: FastAPI):
     # Start periodic prediction task
     prediction_task = asyncio.create_task(periodic_prediction_task())
     
+    # Follow device writes made by other processes
+    if settings.device_change_stream:
+        device_registry.start_watching()
+    
+    # Roll raw readings up and archive them before retention removes them
+    if reading_archiver:
+        reading_archiver.start()
+    if rollup_compactor:
+        rollup_compactor.start()
+    
     logger.info(f"Server starting on {settings.host}:{settings.port}")
     logger.info(f"Station ID: {settings.station_id}")
     logger.info(f"MQTT Topic: {settings.mqtt_topic}")
@@ -111,7 +144,15 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down server...")
     prediction_task.cancel()
+    if rollup_compactor:
+        await rollup_compactor.stop()
+    if reading_archiver:
+        await reading_archiver.stop()
+    await device_registry.stop_watching()
     mqtt_listener.stop()
+    
+    # Flush queued readings before the database goes away
+    await ingest_router.stop()
     await db.close_db()
     logger.info("Server shutdown complete")
 
@@ -139,6 +180,8 @@ app.include_router(prediction_api.router)
 app.include_router(auth.router)
 app.include_router(simulation_api.router)
 app.include_router(device_api.router)
+app.include_router(metrics_api.router)
+app.include_router(export_api.router)
 
 
 @app.websocket("/ws")
@@ -184,7 +227,14 @@ async def health_check():
         "status": "healthy",
         "timestamp": asyncio.get_event_loop().time(),
         "database": "connected" if db.client else "disconnected",
-        "mqtt": "active"
+        "mqtt": "active",
+        "ingest": ingest_router.get_stats(),
+        "latest_cache": latest_cache.get_stats(),
+        "ring_buffers": ring_buffers.get_stats(),
+        "query_cache": query_cache.get_stats(),
+        "device_registry": device_registry.get_stats(),
+        "compaction": rollup_compactor.get_stats() if rollup_compactor else None,
+        "archive": reading_archiver.get_stats() if reading_archiver else None
     }
 
 
@@ -23,6 +23,13 @@ except ImportError:
     KERAS_AVAILABLE = False
 
 
+# Reading fields the LSTM model uses as inputs
+PREDICTION_FEATURES = ('temperature', 'humidity', 'air_value', 'dust_density')
+
+# Fields to fetch from MongoDB for training and prediction
+PREDICTION_FIELDS = ('timestamp',) + PREDICTION_FEATURES
+
+
 class AQICalculator:
     """Calculate AQI from sensor readings"""
     
@@ -70,6 +77,24 @@ class AQICalculator:
         else:
             return min(500, int(300 + (air_value - 500) * 0.4))  # 300-500 (Hazardous)
     
+    @staticmethod
+    def calculate_aqi_from_air_values(air_values: np.ndarray) -> np.ndarray:
+        """Vectorized calculate_aqi_from_air_value for an array of readings"""
+        values = np.asarray(air_values, dtype=np.float64)
+        aqi = np.select(
+            [values < 100, values < 200, values < 300, values < 400, values < 500],
+            [
+                values * 0.5,
+                50 + (values - 100) * 0.5,
+                100 + (values - 200) * 0.5,
+                150 + (values - 300) * 0.5,
+                200 + (values - 400)
+            ],
+            np.minimum(500, 300 + (values - 500) * 0.4)
+        )
+        # int() truncates toward zero, so does astype
+        return aqi.astype(np.int64)
+    
     @staticmethod
     def get_aqi_category(aqi: int) -> str:
         """Get AQI category description"""
@@ -85,6 +110,16 @@ class AQICalculator:
             return "Very Unhealthy"
         else:
             return "Hazardous"
+    
+    @staticmethod
+    def get_aqi_categories(aqis: np.ndarray) -> np.ndarray:
+        """Vectorized get_aqi_category for an array of AQI values"""
+        categories = np.array([
+            "Good", "Moderate", "Unhealthy for Sensitive Groups",
+            "Unhealthy", "Very Unhealthy", "Hazardous"
+        ], dtype=object)
+        # Upper bound (inclusive) of every category but the last
+        return categories[np.searchsorted([50, 100, 150, 200, 300], aqis, side="left")]
 
 
 class LSTMPredictor:
@@ -95,7 +130,7 @@ class LSTMPredictor:
         self.model = None
         self.scaler = MinMaxScaler()
         self.sequence_length = 24  # Use last 24 readings (12 hours at 30s interval)
-        self.features = ['temperature', 'humidity', 'air_value', 'dust_density']
+        self.features = list(PREDICTION_FEATURES)
         
     def prepare_data(self, data: List[Dict]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
         """Prepare data for training"""
@@ -187,7 +222,10 @@ class LSTMPredictor:
         return False
     
     def predict_next_hour(self, recent_data: List[Dict]) -> Optional[int]:
-        """Predict AQI for next hour"""
+        """Predict AQI for next hour from readings newest first, as db.get_history returns them"""
+        # Oldest first, like the ring buffer window, so both paths use the newest readings
+        recent_data = recent_data[::-1]
+        
         if not KERAS_AVAILABLE:
             # Fallback to simple averaging
             return self._simple_prediction(recent_data)
@@ -221,14 +259,44 @@ class LSTMPredictor:
         
         return int(max(0, min(500, aqi_prediction)))
     
+    def predict_next_hour_from_window(self, window: Dict[str, np.ndarray]) -> Optional[int]:
+        """Predict AQI for next hour from ring buffer columns (oldest first)"""
+        air_values = window['air_value']
+        if not KERAS_AVAILABLE or len(air_values) < self.sequence_length:
+            return self._simple_prediction_from_air_values(air_values)
+        
+        if self.model is None:
+            if not self.load_model():
+                return self._simple_prediction_from_air_values(air_values)
+        
+        # Newest sequence_length readings, in the column order the scaler was fitted with
+        recent = slice(-self.sequence_length, None)
+        feature_data = np.column_stack(
+            [window[feature][recent] for feature in self.features]
+            + [AQICalculator.calculate_aqi_from_air_values(air_values[recent])]
+        )
+        scaled_data = self.scaler.transform(feature_data)
+        
+        X = scaled_data[:, :-1].reshape(1, self.sequence_length, len(self.features))
+        prediction = self.model.predict(X, verbose=0)
+        
+        dummy = np.zeros((1, len(self.features) + 1))
+        dummy[0, -1] = prediction[0, 0]
+        aqi_prediction = self.scaler.inverse_transform(dummy)[0, -1]
+        
+        return int(max(0, min(500, aqi_prediction)))
+    
     def _simple_prediction(self, recent_data: List[Dict]) -> int:
         """Simple moving average fallback"""
-        if not recent_data:
+        # Take last 10 readings
+        return self._simple_prediction_from_air_values(np.array([r['air_value'] for r in recent_data[-10:]]))
+    
+    def _simple_prediction_from_air_values(self, air_values: np.ndarray) -> int:
+        """Moving average of the last 10 air values"""
+        if len(air_values) == 0:
             return 0
         
-        # Take last 10 readings
-        last_readings = recent_data[-10:]
-        avg_air_value = np.mean([r['air_value'] for r in last_readings])
+        avg_air_value = np.mean(air_values[-10:])
         
         return AQICalculator.calculate_aqi_from_air_value(int(avg_air_value))
 
@@ -3,7 +3,7 @@ Device Model
 Smart Home Device Management
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from datetime import datetime
 
 # Device color options
@@ -55,6 +55,26 @@ class DeviceToggle(BaseModel):
     is_on: bool
 
 
+class DeviceBulkUpdate(BaseModel):
+    """
+    One change in a bulk request: either a single device (device_id) or every
+    device of a station (station_id, optionally only one device_type)
+    """
+    device_id: Optional[str] = None
+    station_id: Optional[str] = None
+    device_type: Optional[DeviceType] = None
+    is_on: Optional[bool] = None
+    name: Optional[str] = None
+    icon: Optional[str] = None
+    color: Optional[DeviceColor] = None
+    auto_control_enabled: Optional[bool] = None
+
+
+class DeviceBulkRequest(BaseModel):
+    """Bulk update request, changes are applied in order"""
+    updates: List[DeviceBulkUpdate] = Field(..., min_length=1, max_length=1000)
+
+
 class DeviceResponse(BaseModel):
     """Device response"""
     device_id: str
@@ -67,3 +87,11 @@ class DeviceResponse(BaseModel):
     auto_control_enabled: bool
     created_at: datetime
     updated_at: datetime
+
+
+class DeviceBulkResponse(BaseModel):
+    """Bulk update result with the resulting state of every targeted device"""
+    matched: int
+    modified: int
+    devices: List[DeviceResponse]
+    not_found: List[str]
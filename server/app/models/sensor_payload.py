@@ -0,0 +1,179 @@
+"""
+ESP32 Sensor Payload Schema
+Decodes and validates MQTT sensor payloads (JSON or compact binary) in one pass
+"""
+import json
+import logging
+import struct
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Try to import msgspec (compiled decoder)
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    logger.warning("msgspec not available. Sensor payloads will be decoded with the json fallback.")
+    MSGSPEC_AVAILABLE = False
+
+# Try to import orjson for the fallback decoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+class PayloadError(ValueError):
+    """Raised when a sensor payload cannot be decoded or fails validation"""
+
+
+# Numeric fields published by the ESP32 firmware
+NUMERIC_FIELDS = ("temperature", "humidity", "airValue", "dustDensity")
+
+
+if MSGSPEC_AVAILABLE:
+    class SensorPayload(msgspec.Struct):
+        """Sensor payload as published by the ESP32 (unknown fields are ignored)"""
+        temperature: float
+        humidity: float
+        airValue: float
+        dustDensity: float
+        station_id: Optional[str] = None
+        stationId: Optional[str] = None
+        # Per-boot publish counter, used to drop redelivered readings
+        seq: Optional[int] = None
+        bootId: Optional[str] = None
+
+    # strict=False keeps accepting numbers sent as strings, like float()/int() did
+    _decoder = msgspec.json.Decoder(SensorPayload, strict=False)
+
+    def decode_sensor_payload(raw: bytes) -> SensorPayload:
+        """Decode and validate a JSON sensor payload"""
+        try:
+            return _decoder.decode(raw)
+        except msgspec.ValidationError as e:
+            # e.g. "Expected `float`, got `str` - at `$.temperature`"
+            raise PayloadError(str(e)) from None
+        except msgspec.DecodeError as e:
+            raise PayloadError(f"Invalid JSON: {e}") from None
+
+else:
+    class SensorPayload:
+        """Sensor payload as published by the ESP32"""
+        __slots__ = NUMERIC_FIELDS + ("station_id", "stationId", "seq", "bootId")
+
+        def __init__(self, temperature: float, humidity: float, airValue: float, dustDensity: float,
+                     station_id: Optional[str] = None, stationId: Optional[str] = None,
+                     seq: Optional[int] = None, bootId: Optional[str] = None):
+            self.temperature = temperature
+            self.humidity = humidity
+            self.airValue = airValue
+            self.dustDensity = dustDensity
+            self.station_id = station_id
+            self.stationId = stationId
+            self.seq = seq
+            self.bootId = bootId
+
+        def __repr__(self) -> str:
+            fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+            return f"SensorPayload({fields})"
+
+    def decode_sensor_payload(raw: bytes) -> SensorPayload:
+        """Decode and validate a JSON sensor payload"""
+        try:
+            data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+        except ValueError as e:
+            raise PayloadError(f"Invalid JSON: {e}") from None
+
+        if not isinstance(data, dict):
+            raise PayloadError(f"Expected `object`, got `{type(data).__name__}`")
+
+        values = {}
+        for name in NUMERIC_FIELDS:
+            if name not in data:
+                raise PayloadError(f"Object missing required field `{name}`")
+            try:
+                values[name] = float(data[name])
+            except (TypeError, ValueError):
+                raise PayloadError(f"Expected `float`, got `{type(data[name]).__name__}` - at `$.{name}`") from None
+
+        for name in ("station_id", "stationId", "bootId"):
+            value = data.get(name)
+            if value is not None and not isinstance(value, str):
+                raise PayloadError(f"Expected `str | null`, got `{type(value).__name__}` - at `$.{name}`")
+            values[name] = value
+
+        seq = data.get("seq")
+        if seq is not None:
+            try:
+                seq = int(seq)
+            except (TypeError, ValueError):
+                raise PayloadError(f"Expected `int | null`, got `{type(seq).__name__}` - at `$.seq`") from None
+        values["seq"] = seq
+
+        return SensorPayload(**values)
+
+
+# ==================== Binary Format ====================
+#
+# Version 1, little-endian, 16 bytes:
+#   offset 0   uint8    magic (0xA5)
+#   offset 1   uint8    version (1)
+#   offset 2   uint16   airValue
+#   offset 4   float32  temperature
+#   offset 8   float32  humidity
+#   offset 12  float32  dustDensity
+#
+# Version 2 appends 8 bytes (24 bytes total):
+#   offset 16  uint32   seq
+#   offset 20  uint32   bootId (sent as 8 hex digits in JSON)
+
+BINARY_MAGIC = 0xA5
+BINARY_V1 = struct.Struct("<BBHfff")
+BINARY_V2 = struct.Struct("<BBHfffII")
+BINARY_LAYOUTS = {1: BINARY_V1, 2: BINARY_V2}
+
+
+def is_binary_payload(raw: bytes) -> bool:
+    """Binary payloads start with the magic byte, JSON ones with '{' or whitespace"""
+    return len(raw) > 0 and raw[0] == BINARY_MAGIC
+
+
+def decode_binary_payload(raw: bytes) -> SensorPayload:
+    """Decode a binary sensor payload in place (no copy of the buffer)"""
+    if len(raw) < 2 or raw[0] != BINARY_MAGIC:
+        raise PayloadError("Not a binary sensor payload")
+
+    version = raw[1]
+    layout = BINARY_LAYOUTS.get(version)
+    if layout is None:
+        raise PayloadError(f"Unsupported binary payload version {version}")
+    if len(raw) != layout.size:
+        raise PayloadError(f"Expected {layout.size} bytes for binary payload v{version}, got {len(raw)}")
+
+    fields = layout.unpack_from(raw)
+    _, _, air_value, temperature, humidity, dust_density = fields[:6]
+
+    seq = boot_id = None
+    if version >= 2:
+        seq = fields[6]
+        boot_id = f"{fields[7]:08x}"
+
+    # float32 -> 2 decimals, the precision the JSON payload carries
+    return SensorPayload(
+        temperature=round(temperature, 2),
+        humidity=round(humidity, 2),
+        airValue=float(air_value),
+        dustDensity=round(dust_density, 2),
+        seq=seq,
+        bootId=boot_id
+    )
+
+
+def decode_payload(raw: bytes) -> SensorPayload:
+    """Detect the payload format and decode it"""
+    if is_binary_payload(raw):
+        return decode_binary_payload(raw)
+    return decode_sensor_payload(raw)
@@ -1,21 +1,105 @@
 """
 MQTT Listener for receiving sensor data from ESP32
 """
-import json
 import logging
+import os
+import socket
+import time
 from datetime import datetime
 import asyncio
-from typing import Optional
+from typing import List, Optional
 import paho.mqtt.client as mqtt
 
 from app.config import settings
-from app.database.mongo_client import db
+from app.ingest import ingest_router
 from app.models.aqi_model import aqi_calculator
-from app.utils.websocket_manager import manager
+from app.models.sensor_payload import SensorPayload, PayloadError, decode_payload
 from app.simulation import simulation_manager
+from app.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Try to import the asyncio MQTT client
+try:
+    import aiomqtt
+    AIOMQTT_AVAILABLE = True
+except ImportError:
+    AIOMQTT_AVAILABLE = False
+
+
+def station_from_topic(pattern: str, topic: str) -> Optional[str]:
+    """
+    Extract the station ID from a topic matched by a wildcard pattern
+    The first '+' level of the pattern holds the station ID,
+    e.g. pattern 'home/+/airquality' and topic 'home/station_07/airquality' -> 'station_07'
+    Returns None if the topic does not match the pattern
+    """
+    pattern_levels = pattern.split('/')
+    topic_levels = topic.split('/')
+    
+    station_id = None
+    for index, level in enumerate(pattern_levels):
+        if level == '#':
+            break
+        if index >= len(topic_levels):
+            return None
+        if level == '+':
+            if station_id is None:
+                station_id = topic_levels[index] or None
+        elif level != topic_levels[index]:
+            return None
+    else:
+        if len(topic_levels) != len(pattern_levels):
+            return None
+    
+    return station_id
+
+
+def topic_patterns() -> List[str]:
+    """Configured topic filters: JSON topic plus the optional binary topic"""
+    patterns = [settings.mqtt_topic]
+    if settings.mqtt_binary_topic:
+        patterns.append(settings.mqtt_binary_topic)
+    return patterns
+
+
+def resolve_station_id(topic: Optional[str], payload: SensorPayload) -> str:
+    """Station ID from the payload, then the topic, then the configured default"""
+    station_id = payload.station_id or payload.stationId
+    if station_id:
+        return station_id
+    
+    if topic:
+        for pattern in topic_patterns():
+            station_id = station_from_topic(pattern, topic)
+            if station_id:
+                return station_id
+    
+    return settings.station_id
+
+
+def shared_mode() -> bool:
+    """Whether this process joins an MQTT v5 shared subscription group"""
+    return bool(settings.mqtt_shared_group)
+
+
+def listener_client_id() -> str:
+    """
+    MQTT client ID for this process
+    In shared mode every process needs its own ID, otherwise the broker
+    would disconnect the previous process using the same ID
+    """
+    if shared_mode():
+        return f"{settings.mqtt_client_id}_{socket.gethostname()}_{os.getpid()}"
+    return settings.mqtt_client_id
+
+
+def subscription_topics() -> List[str]:
+    """Topic filters to subscribe to, '$share/<group>/<topic>' in shared mode"""
+    if shared_mode():
+        return [f"$share/{settings.mqtt_shared_group}/{pattern}" for pattern in topic_patterns()]
+    return topic_patterns()
+
 
 class MQTTListener:
     """MQTT client to receive sensor data"""
@@ -24,92 +108,84 @@ class MQTTListener:
         self.client: Optional[mqtt.Client] = None
         self.loop: Optional[asyncio.AbstractEventLoop] = None
         
-    def on_connect(self, client, userdata, flags, rc):
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         """Callback when connected to MQTT broker"""
         if rc == 0:
             logger.info(f"Connected to MQTT broker: {settings.mqtt_broker}")
-            client.subscribe(settings.mqtt_topic)
-            logger.info(f"Subscribed to topic: {settings.mqtt_topic}")
+            topics = subscription_topics()
+            client.subscribe([(topic, 0) for topic in topics])
+            logger.info(f"Subscribed to topics: {topics}")
         else:
             logger.error(f"Failed to connect to MQTT broker, return code: {rc}")
     
+    def parse_payload(self, raw: bytes) -> Optional[SensorPayload]:
+        """Decode and validate an MQTT payload, returns None if it should be ignored"""
+        try:
+            # JSON or binary, detected from the first byte
+            payload = decode_payload(raw)
+        except PayloadError as e:
+            logger.warning(f"Invalid MQTT payload: {e}")
+            return None
+        
+        # --- SIMULATION CHECK ---
+        if simulation_manager.is_active:
+            logger.debug(f"Simulation active. Ignoring real MQTT message: {payload}")
+            return None
+        
+        logger.info(f"Received MQTT message: {payload}")
+        return payload
+    
     def on_message(self, client, userdata, msg):
         """Callback when message received"""
         try:
-            # Parse JSON payload
-            payload = json.loads(msg.payload.decode())
-            
-            # --- SIMULATION CHECK ---
-            if simulation_manager.is_active:
-                logger.debug(f"Simulation active. Ignoring real MQTT message: {payload}")
-                return
-            
-            logger.info(f"Received MQTT message: {payload}")
+            received_at = time.perf_counter()
+            payload = self.parse_payload(msg.payload)
+            metrics.observe_since("decode", received_at)
             
             # Process the data asynchronously
-            if self.loop:
+            if payload is not None and self.loop:
                 asyncio.run_coroutine_threadsafe(
-                    self.process_sensor_data(payload),
+                    self.process_sensor_data(payload, msg.topic, received_at),
                     self.loop
                 )
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse MQTT message: {e}")
         except Exception as e:
             logger.error(f"Error processing MQTT message: {e}")
     
-    async def process_sensor_data(self, data: dict):
-        """Process and store sensor data"""
+    async def process_sensor_data(self, payload: SensorPayload, topic: Optional[str] = None,
+                                  received_at: Optional[float] = None):
+        """Queue a decoded sensor payload for storage"""
         try:
-            # Validate required fields
-            required_fields = ['temperature', 'humidity', 'airValue', 'dustDensity']
-            if not all(field in data for field in required_fields):
-                logger.warning(f"Missing required fields in data: {data}")
-                return
+            # Time from MQTT arrival until the event loop picks the reading up
+            metrics.observe_since("dispatch", received_at)
             
             # Calculate AQI
-            air_value = int(data['airValue'])
+            air_value = int(payload.airValue)
             aqi = aqi_calculator.calculate_aqi_from_air_value(air_value)
             aqi_category = aqi_calculator.get_aqi_category(aqi)
             
             # Prepare document for MongoDB
             document = {
-                "station_id": settings.station_id,
+                "station_id": resolve_station_id(topic, payload),
                 "timestamp": datetime.utcnow(),
-                "temperature": float(data['temperature']),
-                "humidity": float(data['humidity']),
+                "temperature": payload.temperature,
+                "humidity": payload.humidity,
                 "air_value": air_value,
-                "dust_density": float(data['dustDensity']),
+                "dust_density": payload.dustDensity,
                 "aqi": aqi,
                 "aqi_category": aqi_category
             }
             
-            # Insert into MongoDB
-            # Hàm này trả về ID, đồng thời thêm _id vào biến document
-            doc_id = await db.insert_sensor_reading(document) 
-            logger.info(f"Sensor data stored with ID: {doc_id}, AQI: {aqi} ({aqi_category})")
+            # Sequence-based identity, unique per station (see create_indexes)
+            if payload.seq is not None and payload.bootId:
+                document["dedup_key"] = f"{payload.bootId}:{payload.seq}"
             
-            # --- ĐOẠN SỬA QUAN TRỌNG ---
-            # Tạo một bản sao để gửi đi, tránh lỗi ObjectId
-            broadcast_data = document.copy()
-            
-            # Chuyển ObjectId thành string
-            if '_id' in broadcast_data:
-                broadcast_data['_id'] = str(broadcast_data['_id'])
-            
-            # Chuyển datetime thành string ISO (cho chắc ăn)
-            if isinstance(broadcast_data.get('timestamp'), datetime):
-                broadcast_data['timestamp'] = broadcast_data['timestamp'].isoformat()
-
-            # Broadcast to WebSocket clients
-            await manager.broadcast({
-                "type": "sensor_update",
-                "data": broadcast_data # Gửi bản sao đã xử lý string
-            })
+            # Queue for batched storage and broadcast
+            await ingest_router.put(document, received_at)
             
         except Exception as e:
-            logger.error(f"Error storing sensor data: {e}")
+            logger.error(f"Error processing sensor data: {e}")
     
-    def on_disconnect(self, client, userdata, rc):
+    def on_disconnect(self, client, userdata, rc, properties=None):
         """Callback when disconnected"""
         if rc != 0:
             logger.warning(f"Unexpected MQTT disconnect, code: {rc}")
@@ -120,8 +196,11 @@ class MQTTListener:
         """Start MQTT listener"""
         self.loop = loop
         
-        # Create MQTT client
-        self.client = mqtt.Client(client_id=settings.mqtt_client_id)
+        # Create MQTT client (shared subscriptions need MQTT v5)
+        if shared_mode():
+            self.client = mqtt.Client(client_id=listener_client_id(), protocol=mqtt.MQTTv5)
+        else:
+            self.client = mqtt.Client(client_id=listener_client_id())
         
         # Set callbacks
         self.client.on_connect = self.on_connect
@@ -149,5 +228,76 @@ class MQTTListener:
             logger.info("MQTT listener stopped")
 
 
+class AsyncMQTTListener(MQTTListener):
+    """MQTT client that reads messages directly on the asyncio event loop"""
+    
+    def __init__(self):
+        super().__init__()
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start MQTT listener task"""
+        self.loop = loop
+        self._task = loop.create_task(self._run())
+        logger.info("MQTT listener started (asyncio mode)")
+    
+    def stop(self):
+        """Stop MQTT listener"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+            logger.info("MQTT listener stopped")
+    
+    async def _run(self):
+        """Connect, subscribe and read messages, reconnecting with backoff"""
+        delay = settings.mqtt_reconnect_min_seconds
+        
+        while True:
+            try:
+                logger.info(f"Connecting to MQTT broker: {settings.mqtt_broker}:{settings.mqtt_port}")
+                async with aiomqtt.Client(
+                    hostname=settings.mqtt_broker,
+                    port=settings.mqtt_port,
+                    client_id=listener_client_id(),
+                    protocol=aiomqtt.ProtocolVersion.V5 if shared_mode() else aiomqtt.ProtocolVersion.V311,
+                    keepalive=60
+                ) as client:
+                    async with client.messages() as messages:
+                        # Subscribe again on every (re)connect
+                        topics = subscription_topics()
+                        await client.subscribe([(topic, 0) for topic in topics])
+                        logger.info(f"Connected to MQTT broker: {settings.mqtt_broker}")
+                        logger.info(f"Subscribed to topics: {topics}")
+                        delay = settings.mqtt_reconnect_min_seconds
+                        
+                        async for message in messages:
+                            await self.handle_message(message)
+            except aiomqtt.MqttError as e:
+                logger.warning(f"MQTT connection lost: {e}. Reconnecting in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.mqtt_reconnect_max_seconds)
+    
+    async def handle_message(self, message):
+        """Process a single message on the event loop"""
+        try:
+            received_at = time.perf_counter()
+            payload = self.parse_payload(message.payload)
+            metrics.observe_since("decode", received_at)
+            if payload is not None:
+                # Awaiting here lets a blocking ingest queue slow the reader down
+                await self.process_sensor_data(payload, message.topic.value, received_at)
+        except Exception as e:
+            logger.error(f"Error processing MQTT message: {e}")
+
+
+def create_listener(mode: str) -> MQTTListener:
+    """Create the MQTT listener for the configured mode"""
+    if mode == "asyncio":
+        if AIOMQTT_AVAILABLE:
+            return AsyncMQTTListener()
+        logger.warning("aiomqtt not available. Falling back to threaded MQTT listener.")
+    return MQTTListener()
+
+
 # Singleton instance
-mqtt_listener = MQTTListener()
+mqtt_listener = create_listener(settings.mqtt_mode)
@@ -2,17 +2,33 @@
 REST API endpoints for sensor data
 """
 from fastapi import APIRouter, Query, HTTPException
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from bson import ObjectId
+import base64
+import re
 import logging
 
-from app.database.mongo_client import db
+from app.config import settings
+from app.database.mongo_client import db, select_history_tier, DEFAULT_STAT_AGGREGATES, STAT_AGGREGATES, STAT_FIELDS
 from app.models.aqi_model import aqi_calculator
+from app.utils.latest_cache import latest_cache
+from app.utils.ring_buffer import ring_buffers, window_stats
+from app.utils.query_cache import query_cache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/data", tags=["Sensor Data"])
 
+# Fields each endpoint serializes, fetched with a projection
+CHART_FIELDS = ("timestamp", "dust_density", "temperature", "humidity", "aqi")
+
+# Longest range /stations/{id}/history serves ('from' up to 366d)
+MAX_HISTORY_HOURS = 366 * 24
+
+# Page tokens carry the timestamp as milliseconds since this (naive UTC, like stored readings)
+EPOCH = datetime(1970, 1, 1)
+
 
 @router.get("/latest")
 async def get_latest_data(station_id: str = Query(default="station_01", description="Station ID")):
@@ -21,7 +37,7 @@ async def get_latest_data(station_id: str = Query(default="station_01", descript
     
     - **station_id**: ID of the monitoring station
     """
-    reading = await db.get_latest_reading(station_id)
+    reading = await latest_cache.get(station_id)
     
     if not reading:
         raise HTTPException(status_code=404, detail=f"No data found for station {station_id}")
@@ -32,18 +48,55 @@ async def get_latest_data(station_id: str = Query(default="station_01", descript
     }
 
 
+def encode_cursor(key: Tuple[datetime, ObjectId]) -> str:
+    """Opaque page token for a (timestamp, _id) key"""
+    timestamp, last_id = key
+    millis = (timestamp - EPOCH) // timedelta(milliseconds=1)
+    return base64.urlsafe_b64encode(f"{millis}.{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """Parse a page token, raises ValueError if it is not one of ours"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        millis, last_id = raw.split(".")
+        return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(last_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor '{token}'") from None
+
+
 @router.get("/history")
 async def get_history(
     station_id: str = Query(default="station_01", description="Station ID"),
-    hours: int = Query(default=24, ge=1, le=168, description="Number of hours of history (1-168)")
+    hours: int = Query(default=24, ge=1, le=168, description="Number of hours of history (1-168)"),
+    limit: Optional[int] = Query(default=None, ge=1, le=5000, description="Page size, enables pagination"),
+    cursor: Optional[str] = Query(default=None, description="'next' token from the previous page")
 ):
     """
     Get historical sensor readings for a station
     
     - **station_id**: ID of the monitoring station
     - **hours**: Number of hours of history to retrieve (max 168 = 7 days)
+    - **limit** / **cursor**: Page back through all history, newest first. `hours` is
+      ignored; pass the returned `next` token as `cursor` to get the following page
     """
-    readings = await db.get_history(station_id, hours)
+    if limit is not None or cursor is not None:
+        try:
+            before = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        readings, next_key = await db.get_history_page(station_id, limit or 100, before)
+        return {
+            "status": "success",
+            "data": readings,
+            "count": len(readings),
+            "station_id": station_id,
+            "next": encode_cursor(next_key) if next_key else None
+        }
+    
+    # Identical requests in the same time bucket share one query
+    readings = await query_cache.get(station_id, "history", hours, lambda: db.get_history(station_id, hours))
     
     if not readings:
         return {
@@ -62,58 +115,62 @@ async def get_history(
     }
 
 
+async def query_statistics(station_id: str, hours: int, fields: List[str], aggregates: List[str]) -> Optional[Dict]:
+    """Statistics from the rollups when they can answer, otherwise from raw readings"""
+    summary = None
+    if settings.rollup_enabled and hours >= settings.rollup_min_hours and set(aggregates) <= set(DEFAULT_STAT_AGGREGATES):
+        # Long ranges are summed from 1-minute rollups instead of raw readings
+        summary = await db.get_rollup_stats(station_id, hours, fields, aggregates)
+    
+    if not summary:
+        summary = await db.get_reading_stats(station_id, hours, fields, aggregates)
+    return summary
+
+
 @router.get("/stats")
 async def get_statistics(
     station_id: str = Query(default="station_01", description="Station ID"),
-    hours: int = Query(default=24, ge=1, le=168, description="Number of hours for statistics")
+    hours: int = Query(default=24, ge=1, le=168, description="Number of hours for statistics"),
+    metrics: Optional[List[str]] = Query(default=None, description=f"Fields to summarise (default: all of {', '.join(STAT_FIELDS)})"),
+    aggregates: Optional[List[str]] = Query(default=None, description=f"Statistics per field (default: min, max, avg; available: {', '.join(STAT_AGGREGATES)})")
 ):
     """
     Get statistical summary of sensor data
     
     - **station_id**: ID of the monitoring station
     - **hours**: Number of hours to calculate statistics for
+    - **metrics**: Fields to include, e.g. `?metrics=temperature&metrics=aqi`
+    - **aggregates**: Statistics to compute, e.g. `?aggregates=avg&aggregates=stddev`
     """
-    readings = await db.get_history(station_id, hours)
+    fields = metrics or list(STAT_FIELDS)
+    aggregates = aggregates or list(DEFAULT_STAT_AGGREGATES)
     
-    if not readings:
-        raise HTTPException(status_code=404, detail=f"No data found for station {station_id}")
+    unknown = [name for name in fields if name not in STAT_FIELDS]
+    unknown += [name for name in aggregates if name not in STAT_AGGREGATES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics or aggregates: {', '.join(unknown)}")
     
-    # Calculate statistics
-    temps = [r['temperature'] for r in readings]
-    hums = [r['humidity'] for r in readings]
-    air_vals = [r['air_value'] for r in readings]
-    dusts = [r['dust_density'] for r in readings]
-    aqis = [r.get('aqi', 0) for r in readings]
+    summary = None
+    window = ring_buffers.window(station_id, since=datetime.utcnow() - timedelta(hours=hours))
+    if window is not None:
+        # Recent ranges straight from the in-memory ring buffer
+        summary = window_stats(window, fields, aggregates)
+    
+    if not summary:
+        # Identical requests in the same time bucket share one query
+        summary = await query_cache.get(
+            station_id, "stats", (hours, tuple(fields), tuple(aggregates)),
+            lambda: query_statistics(station_id, hours, fields, aggregates)
+        )
+    
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"No data found for station {station_id}")
     
     stats = {
         "station_id": station_id,
         "period_hours": hours,
-        "total_readings": len(readings),
-        "temperature": {
-            "min": min(temps),
-            "max": max(temps),
-            "avg": sum(temps) / len(temps)
-        },
-        "humidity": {
-            "min": min(hums),
-            "max": max(hums),
-            "avg": sum(hums) / len(hums)
-        },
-        "air_value": {
-            "min": min(air_vals),
-            "max": max(air_vals),
-            "avg": sum(air_vals) / len(air_vals)
-        },
-        "dust_density": {
-            "min": min(dusts),
-            "max": max(dusts),
-            "avg": sum(dusts) / len(dusts)
-        },
-        "aqi": {
-            "min": min(aqis) if aqis else 0,
-            "max": max(aqis) if aqis else 0,
-            "avg": sum(aqis) / len(aqis) if aqis else 0
-        }
+        "total_readings": summary["count"],
+        **{name: value for name, value in summary.items() if name != "count"}
     }
     
     return {
@@ -129,7 +186,7 @@ async def calculate_current_aqi(station_id: str = Query(default="station_01")):
     
     - **station_id**: ID of the monitoring station
     """
-    reading = await db.get_latest_reading(station_id)
+    reading = await latest_cache.get(station_id)
     
     if not reading:
         raise HTTPException(status_code=404, detail=f"No data found for station {station_id}")
@@ -151,43 +208,70 @@ async def calculate_current_aqi(station_id: str = Query(default="station_01")):
             "dust_density": reading['dust_density']
         }
     }
+# Display info for known stations, others get a generated name
+STATION_INFO = {
+    "station_01": {
+        "name": "Station 01 (HUST)",
+        "location": {
+            "lat": 21.0056,
+            "lng": 105.8433
+        }
+    }
+}
+
+
+def station_name(station_id: str) -> str:
+    """Display name for a station list entry"""
+    info = STATION_INFO.get(station_id)
+    if info:
+        return info["name"]
+    return f"Station {station_id.split('_')[-1] if '_' in station_id else station_id}"
+
+
 @router.get("/stations")
 async def get_stations():
     """
     Get list of all monitoring stations
     """
     # In a real app, this would query a 'stations' collection
-    # For now, we return the single configured station with its latest data
+    # For now, every station that has sent readings is listed with its latest data
     try:
-        latest = await db.get_latest_reading("station_01")
-        
-        station_data = {
-            "id": "station_01",
-            "name": "Station 01 (HUST)",
-            "location": {
-                "lat": 21.0056,
-                "lng": 105.8433
-            },
-            "status": "online" if latest else "offline",
-            "last_update": latest['timestamp'] if latest else None,
-        }
+        station_ids = set(await latest_cache.station_ids())
+        station_ids.add(settings.station_id)
         
-        if latest:
-            # Calculate AQI
-            air_value = latest.get('air_value', 0)
-            aqi = aqi_calculator.calculate_aqi_from_air_value(air_value)
-            category = aqi_calculator.get_aqi_category(aqi)
+        stations = []
+        for station_id in sorted(station_ids):
+            latest = await latest_cache.get(station_id)
             
-            station_data["readings"] = {
-                "pm25": latest.get('dust_density', 0), # Using dust_density as PM2.5 proxy
-                "pm10": latest.get('dust_density', 0), # Using dust_density as PM10 proxy
-                "temperature": latest.get('temperature', 0),
-                "humidity": latest.get('humidity', 0),
-                "aqi": aqi,
-                "aqi_category": category
+            station_data = {
+                "id": station_id,
+                "name": station_name(station_id),
+                "status": "online" if latest else "offline",
+                "last_update": latest['timestamp'] if latest else None,
             }
             
-        return [station_data]
+            info = STATION_INFO.get(station_id)
+            if info:
+                station_data["location"] = info["location"]
+            
+            if latest:
+                # Calculate AQI
+                air_value = latest.get('air_value', 0)
+                aqi = aqi_calculator.calculate_aqi_from_air_value(air_value)
+                category = aqi_calculator.get_aqi_category(aqi)
+                
+                station_data["readings"] = {
+                    "pm25": latest.get('dust_density', 0), # Using dust_density as PM2.5 proxy
+                    "pm10": latest.get('dust_density', 0), # Using dust_density as PM10 proxy
+                    "temperature": latest.get('temperature', 0),
+                    "humidity": latest.get('humidity', 0),
+                    "aqi": aqi,
+                    "aqi_category": category
+                }
+            
+            stations.append(station_data)
+        
+        return stations
     except Exception as e:
         logger.error(f"Error getting stations: {e}")
         return []
@@ -204,7 +288,7 @@ async def get_stations_list():
 @stations_router.get("/{station_id}/latest")
 async def get_station_latest(station_id: str):
     """Get latest data for a specific station"""
-    reading = await db.get_latest_reading(station_id)
+    reading = await latest_cache.get(station_id)
     if not reading:
         raise HTTPException(status_code=404, detail=f"No data found for station {station_id}")
     
@@ -232,14 +316,32 @@ async def get_station_history(
     to_param: Optional[str] = Query(default=None, alias="to")
 ):
     """Get history for a specific station"""
-    # Parse 'from' param (e.g., '24h', '7d')
+    # Parse 'from' param (e.g., '24h', '7d', '90d')
     hours = 24
-    if from_param == "7d":
-        hours = 168
-    elif from_param == "24h":
-        hours = 24
-        
-    readings = await db.get_history(station_id, hours)
+    match = re.fullmatch(r"(\d+)([hd])", from_param or "")
+    if match:
+        hours = int(match.group(1)) * (24 if match.group(2) == "d" else 1)
+        hours = min(max(hours, 1), MAX_HISTORY_HOURS)
+
+    # Older ranges come from the rollup tiers, raw readings are only kept for a few days
+    tier = select_history_tier(hours)
+    if tier != "raw":
+        # One averaged point per bucket
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        buckets = await db.get_rollups(station_id, start_time, tier, fields=("dust_density", "temperature", "humidity", "aqi"))
+        if buckets:
+            return [
+                {
+                    "timestamp": b['bucket'],
+                    "pm25": round(b['dust_density']['sum'] / b['count'], 2),
+                    "temperature": round(b['temperature']['sum'] / b['count'], 2),
+                    "humidity": round(b['humidity']['sum'] / b['count'], 2),
+                    "aqi": round(b['aqi']['sum'] / b['count'])
+                }
+                for b in reversed(buckets)
+            ]
+    
+    readings = await db.get_history(station_id, hours, fields=CHART_FIELDS)
     if not readings:
         return []
         
@@ -2,7 +2,7 @@
 Device API Router
 API endpoints for device management
 """
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Response, status
 from typing import List
 from datetime import datetime
 import uuid
@@ -11,15 +11,21 @@ from app.models.device_model import (
     DeviceCreate,
     DeviceUpdate,
     DeviceToggle,
+    DeviceBulkRequest,
+    DeviceBulkResponse,
     DeviceResponse
 )
 from app.database.mongo_client import db
+from app.utils.device_registry import device_registry
 
 router = APIRouter(
     prefix="/devices",
     tags=["Devices"]
 )
 
+# Fields a bulk update can set
+BULK_UPDATE_FIELDS = {"is_on", "name", "icon", "color", "auto_control_enabled"}
+
 
 @router.get("", response_model=List[DeviceResponse])
 async def get_devices(station_id: str):
@@ -28,25 +34,8 @@ async def get_devices(station_id: str):
     
     - **station_id**: ID of the station
     """
-    devices = await db.get_devices(station_id)
-    
-    # Convert to response model
-    response_devices = []
-    for device in devices:
-        response_devices.append(DeviceResponse(
-            device_id=device["device_id"],
-            station_id=device["station_id"],
-            name=device["name"],
-            icon=device["icon"],
-            color=device["color"],
-            device_type=device["device_type"],
-            is_on=device["is_on"],
-            auto_control_enabled=device.get("auto_control_enabled", False),
-            created_at=device["created_at"],
-            updated_at=device["updated_at"]
-        ))
-    
-    return response_devices
+    # Served from the registry, serialized once per change
+    return Response(content=await device_registry.list_station(station_id), media_type="application/json")
 
 
 @router.post("", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
@@ -79,10 +68,61 @@ async def create_device(device: DeviceCreate):
     }
     
     await db.insert_device(device_data)
+    device_registry.put(device_data)
     
     return DeviceResponse(**device_data)
 
 
+@router.post("/bulk", response_model=DeviceBulkResponse)
+async def bulk_update_devices(request: DeviceBulkRequest):
+    """
+    Update or toggle many devices in one request
+    
+    - **updates**: Changes applied in order, each with a target and new values
+      - **device_id**: One device, or
+      - **station_id** (and optionally **device_type**): Every matching device of a station
+      - **is_on**, **name**, **icon**, **color**, **auto_control_enabled**: New values
+    
+    All purifiers of station_01 on:
+    `{"updates": [{"station_id": "station_01", "device_type": "purifier", "is_on": true}]}`
+    """
+    updates = []
+    for index, update in enumerate(request.updates):
+        if (update.device_id is None) == (update.station_id is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Update {index}: set either device_id or station_id"
+            )
+        
+        if update.device_id is not None:
+            query = {"device_id": update.device_id}
+        else:
+            query = {"station_id": update.station_id}
+            if update.device_type is not None:
+                query["device_type"] = update.device_type
+        
+        fields = update.model_dump(include=BULK_UPDATE_FIELDS, exclude_none=True)
+        if not fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Update {index}: no fields to update"
+            )
+        updates.append((query, fields))
+    
+    # One bulk_write for every change, one query for the resulting states
+    matched, modified, devices = await db.bulk_update_devices(updates)
+    for device in devices:
+        device_registry.put(device)
+    
+    found = {device["device_id"] for device in devices}
+    return DeviceBulkResponse(
+        matched=matched,
+        modified=modified,
+        devices=[DeviceResponse(**{"auto_control_enabled": False, **device}) for device in devices],
+        not_found=[query["device_id"] for query, _ in updates if query.get("device_id") and query["device_id"] not in found]
+    )
+
+
 @router.get("/{device_id}", response_model=DeviceResponse)
 async def get_device(device_id: str):
     """
@@ -90,7 +130,7 @@ async def get_device(device_id: str):
     
     - **device_id**: ID of the device
     """
-    device = await db.get_device(device_id)
+    device = await device_registry.get_device(device_id)
     
     if not device:
         raise HTTPException(
@@ -98,18 +138,7 @@ async def get_device(device_id: str):
             detail=f"Device {device_id} not found"
         )
     
-    return DeviceResponse(
-        device_id=device["device_id"],
-        station_id=device["station_id"],
-        name=device["name"],
-        icon=device["icon"],
-        color=device["color"],
-        device_type=device["device_type"],
-        is_on=device["is_on"],
-        auto_control_enabled=device.get("auto_control_enabled", False),
-        created_at=device["created_at"],
-        updated_at=device["updated_at"]
-    )
+    return Response(content=device, media_type="application/json")
 
 
 @router.put("/{device_id}", response_model=DeviceResponse)
@@ -123,14 +152,6 @@ async def update_device(device_id: str, device_update: DeviceUpdate):
     - **color**: New color (optional)
     - **auto_control_enabled**: Enable/disable automatic control (optional)
     """
-    # Check if device exists
-    existing_device = await db.get_device(device_id)
-    if not existing_device:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Device {device_id} not found"
-        )
-    
     # Build update data (only include non-None fields)
     update_data = {}
     if device_update.name is not None:
@@ -148,11 +169,14 @@ async def update_device(device_id: str, device_update: DeviceUpdate):
             detail="No fields to update"
         )
     
-    # Update device
-    await db.update_device(device_id, update_data)
-    
-    # Get updated device
-    updated_device = await db.get_device(device_id)
+    # Update device and get the updated document in one round trip
+    updated_device = await db.update_device(device_id, update_data)
+    if not updated_device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device {device_id} not found"
+        )
+    device_registry.put(updated_device)
     
     return DeviceResponse(
         device_id=updated_device["device_id"],
@@ -175,16 +199,14 @@ async def delete_device(device_id: str):
     
     - **device_id**: ID of the device
     """
-    # Check if device exists
-    existing_device = await db.get_device(device_id)
-    if not existing_device:
+    deleted = await db.delete_device(device_id)
+    device_registry.remove(device_id)
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Device {device_id} not found"
         )
     
-    await db.delete_device(device_id)
-    
     return None
 
 
@@ -196,19 +218,14 @@ async def toggle_device(device_id: str, toggle_data: DeviceToggle):
     - **device_id**: ID of the device
     - **is_on**: New state (true/false)
     """
-    # Check if device exists
-    existing_device = await db.get_device(device_id)
-    if not existing_device:
+    # Toggle device and get the updated document in one round trip
+    updated_device = await db.toggle_device(device_id, toggle_data.is_on)
+    if not updated_device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Device {device_id} not found"
         )
-    
-    # Toggle device
-    await db.toggle_device(device_id, toggle_data.is_on)
-    
-    # Get updated device
-    updated_device = await db.get_device(device_id)
+    device_registry.put(updated_device)
     
     return DeviceResponse(
         device_id=updated_device["device_id"],
@@ -0,0 +1,205 @@
+"""
+REST API endpoints for exporting sensor data
+Large ranges are streamed from MongoDB in batches instead of being built in memory
+"""
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import csv
+import io
+import json
+import logging
+import zlib
+
+from app.database.mongo_client import db
+from app.utils.columnar_export import (
+    COLUMNAR_BATCH_SIZE,
+    COLUMNAR_FORMATS,
+    PYARROW_AVAILABLE,
+    ChunkSink,
+    columnar_schema,
+    open_writer,
+    to_record_batch
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+# Fields a reading can be exported with, in column order
+EXPORT_FIELDS = (
+    "station_id", "timestamp", "temperature", "humidity",
+    "air_value", "dust_density", "aqi", "aqi_category"
+)
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    **COLUMNAR_FORMATS
+}
+
+# Readings fetched from MongoDB and written per chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def to_utc(value: datetime) -> datetime:
+    """Readings are stored as naive UTC, convert aware query times to match"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def export_value(value):
+    """JSON/CSV representation of a stored value"""
+    if isinstance(value, datetime):
+        return value.isoformat() + "Z"
+    return value
+
+
+def encode_ndjson(batch: List[Dict], fields: List[str]) -> bytes:
+    """One JSON object per line"""
+    lines = [
+        json.dumps({field: export_value(reading.get(field)) for field in fields}, separators=(",", ":"))
+        for reading in batch
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def encode_csv(batch: List[Dict], fields: List[str]) -> bytes:
+    """CSV rows, without header"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for reading in batch:
+        writer.writerow([export_value(reading.get(field, "")) for field in fields])
+    return buffer.getvalue().encode()
+
+
+async def stream_readings(
+    station_id: str,
+    start_time: datetime,
+    end_time: Optional[datetime],
+    fields: List[str],
+    fmt: str,
+    compress: bool
+) -> AsyncIterator[bytes]:
+    """Encode (and optionally gzip) readings batch by batch as they come from the cursor"""
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if fmt == "csv":
+        yield emit((",".join(fields) + "\r\n").encode())
+
+    exported = 0
+    try:
+        async for batch in db.iter_history(station_id, start_time, end_time, fields, EXPORT_BATCH_SIZE):
+            exported += len(batch)
+            chunk = emit(encode(batch, fields))
+            if chunk:
+                yield chunk
+    except Exception as e:
+        # Headers are already sent, the client sees a truncated body
+        logger.error(f"Error exporting readings for {station_id} after {exported} rows: {e}")
+        raise
+
+    if compressor:
+        yield compressor.flush()
+    logger.info(f"Exported {exported} readings for {station_id} as {fmt}")
+
+
+async def stream_columnar(
+    station_id: str,
+    start_time: datetime,
+    end_time: Optional[datetime],
+    fields: List[str],
+    fmt: str
+) -> AsyncIterator[bytes]:
+    """Write Parquet / Arrow IPC one record batch per cursor batch, sending each as it is written"""
+    schema = columnar_schema(fields)
+    sink = ChunkSink()
+    writer = open_writer(sink, schema, fmt)
+
+    def write(batch: List[Dict]) -> bytes:
+        writer.write_batch(to_record_batch(batch, schema))
+        return sink.drain()
+
+    exported = 0
+    try:
+        async for batch in db.iter_history(station_id, start_time, end_time, fields, COLUMNAR_BATCH_SIZE):
+            exported += len(batch)
+            # Column conversion and compression are CPU-bound, keep them off the event loop
+            chunk = await asyncio.to_thread(write, batch)
+            if chunk:
+                yield chunk
+    except Exception as e:
+        # Headers are already sent, the client sees a truncated file
+        logger.error(f"Error exporting readings for {station_id} after {exported} rows: {e}")
+        raise
+
+    # Footer (and the schema when no rows were written)
+    writer.close()
+    yield sink.drain()
+    logger.info(f"Exported {exported} readings for {station_id} as {fmt}")
+
+
+@router.get("/history")
+async def export_history(
+    station_id: str = Query(default="station_01", description="Station ID"),
+    start: Optional[datetime] = Query(default=None, alias="from", description="Start time, ISO 8601 (default: 24 hours ago)"),
+    end: Optional[datetime] = Query(default=None, alias="to", description="End time, ISO 8601, exclusive (default: now)"),
+    format: str = Query(default="ndjson", description="ndjson, csv, parquet or arrow"),
+    fields: Optional[List[str]] = Query(default=None, description=f"Fields to export (default: all of {', '.join(EXPORT_FIELDS)})"),
+    gzip: bool = Query(default=False, description="gzip the response (Content-Encoding: gzip)")
+):
+    """
+    Stream sensor readings for any time range as NDJSON, CSV, Parquet or Arrow
+
+    - **station_id**: ID of the monitoring station
+    - **from** / **to**: Time range, e.g. `2025-11-01T00:00:00Z`
+    - **format**: `ndjson` (one reading per line), `csv`, `parquet` (zstd) or
+      `arrow` (Arrow IPC file, `pandas.read_feather`)
+    - **fields**: Columns to include, e.g. `?fields=timestamp&fields=aqi`
+    - **gzip**: Compress the stream (ndjson/csv only)
+
+    Readings are sent oldest first while they are read from MongoDB, so
+    memory use does not depend on the size of the range.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Must be one of {', '.join(EXPORT_FORMATS)}")
+
+    if format in COLUMNAR_FORMATS:
+        if not PYARROW_AVAILABLE:
+            raise HTTPException(status_code=501, detail=f"'{format}' export requires pyarrow")
+        if gzip:
+            raise HTTPException(status_code=400, detail=f"gzip does not apply to '{format}', it is compressed internally")
+
+    fields = fields or list(EXPORT_FIELDS)
+    unknown = [field for field in fields if field not in EXPORT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    end_time = to_utc(end) if end else None
+    start_time = to_utc(start) if start else (end_time or datetime.utcnow()) - timedelta(hours=24)
+    if end_time and end_time <= start_time:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+
+    filename = f"{station_id}_{start_time:%Y%m%dT%H%M%S}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    if format in COLUMNAR_FORMATS:
+        stream = stream_columnar(station_id, start_time, end_time, fields, format)
+    else:
+        stream = stream_readings(station_id, start_time, end_time, fields, format, gzip)
+
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[format],
+        headers=headers
+    )
@@ -0,0 +1,34 @@
+"""
+REST API endpoints for pipeline metrics
+"""
+from fastapi import APIRouter
+
+from app.ingest import ingest_router
+from app.utils.metrics import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/pipeline")
+async def get_pipeline_metrics():
+    """
+    Latency histograms for each stage of the reading pipeline and queue gauges
+    
+    Stages: decode, dispatch (arrival until the event loop picks the reading up),
+    queue_wait, db_insert (per batch), spool_write (per batch), broadcast_encode,
+    broadcast_send and end_to_end (MQTT arrival until broadcast to clients)
+    """
+    return {
+        "status": "success",
+        "data": {
+            **metrics.snapshot(),
+            "ingest": ingest_router.get_stats()
+        }
+    }
+
+
+@router.post("/pipeline/reset")
+async def reset_pipeline_metrics():
+    """Clear latency histograms, e.g. before a load test"""
+    metrics.reset()
+    return {"status": "success", "message": "Pipeline metrics reset"}
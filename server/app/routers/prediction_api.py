@@ -2,13 +2,14 @@
 REST API endpoints for AQI prediction
 """
 from fastapi import APIRouter, Query, HTTPException, BackgroundTasks
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 
 from app.database.mongo_client import db
-from app.models.aqi_model import lstm_predictor
+from app.models.aqi_model import lstm_predictor, PREDICTION_FIELDS
 from app.config import settings
 from app.utils.alerts import AlertManager
+from app.utils.ring_buffer import ring_buffers
 
 logger = logging.getLogger(__name__)
 
@@ -31,17 +32,25 @@ async def predict_next_hour(
     
     - **station_id**: ID of the monitoring station
     """
-    # Get recent data for prediction
-    recent_data = await db.get_history(station_id, hours=12)
-    
-    if len(recent_data) < 5:
+    # Get recent data for prediction, from memory unless the ring buffer misses part of the 12 hours
+    window = ring_buffers.window(station_id, since=datetime.utcnow() - timedelta(hours=12))
+    if window is not None:
+        recent_count = len(window['air_value'])
+    else:
+        recent_data = await db.get_history(station_id, hours=12, fields=PREDICTION_FIELDS)
+        recent_count = len(recent_data)
+    
+    if recent_count < 5:
         raise HTTPException(
             status_code=400,
-            detail=f"Not enough historical data for prediction (need at least 5 readings, got {len(recent_data)})"
+            detail=f"Not enough historical data for prediction (need at least 5 readings, got {recent_count})"
         )
     
     # Make prediction
-    predicted_aqi = lstm_predictor.predict_next_hour(recent_data)
+    if window is not None:
+        predicted_aqi = lstm_predictor.predict_next_hour_from_window(window)
+    else:
+        predicted_aqi = lstm_predictor.predict_next_hour(recent_data)
     
     if predicted_aqi is None:
         raise HTTPException(status_code=500, detail="Prediction failed")
@@ -57,7 +66,7 @@ async def predict_next_hour(
         "predicted_aqi": predicted_aqi,
         "predicted_category": category,
         "model_type": "LSTM" if lstm_predictor.model else "Simple Average",
-        "data_points_used": len(recent_data)
+        "data_points_used": recent_count
     }
     
     await db.insert_prediction(prediction_doc)
@@ -112,10 +121,11 @@ async def train_model(
     Train the LSTM model with historical data
     
     - **station_id**: ID of the monitoring station
-    - **hours**: Number of hours of historical data to use for training
+    - **hours**: Number of hours of historical data to use for training; the part older
+      than the raw retention comes from the cold archive or, without it, rollup averages
     """
     # Get training data
-    training_data = await db.get_training_data(station_id, hours)
+    training_data = await db.get_training_data(station_id, hours, fields=PREDICTION_FIELDS)
     
     if len(training_data) < 100:
         raise HTTPException(
@@ -0,0 +1,282 @@
+"""
+Cold archive of sensor readings as per-station, per-day NumPy column files
+Scans read the column files directly and never touch MongoDB
+"""
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Archived columns -> dtype; timestamps are seconds since the epoch (naive UTC, like stored readings)
+ARCHIVE_COLUMNS = {
+    "timestamp": np.float64,
+    "temperature": np.float64,
+    "humidity": np.float64,
+    "air_value": np.int32,
+    "dust_density": np.float64,
+    "aqi": np.int32
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+# Days archived before this date (exclusive), for every station
+WATERMARK_FILE = "ARCHIVED_UNTIL"
+
+# Station IDs used as their directory name as is; others are hex-encoded behind ENCODED_PREFIX
+STATION_ID_PATTERN = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.-]*")
+ENCODED_PREFIX = "~"
+
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def day_start(timestamp: datetime) -> datetime:
+    """Midnight (UTC) of the day a timestamp falls in"""
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def station_directory(station_id: str) -> str:
+    """Directory name of a station, never a path separator, '.' or '..'"""
+    if STATION_ID_PATTERN.fullmatch(station_id):
+        return station_id
+    return ENCODED_PREFIX + station_id.encode().hex()
+
+
+class ColdArchive:
+    """
+    Directory of archived readings: <directory>/<station_id>/<YYYY-MM-DD>/<column>.npy
+    (station IDs that are not safe as a directory name are hex-encoded)
+
+    A day is written after it ended (and rewritten when late readings are
+    merged) into a temporary directory that is renamed into place, so readers
+    never see a partial day. Merges hold an exclusive lock on <day>.lock, so
+    the archiver and import_history.py never overwrite each other's readings.
+    Ranges within one day are served from memory-mapped files, kept open for
+    the most recently read days; every mapping holds a file descriptor, so at
+    most `max_open_files` are kept. Longer ranges are sequential scans and
+    read each day's files in full without mapping them.
+    """
+
+    def __init__(self, directory: str = "archive", max_open_files: int = 128):
+        self.directory = directory
+        self.max_open_days = max(1, max_open_files // len(ARCHIVE_COLUMNS))
+        # (station_id, day) -> (directory inode, memory-mapped columns), least recently used first
+        self._open_days: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # Reads and merges run in to_thread workers
+        self._open_days_lock = threading.Lock()
+        self.archived_until = self._load_watermark()
+        self.stats = {
+            "days_written": 0,
+            "readings_written": 0,
+            "reads": 0,
+            "readings_read": 0
+        }
+
+    # ==================== Layout ====================
+
+    def _day_path(self, station_id: str, day: datetime) -> str:
+        return os.path.join(self.directory, station_directory(station_id), day.strftime(DAY_FORMAT))
+
+    def _load_watermark(self) -> Optional[datetime]:
+        try:
+            with open(os.path.join(self.directory, WATERMARK_FILE)) as f:
+                return datetime.strptime(f.read().strip(), DAY_FORMAT)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.error(f"Ignoring invalid archive watermark: {e}")
+            return None
+
+    def set_archived_until(self, day: datetime):
+        """Record that every day before `day` is archived"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, WATERMARK_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(day.strftime(DAY_FORMAT))
+        os.replace(path + ".tmp", path)
+        self.archived_until = day
+
+    # ==================== Write ====================
+
+    def write_day(self, station_id: str, day: datetime, columns: Dict[str, Sequence]):
+        """Store one station-day of readings, oldest first, replacing an earlier copy"""
+        path = self._day_path(station_id, day)
+        temporary = path + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for name, dtype in ARCHIVE_COLUMNS.items():
+            np.save(os.path.join(temporary, f"{name}.npy"), np.asarray(columns[name], dtype=dtype))
+
+        with self._open_days_lock:
+            self._open_days.pop((station_id, day), None)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temporary, path)
+
+        self.stats["days_written"] += 1
+        self.stats["readings_written"] += len(columns["timestamp"])
+
+    def merge_day(self, station_id: str, day: datetime, columns: Dict[str, Sequence]) -> np.ndarray:
+        """
+        Add readings to a station-day, keeping the archived reading for a timestamp stored twice
+        Returns the indexes (into `columns`) of the readings that were added
+        """
+        with self._day_lock(station_id, day):
+            archived = self.load_day(station_id, day, mmap=False)
+            if archived is None:
+                archived = {name: np.empty(0, dtype=dtype) for name, dtype in ARCHIVE_COLUMNS.items()}
+            merged = {
+                name: np.concatenate([archived[name], np.asarray(columns[name], dtype=dtype)])
+                for name, dtype in ARCHIVE_COLUMNS.items()
+            }
+            # First occurrence of every timestamp, in time order
+            _, keep = np.unique(merged["timestamp"], return_index=True)
+            archived_count = len(archived["timestamp"])
+            added = np.sort(keep[keep >= archived_count]) - archived_count
+            if len(added):
+                self.write_day(station_id, day, {name: column[keep] for name, column in merged.items()})
+            return added
+
+    @contextmanager
+    def _day_lock(self, station_id: str, day: datetime):
+        """Exclusive lock on a station-day across processes and threads, waits for the holder"""
+        path = self._day_path(station_id, day) + ".lock"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a+b") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            # Closing the file releases the lock
+            yield
+
+    def day_count(self, station_id: str, day: datetime) -> int:
+        """Readings archived for a station-day"""
+        try:
+            return len(np.load(os.path.join(self._day_path(station_id, day), "timestamp.npy"), mmap_mode="r"))
+        except FileNotFoundError:
+            return 0
+
+    # ==================== Read ====================
+
+    def load_day(self, station_id: str, day: datetime, mmap: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Columns of one station-day, None if it was not archived
+        With mmap=False the files are read into memory and closed, nothing is cached
+        """
+        key = (station_id, day)
+        path = self._day_path(station_id, day)
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+        with self._open_days_lock:
+            cached = self._open_days.get(key)
+            # A day rewritten by another process (e.g. import_history.py) gets a new directory
+            if cached is not None:
+                if cached[0] == inode:
+                    self._open_days.move_to_end(key)
+                    return cached[1]
+                del self._open_days[key]
+
+        columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in ARCHIVE_COLUMNS
+        }
+        if not mmap:
+            return columns
+
+        with self._open_days_lock:
+            self._open_days[key] = (inode, columns)
+            self._open_days.move_to_end(key)
+            if len(self._open_days) > self.max_open_days:
+                self._open_days.popitem(last=False)
+        return columns
+
+    def read(self, station_id: str, start_time: datetime, end_time: datetime) -> Dict[str, np.ndarray]:
+        """
+        Archived columns of a station in [start_time, end_time), oldest first
+        A range within one day returns views of the mapped files, longer ones are concatenated
+        """
+        parts = []
+        day = day_start(start_time)
+        single_day = day + timedelta(days=1) >= end_time
+        while day < end_time:
+            columns = self.read_day(station_id, day, start_time, end_time, mmap=single_day)
+            if columns is not None:
+                parts.append(columns)
+            day += timedelta(days=1)
+
+        self.stats["reads"] += 1
+        if not parts:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in ARCHIVE_COLUMNS.items()}
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name in ARCHIVE_COLUMNS}
+
+    def read_day(
+        self,
+        station_id: str,
+        day: datetime,
+        start_time: datetime,
+        end_time: datetime,
+        mmap: bool = False
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """Archived columns of one station-day within [start_time, end_time), None if there are none"""
+        columns = self.load_day(station_id, day, mmap=mmap)
+        if columns is None:
+            return None
+        timestamps = columns["timestamp"]
+        first = int(np.searchsorted(timestamps, (start_time - EPOCH).total_seconds(), side="left"))
+        last = int(np.searchsorted(timestamps, (end_time - EPOCH).total_seconds(), side="left"))
+        if last <= first:
+            return None
+        self.stats["readings_read"] += last - first
+        return {name: column[first:last] for name, column in columns.items()}
+
+    @staticmethod
+    def documents(columns: Dict[str, np.ndarray], station_id: str, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Archived columns as reading documents, oldest first
+        Only station_id and archived fields are returned (no _id or aqi_category)
+        """
+        names = [name for name in ARCHIVE_COLUMNS if not fields or name in fields]
+        values = [
+            [EPOCH + timedelta(seconds=t) for t in columns[name].tolist()] if name == "timestamp"
+            else columns[name].tolist()
+            for name in names
+        ]
+        documents = [dict(zip(names, row)) for row in zip(*values)]
+        if not fields or "station_id" in fields:
+            for document in documents:
+                document["station_id"] = station_id
+        return documents
+
+    def get_stats(self) -> Dict:
+        """Archive watermark and read/write counters"""
+        return {
+            **self.stats,
+            "archived_until": self.archived_until,
+            "open_days": len(self._open_days)
+        }
+
+
+# Global instance, None when archiving is disabled
+cold_archive = ColdArchive(settings.archive_dir) if settings.archive_enabled else None
@@ -0,0 +1,97 @@
+"""
+Columnar export of sensor readings (Parquet / Arrow IPC)
+Each cursor batch becomes one Arrow record batch, so memory is bounded by the batch size
+"""
+import logging
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Try to import pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    logger.warning("pyarrow not available. Parquet/Arrow export is disabled.")
+    PYARROW_AVAILABLE = False
+
+
+# Columnar formats -> media type
+COLUMNAR_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    # IPC file format, readable with pandas.read_feather
+    "arrow": "application/vnd.apache.arrow.file"
+}
+
+# Readings per record batch (and Parquet row group)
+COLUMNAR_BATCH_SIZE = 50000
+
+if PYARROW_AVAILABLE:
+    # Arrow type per exportable field; timestamps are stored as naive UTC
+    COLUMN_TYPES = {
+        "station_id": pa.string(),
+        "timestamp": pa.timestamp("ms", tz="UTC"),
+        "temperature": pa.float64(),
+        "humidity": pa.float64(),
+        "air_value": pa.int32(),
+        "dust_density": pa.float64(),
+        "aqi": pa.int32(),
+        "aqi_category": pa.string()
+    }
+
+
+def columnar_schema(fields: Sequence[str]) -> "pa.Schema":
+    """Arrow schema for the exported fields, in order"""
+    return pa.schema([(field, COLUMN_TYPES[field]) for field in fields])
+
+
+def to_record_batch(readings: List[Dict], schema: "pa.Schema") -> "pa.RecordBatch":
+    """One record batch from a cursor batch, built column by column"""
+    return pa.RecordBatch.from_arrays(
+        [pa.array([reading.get(field.name) for reading in readings], type=field.type) for field in schema],
+        schema=schema
+    )
+
+
+def open_writer(sink, schema: "pa.Schema", fmt: str):
+    """Parquet or Arrow IPC file writer on a path or file object"""
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_file(sink, schema)
+
+
+class ChunkSink:
+    """
+    Write-only file object that collects what a writer produces
+    Drained after every record batch to stream the file as it is written
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """Bytes written since the last drain"""
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
@@ -0,0 +1,40 @@
+"""
+Bounded LRU window of recently seen reading keys
+Used by the ingest path to drop redelivered readings
+"""
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class DedupWindow:
+    """LRU set of keys with optional per-key expiry"""
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._keys: "OrderedDict[Hashable, Optional[float]]" = OrderedDict()
+
+    def contains(self, key: Hashable) -> bool:
+        """
+        Report whether a key is in the window without recording it
+        Keys with a ttl count as unseen once it has passed
+        """
+        expires_at = self._keys.get(key)
+        if key in self._keys and (expires_at is None or expires_at > time.monotonic()):
+            self._keys.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key: Hashable, ttl: Optional[float] = None):
+        """Record a key, evicting the least recently seen one when full"""
+        self._keys[key] = time.monotonic() + ttl if ttl is not None else None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        """Forget a key, so a redelivery of it is accepted again"""
+        self._keys.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,183 @@
+"""
+In-process device registry
+Per-station device lists kept as pre-serialized JSON, written through by the device API
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from app.database.mongo_client import db
+from app.models.device_model import DeviceResponse
+
+logger = logging.getLogger(__name__)
+
+# Fields fetched from MongoDB, exactly what DeviceResponse serializes
+DEVICE_FIELDS = tuple(DeviceResponse.model_fields)
+
+# Seconds before reopening a failed change stream
+WATCH_RETRY_SECONDS = 5.0
+
+
+def serialize_device(device: Dict) -> bytes:
+    """DeviceResponse JSON for a stored device"""
+    return DeviceResponse(**{"auto_control_enabled": False, **device}).model_dump_json().encode()
+
+
+class DeviceRegistry:
+    """
+    Devices per station, loaded from MongoDB on a station's first request
+
+    The device API writes every change through, so list and get requests are
+    answered with JSON serialized once per change. Writes from other processes
+    (or seed_devices.py) are only seen with the change stream watcher running.
+    """
+
+    def __init__(self):
+        # station_id -> device_id -> serialized device, for loaded stations only
+        self._stations: Dict[str, Dict[str, bytes]] = {}
+        # station_id -> serialized device list, rebuilt after a change
+        self._lists: Dict[str, bytes] = {}
+        # device_id -> (station_id, serialized device), for every cached device
+        self._devices: Dict[str, tuple] = {}
+        # Bumped on every change so a load racing a write is not stored
+        self._generation = 0
+        self._watch_task: Optional[asyncio.Task] = None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "change_events": 0
+        }
+
+    async def list_station(self, station_id: str) -> bytes:
+        """JSON list of a station's devices"""
+        devices = self._stations.get(station_id)
+        if devices is None:
+            self.stats["misses"] += 1
+            generation = self._generation
+            loaded = await db.get_devices(station_id, fields=DEVICE_FIELDS)
+            devices = {device["device_id"]: serialize_device(device) for device in loaded}
+            if self._generation != generation:
+                return self._join(devices)
+            self._stations[station_id] = devices
+            for device_id, data in devices.items():
+                self._devices[device_id] = (station_id, data)
+        else:
+            self.stats["hits"] += 1
+
+        data = self._lists.get(station_id)
+        if data is None:
+            data = self._lists[station_id] = self._join(devices)
+        return data
+
+    @staticmethod
+    def _join(devices: Dict[str, bytes]) -> bytes:
+        return b"[" + b",".join(devices.values()) + b"]"
+
+    async def get_device(self, device_id: str) -> Optional[bytes]:
+        """JSON of one device, None if it does not exist"""
+        cached = self._devices.get(device_id)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached[1]
+
+        self.stats["misses"] += 1
+        generation = self._generation
+        device = await db.get_device(device_id, fields=DEVICE_FIELDS)
+        if not device:
+            return None
+        data = serialize_device(device)
+        if self._generation == generation:
+            self._devices[device_id] = (device["station_id"], data)
+        return data
+
+    def put(self, device: Dict):
+        """Store a created or updated device"""
+        device_id, station_id = device["device_id"], device["station_id"]
+        self.remove(device_id)
+
+        data = serialize_device(device)
+        self._devices[device_id] = (station_id, data)
+        if station_id in self._stations:
+            self._stations[station_id][device_id] = data
+        self._changed(station_id)
+
+    def remove(self, device_id: str):
+        """Forget a deleted (or moved) device"""
+        cached = self._devices.pop(device_id, None)
+        if cached is None:
+            # A lookup still in flight must not cache it
+            self._generation += 1
+            return
+        station_id = cached[0]
+        devices = self._stations.get(station_id)
+        if devices is not None:
+            devices.pop(device_id, None)
+        self._changed(station_id)
+
+    def _changed(self, station_id: str):
+        self._lists.pop(station_id, None)
+        self._generation += 1
+        self.stats["writes"] += 1
+
+    def clear(self):
+        """Drop everything, stations are reloaded on their next request"""
+        self._generation += 1
+        self._stations.clear()
+        self._lists.clear()
+        self._devices.clear()
+
+    # ==================== Change Stream ====================
+
+    def start_watching(self):
+        """Follow the devices change stream (requires a replica set)"""
+        self._watch_task = asyncio.create_task(self._watch())
+        logger.info("Device registry watching the devices change stream")
+
+    async def stop_watching(self):
+        """Stop following the change stream"""
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        """Apply changes made by any process, reopening the stream after errors"""
+        while True:
+            try:
+                async with db.db.devices.watch(full_document="updateLookup") as stream:
+                    # Changes made while the stream was closed were missed
+                    self.clear()
+                    async for change in stream:
+                        self.stats["change_events"] += 1
+                        self._apply(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Device change stream error: {e}")
+            await asyncio.sleep(WATCH_RETRY_SECONDS)
+
+    def _apply(self, change: Dict):
+        operation = change.get("operationType")
+        document = change.get("fullDocument")
+        if operation in ("insert", "update", "replace") and document and document.get("device_id"):
+            self.put(document)
+        else:
+            # Deletes only carry the _id, which the registry does not keep
+            self.clear()
+
+    def get_stats(self) -> Dict:
+        """Cached stations, devices and hit counters"""
+        return {
+            **self.stats,
+            "stations": len(self._stations),
+            "devices": len(self._devices),
+            "watching": self._watch_task is not None
+        }
+
+
+# Global instance
+device_registry = DeviceRegistry()
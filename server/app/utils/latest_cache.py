@@ -0,0 +1,115 @@
+"""
+In-process cache of the latest reading per station
+Updated by the ingest pipeline so latest-value endpoints answer without a query
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.database.mongo_client import db
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LatestReadingCache:
+    """
+    Latest stored reading per station
+
+    Every reading this process ingests replaces the cached one if it is newer.
+    With a shared subscription, other processes store readings for the same
+    stations, so entries are re-read from MongoDB once they are older than ttl.
+    Stations without readings are remembered for negative_ttl, so requests for
+    them do not query MongoDB every time.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, negative_ttl: float = 2.0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # station_id -> (reading, time.monotonic() when cached)
+        self._readings: Dict[str, Tuple[Dict, float]] = {}
+        # station_id -> time.monotonic() of a lookup that found no reading
+        self._missing: Dict[str, float] = {}
+        # Every station with readings, re-read after ttl like the readings
+        self._station_ids: Set[str] = set()
+        self._station_ids_loaded: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, document: Dict):
+        """Cache a stored reading if it is the newest seen for its station"""
+        station_id = document.get("station_id")
+        if station_id is None:
+            return
+
+        cached = self._readings.get(station_id)
+        timestamp = document.get("timestamp")
+        if cached and isinstance(timestamp, datetime) and cached[0]["timestamp"] > timestamp:
+            return  # e.g. a spool replay of older readings
+
+        reading = document.copy()
+        if "_id" in reading:
+            reading["_id"] = str(reading["_id"])
+        self._readings[station_id] = (reading, time.monotonic())
+        self._missing.pop(station_id, None)
+        self._station_ids.add(station_id)
+
+    async def get(self, station_id: str) -> Optional[Dict]:
+        """Latest reading for a station, from memory or (on a miss) from MongoDB"""
+        cached = self._readings.get(station_id)
+        if cached and (self.ttl is None or time.monotonic() - cached[1] < self.ttl):
+            self.hits += 1
+            return cached[0]
+
+        missing = self._missing.get(station_id)
+        if missing is not None and time.monotonic() - missing < self.negative_ttl:
+            self.hits += 1
+            return None
+
+        self.misses += 1
+        started = time.perf_counter()
+        reading = await db.get_latest_reading(station_id)
+        metrics.observe_since("latest_cache_miss", started)
+
+        if reading:
+            self._readings[station_id] = (reading, time.monotonic())
+            self._missing.pop(station_id, None)
+            self._station_ids.add(station_id)
+        else:
+            self._missing[station_id] = time.monotonic()
+        return reading
+
+    async def station_ids(self) -> List[str]:
+        """Every station with readings, without a distinct query per call"""
+        loaded = self._station_ids_loaded
+        if loaded is None or (self.ttl is not None and time.monotonic() - loaded >= self.ttl):
+            self._station_ids.update(await db.get_station_ids())
+            self._station_ids_loaded = time.monotonic()
+        return list(self._station_ids)
+
+    async def warm(self):
+        """Load the latest reading of every known station"""
+        for station_id in await self.station_ids():
+            reading = await db.get_latest_reading(station_id)
+            if reading:
+                self.update(reading)
+        logger.info(f"Latest reading cache warmed with {len(self._readings)} stations")
+
+    def get_stats(self) -> Dict:
+        """Cache size and hit counters"""
+        return {
+            "stations": len(self._readings),
+            "missing": len(self._missing),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl
+        }
+
+
+# Global instance, entries only expire when other processes share the ingest load
+latest_cache = LatestReadingCache(
+    ttl=settings.latest_cache_ttl_seconds if settings.mqtt_shared_group else None,
+    negative_ttl=settings.latest_cache_ttl_seconds
+)
@@ -0,0 +1,115 @@
+"""
+In-process metrics for the reading pipeline
+Per-stage latency histograms and gauges, exposed by /metrics/pipeline
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional, Sequence
+
+# Bucket upper bounds in seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        """Record one duration"""
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (seconds)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        """Summary in milliseconds plus cumulative bucket counts"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            buckets[f"le_{ms(bound)}ms"] = cumulative
+        buckets["le_inf"] = self.count
+
+        return {
+            "count": self.count,
+            "avg_ms": ms(self.total / self.count) if self.count else None,
+            "p50_ms": ms(self.percentile(0.50)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "max_ms": ms(self.max) if self.count else None,
+            "buckets": buckets
+        }
+
+
+class PipelineMetrics:
+    """Named latency stages and gauges"""
+
+    def __init__(self):
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.gauges: Dict[str, Callable[[], object]] = {}
+        self.started_at = time.time()
+
+    def observe(self, stage: str, seconds: float):
+        """Record a stage duration"""
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def observe_since(self, stage: str, start: Optional[float]):
+        """Record the time elapsed since a time.perf_counter() value"""
+        if start is not None:
+            self.observe(stage, time.perf_counter() - start)
+
+    def register_gauge(self, name: str, read: Callable[[], object]):
+        """Register a callable that returns the current value of a gauge"""
+        self.gauges[name] = read
+
+    def reset(self):
+        """Clear all histograms"""
+        self.stages = {}
+        self.started_at = time.time()
+
+    def snapshot(self) -> Dict:
+        """All stages and current gauge values"""
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+
+        return {
+            "since": self.started_at,
+            "stages": {name: histogram.snapshot() for name, histogram in self.stages.items()},
+            "gauges": gauges
+        }
+
+
+# Global instance
+metrics = PipelineMetrics()
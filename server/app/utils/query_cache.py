@@ -0,0 +1,219 @@
+"""
+Result cache for history and stats queries
+Identical requests within the same time bucket share one MongoDB query
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Set, Tuple
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# (station_id, endpoint, params)
+CacheKey = Tuple[str, str, Hashable]
+
+
+class QueryResultCache:
+    """
+    LRU cache of query results keyed by station, endpoint, parameters and time bucket
+
+    An entry is valid until its bucket (`bucket_seconds` of wall-clock time)
+    ends. Readings ingested by this process keep entries current in between:
+    history results collect new readings in a side list that is prepended
+    once, on the next hit; other results are dropped. Readings stored while a
+    query is running are applied to its result the same way once it returns.
+    Size is bounded by the number of cached readings (a stats result counts as
+    one). Concurrent misses for the same key wait on a single query.
+    """
+
+    def __init__(self, bucket_seconds: float = 30.0, max_readings: int = 500000):
+        self.bucket_seconds = bucket_seconds
+        self.max_readings = max_readings
+        # key -> (bucket, result, size, readings added since, oldest first), least recently used first
+        self._entries: "OrderedDict[CacheKey, Tuple[int, Any, int, List[Dict]]]" = OrderedDict()
+        self._station_keys: Dict[str, Set[CacheKey]] = {}
+        self._pending: Dict[Tuple[CacheKey, int], asyncio.Task] = {}
+        # station_id -> pending query -> readings stored since it started, oldest first
+        self._arrived: Dict[str, Dict[Tuple[CacheKey, int], List[Dict]]] = {}
+        self.size = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "extended": 0,
+            "invalidated": 0,
+            "evicted": 0
+        }
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    async def get(self, station_id: str, endpoint: str, params: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached result for the current bucket, loading it on a miss"""
+        key = (station_id, endpoint, params)
+        bucket = self._bucket()
+
+        entry = self._entries.get(key)
+        if entry and entry[0] == bucket:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._trimmed(key, entry)
+
+        task = self._pending.get((key, bucket))
+        if task is None:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(self._load(key, bucket, loader))
+            self._pending[(key, bucket)] = task
+        else:
+            self.stats["coalesced"] += 1
+        # A cancelled request must not cancel the query other requests wait on
+        return await asyncio.shield(task)
+
+    async def _load(self, key: CacheKey, bucket: int, loader: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        # The query may or may not see readings stored while it runs
+        loads = self._arrived.setdefault(key[0], {})
+        arrived = loads[(key, bucket)] = []
+        try:
+            result = await loader()
+        finally:
+            del self._pending[(key, bucket)]
+            del loads[(key, bucket)]
+            if not loads:
+                self._arrived.pop(key[0], None)
+        metrics.observe_since("query_cache_miss", started)
+
+        if result and bucket == self._bucket():
+            self._store(key, bucket, result)
+            for reading in arrived:
+                if key not in self._entries:
+                    break
+                if key[1] == "history" and self._contains(result, reading.get("timestamp")):
+                    continue
+                if not self._extend(key, reading):
+                    self._remove(key)
+                    self.stats["invalidated"] += 1
+            self._evict()
+        return result
+
+    @staticmethod
+    def _contains(result: List[Dict], timestamp: Any) -> bool:
+        """Whether a history result (newest first) holds a reading with this timestamp"""
+        if not isinstance(timestamp, datetime):
+            return False
+        for reading in result:
+            if reading["timestamp"] <= timestamp:
+                return reading["timestamp"] == timestamp
+        return False
+
+    def _store(self, key: CacheKey, bucket: int, result: Any):
+        size = len(result) if isinstance(result, list) else 1
+        if size > self.max_readings:
+            return
+
+        self._remove(key)
+        self._entries[key] = (bucket, result, size, [])
+        self._station_keys.setdefault(key[0], set()).add(key)
+        self.size += size
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_readings:
+            self._remove(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry[2]
+        keys = self._station_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._station_keys[key[0]]
+
+    def _trimmed(self, key: CacheKey, entry: Tuple[int, Any, int, List[Dict]]) -> Any:
+        """History entries with the readings added since, without those that left the window"""
+        bucket, result, size, added = entry
+        if key[1] != "history":
+            return result
+
+        if added:
+            # New list: a response may still be serializing the old one
+            result = added[::-1] + result
+            self._entries[key] = (bucket, result, size, [])
+
+        start_time = datetime.utcnow() - timedelta(hours=key[2])
+        cut = len(result)
+        while cut and result[cut - 1]["timestamp"] < start_time:
+            cut -= 1
+        if not cut:
+            self._remove(key)
+        elif cut < len(result):
+            result = result[:cut]
+            self._entries[key] = (bucket, result, cut, [])
+            self.size -= size - cut
+        return result
+
+    def add_reading(self, document: Dict):
+        """Bring a station's entries up to date with a newly stored reading"""
+        station_id = document.get("station_id")
+        loads = self._arrived.get(station_id)
+        keys = self._station_keys.get(station_id)
+        if not keys and not loads:
+            return
+
+        reading = document.copy()
+        if "_id" in reading:
+            reading["_id"] = str(reading["_id"])
+        for arrived in (loads or {}).values():
+            arrived.append(reading)
+        if not keys:
+            return
+
+        for key in list(keys):
+            if not self._extend(key, reading):
+                self._remove(key)
+                self.stats["invalidated"] += 1
+        self._evict()
+
+    def _extend(self, key: CacheKey, reading: Dict) -> bool:
+        """Add a reading to a history entry, False if the entry has to be dropped instead"""
+        if key[1] != "history":
+            return False
+
+        bucket, result, size, added = self._entries[key]
+        newest = added[-1] if added else result[0]
+        timestamp = reading.get("timestamp")
+        # Older than the newest cached reading (a replay) or already included
+        if not isinstance(timestamp, datetime) or timestamp <= newest["timestamp"]:
+            return False
+
+        # O(1) per reading, merged into the result on the next hit
+        added.append(reading)
+        self._entries[key] = (bucket, result, size + 1, added)
+        self.size += 1
+        self.stats["extended"] += 1
+        return True
+
+    def get_stats(self) -> Dict:
+        """Entry count, cached readings and hit counters"""
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "readings": self.size,
+            "bucket_seconds": self.bucket_seconds
+        }
+
+
+# Global instance
+query_cache = QueryResultCache(
+    bucket_seconds=settings.query_cache_bucket_seconds,
+    max_readings=settings.query_cache_max_readings
+)
@@ -0,0 +1,193 @@
+"""
+Per-station ring buffers of recent readings as typed NumPy columns
+Filled by the ingest pipeline so prediction and short-range stats need no query
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.database.mongo_client import db
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dtype; timestamps are seconds since the epoch (naive UTC, like stored readings)
+RING_COLUMNS = {
+    "timestamp": np.float64,
+    "temperature": np.float64,
+    "humidity": np.float64,
+    "air_value": np.int32,
+    "dust_density": np.float64,
+    "aqi": np.int32
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+# /data/stats aggregates computed over a window
+WINDOW_AGGREGATES = {
+    "min": np.min,
+    "max": np.max,
+    "avg": np.mean,
+    "stddev": np.std  # population, like $stdDevPop
+}
+
+
+def to_epoch(timestamp: datetime) -> float:
+    """Seconds since the epoch for a naive UTC datetime"""
+    return (timestamp - EPOCH).total_seconds()
+
+
+def window_stats(window: Dict[str, np.ndarray], fields: Sequence[str], aggregates: Sequence[str]) -> Optional[Dict]:
+    """Statistics per field over a window, shaped like MongoDB.get_reading_stats"""
+    count = len(window["timestamp"])
+    if not count:
+        return None
+    return {
+        "count": count,
+        **{
+            field: {aggregate: WINDOW_AGGREGATES[aggregate](window[field]).item() for aggregate in aggregates}
+            for field in fields
+        }
+    }
+
+
+class ReadingRingBuffer:
+    """
+    Fixed-capacity buffer of the last `capacity` readings of one station
+
+    Every value is written twice, at i and i + capacity, so the newest k
+    readings are always one contiguous slice and windows are views into the
+    arrays instead of copies.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in RING_COLUMNS.items()}
+        self.head = 0  # next write position in [0, capacity)
+        self.size = 0
+        # Readings older than this may be missing (before startup or evicted)
+        self.covered_since: Optional[float] = None
+
+    def append(self, document: Dict) -> bool:
+        """Add a reading, returns False for one older than the newest buffered reading"""
+        timestamp = to_epoch(document["timestamp"])
+        if self.size and timestamp < self.columns["timestamp"][self.head + self.capacity - 1]:
+            return False
+
+        for name, column in self.columns.items():
+            value = timestamp if name == "timestamp" else (document.get(name) or 0)
+            column[self.head] = value
+            column[self.head + self.capacity] = value
+
+        self.head = (self.head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.covered_since = float(self.columns["timestamp"][self.head + self.capacity - self.size])
+
+        if self.covered_since is None:
+            self.covered_since = timestamp
+        return True
+
+    def window(self, count: Optional[int] = None, since: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        Read-only views of the newest readings, oldest first
+        Views share memory with the buffer, use them before the next append
+        """
+        count = self.size if count is None else min(count, self.size)
+        end = self.head + self.capacity
+        start = end - count
+
+        if since is not None:
+            timestamps = self.columns["timestamp"][start:end]
+            start += int(np.searchsorted(timestamps, to_epoch(since), side="left"))
+
+        views = {}
+        for name, column in self.columns.items():
+            view = column[start:end]
+            view.flags.writeable = False
+            views[name] = view
+        return views
+
+    def covers(self, since: datetime) -> bool:
+        """Whether every reading from `since` on is in the buffer"""
+        return self.covered_since is not None and self.covered_since <= to_epoch(since)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class RingBufferStore:
+    """Ring buffers per station, created on a station's first reading"""
+
+    def __init__(self, capacity: int = 21600, max_stations: int = 1000, complete: bool = True):
+        self.capacity = capacity
+        self.max_stations = max_stations
+        # False when other processes ingest part of the readings (shared subscription)
+        self.complete = complete
+        self.buffers: Dict[str, ReadingRingBuffer] = {}
+
+    def append(self, document: Dict):
+        """Add a stored reading to its station's buffer"""
+        station_id = document.get("station_id")
+        if station_id is None or not isinstance(document.get("timestamp"), datetime):
+            return
+
+        buffer = self.buffers.get(station_id)
+        if buffer is None:
+            if len(self.buffers) >= self.max_stations:
+                return
+            buffer = self.buffers[station_id] = ReadingRingBuffer(self.capacity)
+        buffer.append(document)
+
+    def window(self, station_id: str, count: Optional[int] = None,
+               since: Optional[datetime] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Views of a station's newest readings, oldest first
+        None if the buffer cannot be trusted to hold the whole window
+        """
+        buffer = self.buffers.get(station_id)
+        if buffer is None or not self.complete:
+            return None
+        if since is not None and not buffer.covers(since):
+            return None
+        return buffer.window(count, since)
+
+    async def warm(self, hours: int = 12):
+        """Fill each station's buffer with its latest readings from MongoDB"""
+        start_time = datetime.utcnow() - timedelta(hours=hours)
+        loaded = 0
+        for station_id in await db.get_station_ids():
+            if len(self.buffers) >= self.max_stations:
+                break
+            buffer = self.buffers.setdefault(station_id, ReadingRingBuffer(self.capacity))
+            async for batch in db.iter_history(station_id, start_time, fields=tuple(RING_COLUMNS)):
+                for document in batch:
+                    if buffer.append(document):
+                        loaded += 1
+            # Nothing older than the warmed window is needed
+            if buffer.size < buffer.capacity:
+                buffer.covered_since = to_epoch(start_time)
+        logger.info(f"Ring buffers warmed with {loaded} readings for {len(self.buffers)} stations")
+
+    def get_stats(self) -> Dict:
+        """Buffer count, fill and memory use"""
+        return {
+            "stations": len(self.buffers),
+            "capacity": self.capacity,
+            "readings": sum(len(buffer) for buffer in self.buffers.values()),
+            "bytes": sum(
+                column.nbytes for buffer in self.buffers.values() for column in buffer.columns.values()
+            ),
+            "complete": self.complete
+        }
+
+
+# Global instance
+ring_buffers = RingBufferStore(
+    capacity=settings.ring_buffer_capacity,
+    max_stations=settings.ingest_max_stations,
+    complete=not settings.mqtt_shared_group
+)
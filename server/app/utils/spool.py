@@ -0,0 +1,312 @@
+"""
+Durable on-disk spool for sensor readings
+Append-only segment files used when MongoDB is slow or down
+"""
+import asyncio
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+import bson
+from bson import ObjectId
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# fsync policies
+FSYNC_POLICIES = ("always", "interval", "never")
+
+# Record header: payload length + CRC32 of the payload
+RECORD_HEADER = struct.Struct("<II")
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".spool"
+
+# Each process owns one slot directory, held with an exclusive lock on its LOCK file
+SLOT_PREFIX = "worker-"
+LOCK_FILE = "LOCK"
+
+
+def try_lock(path: str):
+    """Open and exclusively lock a file without waiting, None if another process holds it"""
+    f = open(path, "a+b")
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class DiskSpool:
+    """
+    Append-only spool of BSON documents split into segment files
+
+    Each record is [length][crc32][bson]. A torn record at the end of a
+    segment (crash during write) is detected on read and skipped, so
+    everything written before it can still be replayed.
+
+    Several processes can share `directory`: each one writes to its own
+    locked slot (<directory>/worker-<n>), so segment numbers never collide.
+    Segments of a slot whose process is gone are moved into a live slot and
+    replayed there.
+    """
+
+    def __init__(
+        self,
+        directory: str = "spool",
+        max_bytes: int = 512 * 1024 * 1024,
+        segment_bytes: int = 8 * 1024 * 1024,
+        fsync_policy: str = "interval",
+        fsync_interval: float = 1.0
+    ):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy '{fsync_policy}'. Must be one of {FSYNC_POLICIES}")
+
+        self.root = directory
+        # This process's slot, set by open()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+
+        self._file = None
+        self._slot_lock = None
+        self._active_path: Optional[str] = None
+        self._next_segment = 0
+        self._dirty = False
+        self._last_fsync = 0.0
+        self._lock = asyncio.Lock()
+
+        self.total_bytes = 0
+        self.stats = {
+            "appended": 0,
+            "rejected": 0,
+            "replayed": 0,
+            "adopted_segments": 0,
+            "corrupt_segments": 0
+        }
+
+    def open(self):
+        """Claim a slot, take over orphaned segments and start a fresh active segment"""
+        self._claim_slot()
+
+        segments = self.segments()
+        if segments:
+            self._next_segment = self._segment_number(segments[-1]) + 1
+        # Segments written directly into the directory by earlier versions
+        self._take_segments(self.root)
+        self._adopt_orphans()
+
+        segments = self.segments()
+        self.total_bytes = sum(os.path.getsize(path) for path in segments)
+        if segments:
+            logger.warning(f"Spool has {len(segments)} segments ({self.total_bytes} bytes) pending replay")
+
+        # Segments from a previous run are sealed, new writes go to a new one
+        self._open_segment()
+
+    def close(self):
+        """Flush and close the active segment"""
+        if self._file:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+        # Do not leave empty segments behind
+        if self._active_path and os.path.exists(self._active_path) and os.path.getsize(self._active_path) == 0:
+            os.remove(self._active_path)
+
+        # Whatever is left is taken over by another process or the next start
+        if self._slot_lock:
+            self._slot_lock.close()
+            self._slot_lock = None
+
+    async def append(self, documents: List[Dict]) -> bool:
+        """
+        Append documents to the spool
+        Returns False if the disk budget would be exceeded
+        """
+        # A fixed _id makes a replay of an already stored document a no-op
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+
+        records = [self._encode(document) for document in documents]
+        size = sum(len(record) for record in records)
+
+        async with self._lock:
+            if self.total_bytes + size > self.max_bytes:
+                self.stats["rejected"] += len(documents)
+                logger.error(f"Spool full ({self.total_bytes} bytes), rejecting {len(documents)} readings")
+                return False
+
+            await asyncio.to_thread(self._write, records)
+            self.total_bytes += size
+            self.stats["appended"] += len(documents)
+        return True
+
+    async def sync_if_due(self):
+        """fsync pending writes for the 'interval' policy"""
+        if self.fsync_policy != "interval" or not self._dirty:
+            return
+        if time.monotonic() - self._last_fsync < self.fsync_interval:
+            return
+        async with self._lock:
+            await asyncio.to_thread(self._sync)
+
+    async def seal(self) -> List[str]:
+        """Close the active segment if it has data and return all sealed segments, oldest first"""
+        async with self._lock:
+            if self._file and self._file.tell() > 0:
+                await asyncio.to_thread(self._rotate)
+            # Pick up the backlog of processes that stopped since the last replay
+            await asyncio.to_thread(self._adopt_orphans)
+            return [path for path in self.segments() if path != self._active_path]
+
+    def read_segment(self, path: str) -> Iterator[Dict]:
+        """Yield documents from a segment, stopping at the first torn or corrupt record"""
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if not header:
+                    return
+                if len(header) < RECORD_HEADER.size:
+                    self._report_corrupt(path, "truncated record header")
+                    return
+
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    self._report_corrupt(path, "torn or corrupt record")
+                    return
+
+                yield bson.decode(payload)
+
+    def remove_segment(self, path: str, replayed: int):
+        """Delete a segment once all its documents are stored"""
+        size = os.path.getsize(path)
+        os.remove(path)
+        self.total_bytes = max(0, self.total_bytes - size)
+        self.stats["replayed"] += replayed
+
+    def segments(self) -> List[str]:
+        """All segment files, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def has_backlog(self) -> bool:
+        """Whether any spooled readings are waiting for replay"""
+        return self.total_bytes > 0
+
+    def get_stats(self) -> Dict:
+        """Spool counters and disk usage"""
+        return {
+            **self.stats,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "fsync_policy": self.fsync_policy
+        }
+
+    @staticmethod
+    def _encode(document: Dict) -> bytes:
+        payload = bson.encode(document)
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def _write(self, records: List[bytes]):
+        if self._file.tell() >= self.segment_bytes:
+            self._rotate()
+
+        self._file.write(b"".join(records))
+        self._file.flush()
+        self._dirty = True
+
+        if self.fsync_policy == "always":
+            self._sync()
+        elif self.fsync_policy == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sync()
+
+    def _sync(self):
+        if self._file and self._dirty and self.fsync_policy != "never":
+            os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._open_segment()
+
+    def _claim_slot(self):
+        """Lock the first slot no other process holds"""
+        slot = 0
+        while True:
+            path = os.path.join(self.root, f"{SLOT_PREFIX}{slot}")
+            os.makedirs(path, exist_ok=True)
+            lock = try_lock(os.path.join(path, LOCK_FILE))
+            if lock is not None:
+                self.directory, self._slot_lock = path, lock
+                return
+            slot += 1
+
+    def _adopt_orphans(self):
+        """Move the segments of unlocked slots into this slot, numbered after ours"""
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if not name.startswith(SLOT_PREFIX) or path == self.directory or not os.path.isdir(path):
+                continue
+            lock = try_lock(os.path.join(path, LOCK_FILE))
+            if lock is None:
+                continue
+            try:
+                self._take_segments(path)
+            finally:
+                lock.close()
+
+    def _take_segments(self, path: str):
+        for name in sorted(os.listdir(path)):
+            if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)):
+                continue
+            source = os.path.join(path, name)
+            target = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self._next_segment:08d}{SEGMENT_SUFFIX}")
+            try:
+                os.replace(source, target)
+            except FileNotFoundError:
+                # Taken by another process starting at the same time
+                continue
+            self._next_segment += 1
+            self.total_bytes += os.path.getsize(target)
+            self.stats["adopted_segments"] += 1
+            logger.info(f"Spool: took over {source} as {target}")
+
+    def _open_segment(self):
+        name = f"{SEGMENT_PREFIX}{self._next_segment:08d}{SEGMENT_SUFFIX}"
+        self._next_segment += 1
+        self._active_path = os.path.join(self.directory, name)
+        self._file = open(self._active_path, 'ab')
+
+    @staticmethod
+    def _segment_number(path: str) -> int:
+        name = os.path.basename(path)
+        return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+    def _report_corrupt(self, path: str, reason: str):
+        self.stats["corrupt_segments"] += 1
+        logger.warning(f"Spool segment {path}: {reason}, ignoring the rest of the segment")
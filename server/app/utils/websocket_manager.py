@@ -1,7 +1,11 @@
 from fastapi import WebSocket
 from fastapi.encoders import jsonable_encoder
 from typing import List
+import json
 import logging
+import time
+
+from app.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -26,15 +30,22 @@ class ConnectionManager:
             
         logger.info(f"Broadcasting to {len(self.active_connections)} clients")
         
-        json_compatible_message = jsonable_encoder(message)
+        # Encode once instead of once per client in send_json
+        started = time.perf_counter()
+        text = json.dumps(jsonable_encoder(message), separators=(",", ":"), ensure_ascii=False)
+        metrics.observe_since("broadcast_encode", started)
 
+        started = time.perf_counter()
         # Iterate over a copy of the list to avoid modification issues during iteration
         for connection in self.active_connections[:]:
             try:
-                await connection.send_json(json_compatible_message)
+                await connection.send_text(text)
             except Exception as e:
                 logger.error(f"Error sending to client: {e}")
                 self.disconnect(connection)
+        metrics.observe_since("broadcast_send", started)
 
 # Global instance
 manager = ConnectionManager()
+
+metrics.register_gauge("websocket_connections", lambda: len(manager.active_connections))
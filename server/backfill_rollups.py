@@ -0,0 +1,70 @@
+"""
+Rebuild the 1-minute and 1-hour rollups from raw sensor readings
+Run this script once after enabling rollups, or to repair them
+
+Buckets are recomputed server-side ($dateTrunc + $group) and written with
+$merge, replacing whatever the rollup collections held for those buckets.
+Hours whose raw readings may already have expired (RETENTION_RAW_DAYS)
+are skipped, so their rollups are never overwritten with partial data.
+Requires MongoDB 5.0+.
+
+Usage (from the server directory):
+    python backfill_rollups.py                    # all readings, all stations
+    python backfill_rollups.py --days 30 --station station_01
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append('.')
+
+from app.database.mongo_client import db, ROLLUP_RESOLUTIONS, rollup_bucket
+
+
+async def backfill(days, station_id):
+    """Recompute rollups for completed hours"""
+    await db.connect_db()
+
+    # The current hour is still being updated by the ingest pipeline, leave it alone
+    until = rollup_bucket(datetime.utcnow(), "1h")
+    start = until - timedelta(days=days) if days else None
+
+    # Do not replace rollups of hours whose raw readings already expired
+    raw_start = await db.complete_raw_start()
+    if raw_start and (start is None or start < raw_start):
+        print(f"⚠️  Raw readings before {raw_start} may have expired, starting there")
+        start = raw_start
+
+    started = time.time()
+    await db.rebuild_rollups(start, until, station_id)
+
+    for resolution, (collection, _) in ROLLUP_RESOLUTIONS.items():
+        query = {"bucket": {"$lt": until}}
+        if start:
+            query["bucket"]["$gte"] = start
+        if station_id:
+            query["station_id"] = station_id
+        buckets = await db.db[collection].count_documents(query)
+        print(f"✅ {resolution}: {buckets} buckets in '{collection}'")
+    print(f"   Done in {time.time() - started:.1f}s")
+
+    await db.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild sensor reading rollups from raw readings")
+    parser.add_argument("--days", type=int, default=None, help="Only the last N days (default: everything)")
+    parser.add_argument("--station", default=None, help="Only this station")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  Backfilling 1-minute and 1-hour rollups")
+    print("=" * 60)
+    asyncio.run(backfill(args.days, args.station))
+
+
+if __name__ == "__main__":
+    main()
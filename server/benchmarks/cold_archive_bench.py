@@ -0,0 +1,142 @@
+"""
+Cold archive scan benchmark: memory-mapped .npy columns vs MongoDB
+Archives synthetic days of readings for one station into a temporary directory
+and into a scratch database, then times a full-range scan (mean of every column)
+from each. Each archive scan reads the files anew, with the files in the page cache
+
+Usage (from the server directory, MongoDB on MONGODB_URL):
+    python benchmarks/cold_archive_bench.py --days 30 --interval 2
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append('.')
+
+from app.config import settings
+from app.database.mongo_client import db
+from app.utils.cold_archive import ARCHIVE_COLUMNS, ColdArchive, EPOCH, day_start
+from benchmarks.timeseries_storage_bench import generate_readings
+
+STATION_ID = "station_01"
+NUMERIC_COLUMNS = [name for name in ARCHIVE_COLUMNS if name != "timestamp"]
+
+
+def archive_readings(archive: ColdArchive, readings) -> int:
+    """Write the readings day by day, like the archive job"""
+    days = 0
+    columns, day = None, None
+    for reading in readings:
+        reading_day = day_start(reading["timestamp"])
+        if reading_day != day:
+            if columns:
+                archive.write_day(STATION_ID, day, columns)
+                days += 1
+            columns, day = {name: [] for name in ARCHIVE_COLUMNS}, reading_day
+        for name, values in columns.items():
+            values.append((reading["timestamp"] - EPOCH).total_seconds() if name == "timestamp" else reading[name])
+    if columns:
+        archive.write_day(STATION_ID, day, columns)
+        days += 1
+    return days
+
+
+def scan_archive(directory: str, start: datetime, end: datetime) -> dict:
+    """Column means over the range from the archive"""
+    archive = ColdArchive(directory)
+    columns = archive.read(STATION_ID, start, end)
+    means = {name: float(np.mean(columns[name])) for name in NUMERIC_COLUMNS}
+    return {
+        "readings": len(columns["timestamp"]),
+        "bytes": sum(column.nbytes for column in columns.values()),
+        "means": means
+    }
+
+
+async def scan_mongo(start: datetime, end: datetime) -> dict:
+    """Column means over the range from MongoDB"""
+    sums = dict.fromkeys(NUMERIC_COLUMNS, 0.0)
+    count = 0
+    async for batch in db.iter_history(STATION_ID, start, end, tuple(ARCHIVE_COLUMNS), 5000):
+        for reading in batch:
+            for name in NUMERIC_COLUMNS:
+                sums[name] += reading[name]
+        count += len(batch)
+    return {"readings": count, "means": {name: total / count for name, total in sums.items()}}
+
+
+async def bench(args):
+    settings.mongodb_db_name = args.database
+    settings.sensor_storage = "standard"
+    await db.connect_db()
+    await db.readings().delete_many({})
+
+    end = day_start(datetime.utcnow())
+    start = end - timedelta(days=args.days)
+
+    batch = []
+    for reading in generate_readings(STATION_ID, args.days, args.interval, end):
+        batch.append(reading)
+        if len(batch) >= 5000:
+            await db.readings().insert_many(batch)
+            batch = []
+    if batch:
+        await db.readings().insert_many(batch)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        days = archive_readings(ColdArchive(directory), generate_readings(STATION_ID, args.days, args.interval, end))
+        print(f"Archived {days} days into {directory}")
+
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            row = scan_archive(directory, start, end)
+            samples.append((time.perf_counter() - started) * 1000)
+        results["cold archive"] = {**row, "ms": statistics.median(samples)}
+
+    started = time.perf_counter()
+    results["mongodb"] = await scan_mongo(start, end)
+    results["mongodb"]["ms"] = (time.perf_counter() - started) * 1000
+
+    if not args.keep:
+        await db.client.drop_database(args.database)
+    await db.close_db()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold archive and MongoDB scans")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval", type=int, default=2, help="Seconds between readings (ESP32 loop: 2)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", default="air_quality_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"  {args.days}-day scan: cold archive vs MongoDB")
+    print("=" * 72)
+
+    results = asyncio.run(bench(args))
+
+    print(f"{'':22s} {'Readings':>10s} {'ms':>10s} {'Readings/s':>12s} {'GB/s':>8s}")
+    for name, row in results.items():
+        rate = row["readings"] / (row["ms"] / 1000)
+        gbps = f"{row['bytes'] / (row['ms'] / 1000) / 1e9:.2f}" if "bytes" in row else "-"
+        print(f"{name:22s} {row['readings']:>10d} {row['ms']:>10.1f} {rate:>12.0f} {gbps:>8s}")
+
+    archived, stored = results["cold archive"]["means"], results["mongodb"]["means"]
+    mismatched = [name for name in NUMERIC_COLUMNS if not np.isclose(archived[name], stored[name])]
+    print(f"\nColumn means match: {'yes' if not mismatched else 'no (' + ', '.join(mismatched) + ')'}")
+
+
+if __name__ == "__main__":
+    main()
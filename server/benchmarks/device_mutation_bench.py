@@ -0,0 +1,121 @@
+"""
+Device mutation benchmark: get/update/get vs find_one_and_update
+Loads synthetic devices into a scratch database and times toggling random
+devices the old way (three round trips, only the (station_id, device_id)
+index) and through MongoDB.toggle_device (one round trip, unique device_id index)
+
+Usage (from the server directory, MongoDB on MONGODB_URL):
+    python benchmarks/device_mutation_bench.py --devices 100000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.append('.')
+
+from app.config import settings
+from app.database.mongo_client import db
+
+DEVICE_INDEX = "device_id_1"
+
+
+async def load_devices(count: int, stations: int):
+    """Insert `count` devices spread over `stations` stations"""
+    now = datetime.utcnow()
+    batch = []
+    for index in range(count):
+        batch.append({
+            "device_id": f"device_{index:012x}",
+            "station_id": f"station_{index % stations + 1:02d}",
+            "name": f"Device {index}",
+            "icon": "Fan",
+            "color": "blue",
+            "device_type": "fan",
+            "is_on": False,
+            "auto_control_enabled": False,
+            "created_at": now,
+            "updated_at": now
+        })
+        if len(batch) >= 10000:
+            await db.db.devices.insert_many(batch)
+            batch = []
+    if batch:
+        await db.db.devices.insert_many(batch)
+
+
+async def toggle_three_round_trips(device_id: str, is_on: bool):
+    """Previous toggle endpoint: existence check, update, re-read"""
+    if not await db.get_device(device_id, fields=("_id",)):
+        return None
+    await db.db.devices.update_one(
+        {"device_id": device_id},
+        {"$set": {"is_on": is_on, "updated_at": datetime.utcnow()}}
+    )
+    return await db.get_device(device_id)
+
+
+async def measure(toggle, device_ids) -> dict:
+    """Latency percentiles (ms) of toggling each device"""
+    samples = []
+    for device_id in device_ids:
+        started = time.perf_counter()
+        await toggle(device_id, random.random() < 0.5)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[int(len(samples) * 0.99) - 1],
+        "ops": len(samples) / (sum(samples) / 1000)
+    }
+
+
+async def bench(args):
+    settings.mongodb_db_name = args.database
+    await db.connect_db()
+    await db.db.devices.delete_many({})
+    await load_devices(args.devices, args.stations)
+
+    random.seed(0)
+    device_ids = [f"device_{random.randrange(args.devices):012x}" for _ in range(args.operations)]
+
+    results = {}
+    await db.db.devices.drop_index(DEVICE_INDEX)
+    results["3 round trips, compound index only"] = await measure(toggle_three_round_trips, device_ids)
+
+    await db.db.devices.create_index("device_id", unique=True)
+    results["3 round trips, device_id index"] = await measure(toggle_three_round_trips, device_ids)
+    results["find_one_and_update, device_id index"] = await measure(db.toggle_device, device_ids)
+
+    if not args.keep:
+        await db.client.drop_database(args.database)
+    await db.close_db()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare device toggle round trips and indexes")
+    parser.add_argument("--devices", type=int, default=100000)
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--operations", type=int, default=500, help="Toggles per variant")
+    parser.add_argument("--database", default="air_quality_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"  Toggling devices among {args.devices}")
+    print("=" * 72)
+
+    results = asyncio.run(bench(args))
+
+    print(f"{'':38s} {'p50 ms':>8s} {'p99 ms':>8s} {'ops/s':>8s}")
+    for name, row in results.items():
+        print(f"{name:38s} {row['p50']:>8.2f} {row['p99']:>8.2f} {row['ops']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark MQTT listener modes against a local broker
+Compares the paho thread listener with the asyncio listener:
+messages per second and publish-to-process latency
+
+Usage (from the server directory, with e.g. Mosquitto on localhost:1883):
+    python benchmarks/mqtt_listener_bench.py --messages 20000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+# Add parent directory to path
+sys.path.append('.')
+
+import paho.mqtt.client as mqtt
+
+from app.config import settings
+from app.mqtt_listener import MQTTListener, AsyncMQTTListener, AIOMQTT_AVAILABLE
+
+
+def make_recording_listener(base_class, expected: int, done: asyncio.Event):
+    """Listener subclass that records latency instead of storing readings"""
+
+    class RecordingListener(base_class):
+        def __init__(self):
+            super().__init__()
+            self.latencies = []
+            self.first_at = None
+            self.last_at = None
+
+        async def process_sensor_data(self, data: dict, topic=None, received_at=None):
+            now = time.time()
+            if self.first_at is None:
+                self.first_at = now
+            self.last_at = now
+            self.latencies.append(now - data["sentAt"])
+            if len(self.latencies) >= expected:
+                done.set()
+
+    return RecordingListener()
+
+
+def publish(broker: str, port: int, topic: str, count: int, rate: float, window: int):
+    """
+    Publish sensor payloads from a separate thread
+    Up to `window` QoS 1 messages are in flight, so the publisher's round trip
+    does not cap the rate; throughput is measured at the subscriber
+    """
+    client = mqtt.Client(client_id=f"bench_pub_{uuid.uuid4().hex[:8]}")
+    client.max_inflight_messages_set(window)
+    client.connect(broker, port, 60)
+    client.loop_start()
+
+    in_flight = deque()
+    interval = 1.0 / rate if rate > 0 else 0
+    for i in range(count):
+        payload = {
+            "temperature": 28.5,
+            "humidity": 65.2,
+            "airValue": 245,
+            "dustDensity": 35.6,
+            "sentAt": time.time()
+        }
+        in_flight.append(client.publish(topic, json.dumps(payload), qos=1))
+        if len(in_flight) >= window:
+            in_flight.popleft().wait_for_publish()
+        if interval:
+            time.sleep(interval)
+
+    for info in in_flight:
+        info.wait_for_publish()
+
+    client.loop_stop()
+    client.disconnect()
+
+
+async def run_mode(mode: str, args) -> dict:
+    """Run one listener mode and collect results"""
+    base_class = AsyncMQTTListener if mode == "asyncio" else MQTTListener
+    done = asyncio.Event()
+    listener = make_recording_listener(base_class, args.messages, done)
+
+    # Quiet the per-message logging so it does not dominate the measurement
+    listener.parse_payload = lambda raw: json.loads(raw.decode())
+
+    listener.start(asyncio.get_running_loop())
+    await asyncio.sleep(1.0)  # Let the subscription settle
+
+    publisher = threading.Thread(
+        target=publish,
+        args=(args.broker, args.port, settings.mqtt_topic, args.messages, args.rate, args.window)
+    )
+    publisher.start()
+
+    try:
+        await asyncio.wait_for(done.wait(), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        print(f"  [{mode}] timed out with {len(listener.latencies)}/{args.messages} messages")
+
+    publisher.join()
+    listener.stop()
+
+    latencies = sorted(listener.latencies)
+    elapsed = (listener.last_at - listener.first_at) if latencies else 0
+    return {
+        "mode": mode,
+        "received": len(latencies),
+        "msgs_per_sec": len(latencies) / elapsed if elapsed else 0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+        "max_ms": latencies[-1] * 1000 if latencies else 0
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark MQTT listener modes")
+    parser.add_argument("--broker", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=0, help="Messages per second (0 = as fast as possible)")
+    parser.add_argument("--window", type=int, default=1000, help="QoS 1 messages in flight at the publisher")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    settings.mqtt_broker = args.broker
+    settings.mqtt_port = args.port
+    settings.mqtt_topic = f"bench/{uuid.uuid4().hex[:8]}/airquality"
+
+    modes = ["thread"]
+    if AIOMQTT_AVAILABLE:
+        modes.append("asyncio")
+    else:
+        print("aiomqtt not installed, skipping asyncio mode")
+
+    print("=" * 60)
+    print(f"  MQTT listener benchmark ({args.messages} messages, {args.broker}:{args.port})")
+    print("=" * 60)
+
+    results = []
+    for mode in modes:
+        settings.mqtt_client_id = f"bench_listener_{mode}_{uuid.uuid4().hex[:8]}"
+        results.append(await run_mode(mode, args))
+
+    print(f"{'mode':10s} {'received':>10s} {'msg/s':>10s} {'p50 ms':>10s} {'p99 ms':>10s} {'max ms':>10s}")
+    for r in results:
+        print(
+            f"{r['mode']:10s} {r['received']:>10d} {r['msgs_per_sec']:>10.0f} "
+            f"{r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} {r['max_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark for sensor payload decoding
+Compares the previous path (json.loads + field check + int()/float())
+with decode_sensor_payload, per message
+
+Usage (from the server directory):
+    # Capture real payloads first, one per line
+    mosquitto_sub -h broker.hivemq.com -t home/trungvu/airquality > payloads.ndjson
+    python benchmarks/payload_decode_bench.py --input payloads.ndjson
+
+Without --input, payloads are generated in the firmware's format (see sendToMQTT in network.h).
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+
+# Add parent directory to path
+sys.path.append('.')
+
+from app.models.sensor_payload import decode_sensor_payload, PayloadError, MSGSPEC_AVAILABLE
+
+
+def load_payloads(path: str) -> list:
+    """Read captured payloads, one per line"""
+    with open(path, 'rb') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def generate_payloads(count: int) -> list:
+    """Generate payloads formatted like the ESP32 firmware (String(value, 2))"""
+    random.seed(42)
+    payloads = []
+    for _ in range(count):
+        payload = "{"
+        payload += f"\"temperature\":{random.uniform(20, 40):.2f},"
+        payload += f"\"humidity\":{random.uniform(30, 90):.2f},"
+        payload += f"\"airValue\":{random.randint(50, 600)},"
+        payload += f"\"dustDensity\":{random.uniform(0, 300):.2f}"
+        payload += "}"
+        payloads.append(payload.encode())
+    return payloads
+
+
+def legacy_decode(raw: bytes):
+    """The decode/validate/convert steps of the previous on_message + process_sensor_data"""
+    data = json.loads(raw.decode())
+    required_fields = ['temperature', 'humidity', 'airValue', 'dustDensity']
+    if not all(field in data for field in required_fields):
+        return None
+    return (
+        int(data['airValue']),
+        float(data['temperature']),
+        float(data['humidity']),
+        float(data['dustDensity'])
+    )
+
+
+def compiled_decode(raw: bytes):
+    """decode_sensor_payload + the remaining int() conversion"""
+    try:
+        payload = decode_sensor_payload(raw)
+    except PayloadError:
+        return None
+    return (int(payload.airValue), payload.temperature, payload.humidity, payload.dustDensity)
+
+
+def bench(func, payloads: list, repeat: int) -> float:
+    """Best-of-repeat nanoseconds per message"""
+    def run():
+        for raw in payloads:
+            func(raw)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best / len(payloads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sensor payload decoding")
+    parser.add_argument("--input", help="NDJSON file of captured payloads")
+    parser.add_argument("--count", type=int, default=100000, help="Generated payloads when no --input")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.input) if args.input else generate_payloads(args.count)
+    source = args.input or "generated (firmware format)"
+
+    # Both paths must agree before timing them
+    mismatches = sum(1 for raw in payloads if legacy_decode(raw) != compiled_decode(raw))
+
+    print("=" * 60)
+    print(f"  Payload decode benchmark: {len(payloads)} payloads from {source}")
+    print(f"  Decoder backend: {'msgspec' if MSGSPEC_AVAILABLE else 'json fallback'}")
+    print("=" * 60)
+
+    legacy_ns = bench(legacy_decode, payloads, args.repeat)
+    compiled_ns = bench(compiled_decode, payloads, args.repeat)
+
+    print(f"{'legacy (json + checks)':30s} {legacy_ns:>10.0f} ns/msg")
+    print(f"{'decode_sensor_payload':30s} {compiled_ns:>10.0f} ns/msg")
+    print(f"{'speedup':30s} {legacy_ns / compiled_ns:>10.2f}x")
+    print(f"{'result mismatches':30s} {mismatches:>10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+7-day history benchmark: full documents vs projected fields
+Loads a synthetic week of readings for one station into a scratch database and
+times get_history(hours=168) with and without the chart projection used by
+/stations/{id}/history, reporting bytes received, peak Python memory and latency
+
+Usage (from the server directory, MongoDB on MONGODB_URL):
+    python benchmarks/projection_bench.py --interval 2
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.append('.')
+
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+from app.config import settings
+from app.database.mongo_client import db, projection
+from app.routers.data_api import CHART_FIELDS
+from benchmarks.timeseries_storage_bench import generate_readings
+
+STATION_ID = "station_01"
+HOURS = 168
+
+
+async def wire_bytes(fields) -> int:
+    """Total BSON size of the documents MongoDB sends for the query"""
+    raw = db.readings().with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+    total = 0
+    async for document in raw.find({"station_id": STATION_ID}, projection(fields)):
+        total += len(document.raw)
+    return total
+
+
+async def measure(fields, repeat: int) -> dict:
+    """Median latency (ms) and peak traced memory (MB) of get_history"""
+    await db.get_history(STATION_ID, HOURS, fields)  # warm the cache
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await db.get_history(STATION_ID, HOURS, fields)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    readings = await db.get_history(STATION_ID, HOURS, fields)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "readings": len(readings),
+        "ms": statistics.median(samples),
+        "peak_mb": peak / 1e6,
+        "wire_mb": await wire_bytes(fields) / 1e6
+    }
+
+
+async def bench(args):
+    settings.mongodb_db_name = args.database
+    settings.sensor_storage = "standard"
+    await db.connect_db()
+    await db.readings().delete_many({})
+
+    batch = []
+    for reading in generate_readings(STATION_ID, 7, args.interval, datetime.utcnow()):
+        batch.append(reading)
+        if len(batch) >= 5000:
+            await db.readings().insert_many(batch)
+            batch = []
+    if batch:
+        await db.readings().insert_many(batch)
+
+    results = {
+        "full documents": await measure(None, args.repeat),
+        "chart projection": await measure(CHART_FIELDS, args.repeat)
+    }
+
+    if not args.keep:
+        await db.client.drop_database(args.database)
+    await db.close_db()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and projected 7-day history reads")
+    parser.add_argument("--interval", type=int, default=2, help="Seconds between readings (ESP32 loop: 2)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", default="air_quality_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"  get_history(hours={HOURS}): full documents vs {', '.join(CHART_FIELDS)}")
+    print("=" * 72)
+
+    results = asyncio.run(bench(args))
+
+    print(f"{'':18s} {'Readings':>10s} {'Wire MB':>10s} {'Python MB':>10s} {'p50 ms':>10s}")
+    for name, row in results.items():
+        print(f"{name:18s} {row['readings']:>10d} {row['wire_mb']:>10.2f} {row['peak_mb']:>10.2f} {row['ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
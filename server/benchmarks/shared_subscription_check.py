@@ -0,0 +1,156 @@
+"""
+Check and benchmark MQTT v5 shared subscription ingest against a local broker
+Starts several listener processes in one shared group, publishes numbered
+readings and verifies every reading was received by exactly one process
+
+Usage (from the server directory, with e.g. Mosquitto 2.x on localhost:1883):
+    python benchmarks/shared_subscription_check.py --processes 4 --messages 20000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+import uuid
+from collections import Counter
+
+# Add parent directory to path
+sys.path.append('.')
+
+import paho.mqtt.client as mqtt
+
+
+def run_listener(broker: str, port: int, topic: str, group: str, mode: str,
+                 expected: int, ready, results, timeout: float):
+    """Run one listener process and report the sequence numbers it received"""
+    from app.config import settings
+
+    settings.mqtt_broker = broker
+    settings.mqtt_port = port
+    settings.mqtt_topic = topic
+    settings.mqtt_shared_group = group
+    settings.mqtt_client_id = "bench_shared"
+
+    from app.mqtt_listener import MQTTListener, AsyncMQTTListener, listener_client_id
+
+    base_class = AsyncMQTTListener if mode == "asyncio" else MQTTListener
+
+    class RecordingListener(base_class):
+        def __init__(self):
+            super().__init__()
+            self.received = []
+            self.last_at = time.time()
+
+        def parse_payload(self, raw: bytes):
+            return json.loads(raw.decode())
+
+        async def process_sensor_data(self, data: dict, topic=None, received_at=None):
+            self.received.append(data["seq"])
+            self.last_at = time.time()
+
+    async def main():
+        listener = RecordingListener()
+        listener.start(asyncio.get_running_loop())
+        await asyncio.sleep(1.0)  # Let the subscription settle
+        ready.release()
+
+        # Stop once the stream has been quiet for a while
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            await asyncio.sleep(0.5)
+            if listener.received and time.time() - listener.last_at > 2.0:
+                break
+
+        listener.stop()
+        results.put((listener_client_id(), listener.received))
+
+    asyncio.run(main())
+
+
+def publish(broker: str, port: int, topic: str, count: int, stations: int):
+    """Publish numbered readings spread across several station topics"""
+    client = mqtt.Client(client_id=f"bench_pub_{uuid.uuid4().hex[:8]}")
+    client.connect(broker, port, 60)
+    client.loop_start()
+
+    for seq in range(count):
+        station_topic = topic.replace("+", f"station_{seq % stations:02d}")
+        payload = {
+            "temperature": 28.5,
+            "humidity": 65.2,
+            "airValue": 245,
+            "dustDensity": 35.6,
+            "seq": seq
+        }
+        client.publish(station_topic, json.dumps(payload), qos=1).wait_for_publish()
+
+    client.loop_stop()
+    client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check MQTT v5 shared subscription ingest")
+    parser.add_argument("--broker", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--mode", choices=["thread", "asyncio"], default="thread")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    topic = f"bench/{uuid.uuid4().hex[:8]}/+/airquality"
+    group = f"ingest_{uuid.uuid4().hex[:6]}"
+
+    print("=" * 60)
+    print(f"  Shared subscription check: {args.processes} processes, group '{group}'")
+    print("=" * 60)
+
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Semaphore(0)
+    results = ctx.Queue()
+
+    workers = [
+        ctx.Process(
+            target=run_listener,
+            args=(args.broker, args.port, topic, group, args.mode,
+                  args.messages, ready, results, args.timeout)
+        )
+        for _ in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.acquire()
+
+    started = time.time()
+    publish(args.broker, args.port, topic, args.messages, args.stations)
+    published = time.time() - started
+
+    received = [results.get(timeout=args.timeout) for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    counts = Counter()
+    for client_id, seqs in received:
+        counts.update(seqs)
+        print(f"  {client_id:45s} {len(seqs):>8d} readings")
+
+    missing = args.messages - len(counts)
+    duplicated = sum(1 for c in counts.values() if c > 1)
+    client_ids = [client_id for client_id, _ in received]
+
+    print("-" * 60)
+    print(f"Published:        {args.messages} in {published:.2f}s ({args.messages / published:.0f} msg/s)")
+    print(f"Unique client IDs: {len(set(client_ids)) == len(client_ids)}")
+    print(f"Missing:          {missing}")
+    print(f"Duplicated:       {duplicated}")
+
+    ok = missing == 0 and duplicated == 0 and len(set(client_ids)) == len(client_ids)
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
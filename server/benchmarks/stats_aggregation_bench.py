@@ -0,0 +1,128 @@
+"""
+/data/stats benchmark: Python statistics over get_history vs a MongoDB $group
+Loads a synthetic week of readings for one station into a scratch database,
+then reports response time and peak Python memory for windows of 1 to 168 hours
+
+Usage (from the server directory, MongoDB on MONGODB_URL):
+    python benchmarks/stats_aggregation_bench.py --interval 2
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append('.')
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.config import settings
+from app.database.mongo_client import db
+from benchmarks.timeseries_storage_bench import generate_readings
+
+STATION_ID = "station_01"
+WINDOWS = (1, 6, 24, 72, 168)
+
+
+async def python_stats(hours: int) -> dict:
+    """The previous /data/stats: every reading into Python, then min/max/sum per field"""
+    readings = await db.get_history(STATION_ID, hours)
+    temps = [r['temperature'] for r in readings]
+    hums = [r['humidity'] for r in readings]
+    air_vals = [r['air_value'] for r in readings]
+    dusts = [r['dust_density'] for r in readings]
+    aqis = [r.get('aqi', 0) for r in readings]
+    return {
+        name: {"min": min(values), "max": max(values), "avg": sum(values) / len(values)}
+        for name, values in (("temperature", temps), ("humidity", hums), ("air_value", air_vals),
+                             ("dust_density", dusts), ("aqi", aqis))
+    }
+
+
+async def pipeline_stats(hours: int) -> dict:
+    """The $match + $group pipeline behind /data/stats"""
+    return await db.get_reading_stats(STATION_ID, hours)
+
+
+async def measure(run, hours: int, repeat: int) -> dict:
+    """Median time (ms) and peak traced memory (MB) of one stats call"""
+    await run(hours)  # warm the cache
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run(hours)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    await run(hours)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ms": statistics.median(samples), "peak_mb": peak / 1e6}
+
+
+async def bench(args):
+    settings.mongodb_db_name = args.database
+    settings.sensor_storage = "standard"
+    await db.connect_db()
+    await db.client.drop_database(args.database)
+    await db.readings().create_index([("station_id", ASCENDING), ("timestamp", DESCENDING)])
+
+    batch = []
+    loaded = 0
+    for reading in generate_readings(STATION_ID, 7, args.interval, datetime.utcnow()):
+        batch.append(reading)
+        if len(batch) >= 5000:
+            await db.readings().insert_many(batch)
+            loaded += len(batch)
+            batch = []
+    if batch:
+        await db.readings().insert_many(batch)
+        loaded += len(batch)
+    print(f"Loaded {loaded} readings (one every {args.interval}s)")
+
+    rows = []
+    for hours in WINDOWS:
+        readings = await db.readings().count_documents({
+            "station_id": STATION_ID,
+            "timestamp": {"$gte": datetime.utcnow() - timedelta(hours=hours)}
+        })
+        rows.append((
+            hours,
+            readings,
+            await measure(python_stats, hours, args.repeat),
+            await measure(pipeline_stats, hours, args.repeat)
+        ))
+
+    if not args.keep:
+        await db.client.drop_database(args.database)
+    await db.close_db()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Python and MongoDB-side /data/stats")
+    parser.add_argument("--interval", type=int, default=2, help="Seconds between readings (ESP32 loop: 2)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", default="air_quality_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("  /data/stats: get_history + Python vs $match + $group")
+    print("=" * 78)
+
+    rows = asyncio.run(bench(args))
+
+    print(f"{'Hours':>6s} {'Readings':>10s} {'Python ms':>11s} {'Python MB':>11s} {'$group ms':>11s} {'$group MB':>11s}")
+    for hours, readings, python, pipeline in rows:
+        print(f"{hours:>6d} {readings:>10d} {python['ms']:>11.1f} {python['peak_mb']:>11.2f} "
+              f"{pipeline['ms']:>11.1f} {pipeline['peak_mb']:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
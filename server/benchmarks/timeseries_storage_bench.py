@@ -0,0 +1,171 @@
+"""
+Storage and query benchmark: plain collection vs time-series collection
+Loads the same synthetic week of readings into both layouts of a scratch
+database, then compares collStats sizes and the latency of the queries the
+API runs (get_latest_reading, get_history for 1h / 24h / 168h)
+
+Usage (from the server directory, MongoDB 5.0+ on MONGODB_URL):
+    python benchmarks/timeseries_storage_bench.py --stations 3 --interval 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append('.')
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+
+from app.config import settings
+from app.models.aqi_model import aqi_calculator
+
+
+def generate_readings(station_id: str, days: int, interval: int, end: datetime):
+    """One reading every `interval` seconds, shaped like the ingest documents"""
+    random.seed(station_id)
+    timestamp = end - timedelta(days=days)
+    temperature, humidity, dust = 28.0, 65.0, 40.0
+    while timestamp < end:
+        temperature = min(40, max(15, temperature + random.uniform(-0.1, 0.1)))
+        humidity = min(95, max(30, humidity + random.uniform(-0.3, 0.3)))
+        dust = min(300, max(0, dust + random.uniform(-1.5, 1.5)))
+        air_value = random.randint(150, 350)
+        aqi = aqi_calculator.calculate_aqi_from_air_value(air_value)
+        yield {
+            "station_id": station_id,
+            "timestamp": timestamp,
+            "temperature": round(temperature, 2),
+            "humidity": round(humidity, 2),
+            "air_value": air_value,
+            "dust_density": round(dust, 2),
+            "aqi": aqi,
+            "aqi_category": aqi_calculator.get_aqi_category(aqi)
+        }
+        timestamp += timedelta(seconds=interval)
+
+
+async def load(collection, stations: int, days: int, interval: int, end: datetime) -> int:
+    """Insert the synthetic readings in batches"""
+    total = 0
+    for index in range(stations):
+        batch = []
+        for reading in generate_readings(f"station_{index + 1:02d}", days, interval, end):
+            batch.append(reading)
+            if len(batch) >= 5000:
+                await collection.insert_many(batch, ordered=False)
+                total += len(batch)
+                batch = []
+        if batch:
+            await collection.insert_many(batch, ordered=False)
+            total += len(batch)
+    return total
+
+
+async def time_query(run, repeat: int) -> dict:
+    """Median and p95 of a query coroutine, in ms"""
+    await run()  # warm the cache
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median": statistics.median(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    }
+
+
+async def bench(args):
+    client = AsyncIOMotorClient(settings.mongodb_url)
+    scratch = client[args.database]
+    await client.drop_database(args.database)
+
+    plain = scratch.readings_plain
+    await plain.create_index([("station_id", ASCENDING), ("timestamp", DESCENDING)])
+
+    await scratch.create_collection(
+        "readings_ts",
+        timeseries={"timeField": "timestamp", "metaField": "station_id", "granularity": "seconds"}
+    )
+    timeseries = scratch.readings_ts
+    await timeseries.create_index([("station_id", ASCENDING), ("timestamp", DESCENDING)])
+
+    end = datetime.utcnow()
+    results = {}
+    for name, collection in (("standard", plain), ("timeseries", timeseries)):
+        started = time.perf_counter()
+        count = await load(collection, args.stations, args.days, args.interval, end)
+        load_seconds = time.perf_counter() - started
+
+        stats = await scratch.command("collStats", collection.name)
+        station = "station_01"
+
+        async def latest():
+            await collection.find_one({"station_id": station}, sort=[("timestamp", DESCENDING)])
+
+        def history(hours):
+            async def run():
+                await collection.find(
+                    {"station_id": station, "timestamp": {"$gte": end - timedelta(hours=hours)}},
+                    sort=[("timestamp", DESCENDING)]
+                ).to_list(length=None)
+            return run
+
+        results[name] = {
+            "count": count,
+            "load_s": load_seconds,
+            "storage_mb": stats.get("storageSize", 0) / 1e6,
+            "index_mb": stats.get("totalIndexSize", 0) / 1e6,
+            "latest": await time_query(latest, args.repeat),
+            "history_1h": await time_query(history(1), args.repeat),
+            "history_24h": await time_query(history(24), args.repeat),
+            "history_168h": await time_query(history(168), max(3, args.repeat // 10))
+        }
+
+    if not args.keep:
+        await client.drop_database(args.database)
+    client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plain and time-series storage for sensor readings")
+    parser.add_argument("--stations", type=int, default=3)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--interval", type=int, default=5, help="Seconds between readings")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--database", default="air_quality_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"  {args.stations} stations x {args.days} days, one reading every {args.interval}s")
+    print("=" * 72)
+
+    results = asyncio.run(bench(args))
+
+    rows = [
+        ("Readings", "count", "{:.0f}"),
+        ("Load time (s)", "load_s", "{:.1f}"),
+        ("Storage size (MB)", "storage_mb", "{:.2f}"),
+        ("Index size (MB)", "index_mb", "{:.2f}"),
+    ]
+    print(f"{'':28s} {'standard':>18s} {'timeseries':>18s}")
+    for label, key, fmt in rows:
+        print(f"{label:28s} {fmt.format(results['standard'][key]):>18s} {fmt.format(results['timeseries'][key]):>18s}")
+
+    for label, key in (("latest reading", "latest"), ("history 1h", "history_1h"),
+                       ("history 24h", "history_24h"), ("history 168h", "history_168h")):
+        cells = [f"{results[name][key]['median']:.2f} / {results[name][key]['p95']:.2f}"
+                 for name in ("standard", "timeseries")]
+        print(f"{label + ' (ms p50/p95)':28s} {cells[0]:>18s} {cells[1]:>18s}")
+
+
+if __name__ == "__main__":
+    main()
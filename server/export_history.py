@@ -0,0 +1,85 @@
+"""
+Export a station's history for a time range as Parquet or Arrow IPC
+Readings are read in batched cursors and written one record batch at a time,
+so memory stays bounded for any range. The output loads straight into pandas:
+
+    pandas.read_parquet("week.parquet")
+    pandas.read_feather("week.arrow")
+
+Usage (from the server directory):
+    python export_history.py --station station_01 --from 2025-11-01 --to 2025-11-08 -o week.parquet
+    python export_history.py --from 2025-11-01 --format arrow --fields timestamp aqi -o aqi.arrow
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append('.')
+
+from app.database.mongo_client import db
+from app.routers.export_api import EXPORT_FIELDS, to_utc
+from app.utils.columnar_export import (
+    COLUMNAR_BATCH_SIZE,
+    COLUMNAR_FORMATS,
+    PYARROW_AVAILABLE,
+    columnar_schema,
+    open_writer,
+    to_record_batch
+)
+
+
+async def export(args):
+    """Write the readings to the output file"""
+    end_time = to_utc(args.end) if args.end else datetime.utcnow()
+    start_time = to_utc(args.start) if args.start else end_time - timedelta(hours=24)
+
+    await db.connect_db()
+
+    schema = columnar_schema(args.fields)
+    writer = open_writer(args.output, schema, args.format)
+    exported = 0
+    started = time.time()
+    try:
+        async for batch in db.iter_history(args.station, start_time, end_time, args.fields, COLUMNAR_BATCH_SIZE):
+            writer.write_batch(to_record_batch(batch, schema))
+            exported += len(batch)
+            print(f"   {exported} readings...", end="\r")
+    finally:
+        writer.close()
+        await db.close_db()
+
+    elapsed = time.time() - started
+    size = os.path.getsize(args.output) / 1e6
+    print(f"✅ Exported {exported} readings to {args.output} ({size:.1f} MB) in {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export station history as Parquet or Arrow IPC")
+    parser.add_argument("--station", default="station_01", help="Station ID")
+    parser.add_argument("--from", dest="start", type=datetime.fromisoformat, default=None,
+                        help="Start time, ISO 8601 (default: 24 hours before --to)")
+    parser.add_argument("--to", dest="end", type=datetime.fromisoformat, default=None,
+                        help="End time, ISO 8601, exclusive (default: now)")
+    parser.add_argument("--format", choices=list(COLUMNAR_FORMATS), default=None,
+                        help="Output format (default: from the output file extension)")
+    parser.add_argument("--fields", nargs="+", choices=EXPORT_FIELDS, default=list(EXPORT_FIELDS))
+    parser.add_argument("-o", "--output", required=True, help="Output file, e.g. week.parquet")
+    args = parser.parse_args()
+
+    if not PYARROW_AVAILABLE:
+        parser.error("pyarrow is required: pip install pyarrow")
+    if args.format is None:
+        args.format = "arrow" if args.output.endswith((".arrow", ".feather")) else "parquet"
+
+    print("=" * 60)
+    print(f"  Exporting {args.station} as {args.format}")
+    print("=" * 60)
+    asyncio.run(export(args))
+
+
+if __name__ == "__main__":
+    main()
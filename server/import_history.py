@@ -0,0 +1,419 @@
+"""
+Import sensor history from CSV, NDJSON or Parquet files
+Run this script to load readings recorded by other sites or before the server existed
+
+The file is parsed in chunks; AQI and category are computed per chunk with
+NumPy, and each chunk is written as several concurrent insert_many(ordered=False)
+batches while the next chunk is parsed. A checkpoint (source rows done) is
+saved in the 'imports' collection after every chunk, so an interrupted import
+resumes where it stopped (--restart starts over).
+
+Each reading gets an _id derived from its station and timestamp, so rows
+inserted twice (resume after a crash, importing the same file again) are
+dropped as duplicates instead of stored twice. Time-series collections have
+no unique _id index, so this does not apply with SENSOR_STORAGE=timeseries.
+
+Rows older than RETENTION_RAW_DAYS would be removed by the raw TTL right away.
+With ARCHIVE_ENABLED they, and rows for days already archived, are merged into
+the cold archive (and the rollups) instead; otherwise only their rollups are
+updated. They are only skipped, and counted as expired, with ROLLUP_ENABLED off
+as well. Rollup-only rows have no duplicate check, so a chunk interrupted while
+in flight is counted again in the rollups on resume.
+
+Columns: timestamp (ISO 8601 or epoch seconds, UTC), temperature, humidity,
+air_value, dust_density and optionally station_id; the firmware names
+(airValue, dustDensity, stationId) are accepted too. Other columns are ignored.
+
+Usage (from the server directory):
+    python import_history.py site_b_2024.csv --station station_02
+    python import_history.py readings.parquet --concurrency 8 --batch-size 5000
+    python import_history.py readings.ndjson --restart   # ignore the checkpoint
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+# Add parent directory to path
+sys.path.append('.')
+
+from app.config import settings
+from app.database.mongo_client import db, retention_days
+from app.models.aqi_model import aqi_calculator
+from app.utils.cold_archive import ARCHIVE_COLUMNS, EPOCH, cold_archive, day_start
+
+# Input formats by file extension (before an optional compression suffix)
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "ndjson",
+    ".parquet": "parquet"
+}
+
+# Firmware / alternative column names -> stored field names
+COLUMN_ALIASES = {
+    "airValue": "air_value",
+    "dustDensity": "dust_density",
+    "stationId": "station_id"
+}
+
+REQUIRED_COLUMNS = ("timestamp", "temperature", "humidity", "air_value", "dust_density")
+
+# Parsed chunks whose inserts may be in flight at once (bounds memory)
+MAX_CHUNKS_IN_FLIGHT = 2
+
+
+def detect_format(path: str) -> str:
+    """Input format from the file extension"""
+    name = path.lower()
+    for suffix in (".gz", ".bz2", ".zip", ".xz", ".zst"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    extension = os.path.splitext(name)[1]
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f"Cannot tell the format of '{path}', pass --format")
+    return IMPORT_FORMATS[extension]
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int, skip_rows: int) -> Iterator[pd.DataFrame]:
+    """DataFrames of `chunk_size` source rows, starting after `skip_rows`"""
+    if fmt == "csv":
+        # The header stays, the rows already imported are not even parsed
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=range(1, skip_rows + 1))
+        return
+
+    if fmt == "ndjson":
+        chunks = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        # Skip whole row groups without reading them
+        row_groups = []
+        for index in range(parquet.num_row_groups):
+            rows = parquet.metadata.row_group(index).num_rows
+            if not row_groups and rows <= skip_rows:
+                skip_rows -= rows
+            else:
+                row_groups.append(index)
+        if not row_groups:
+            return
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=row_groups))
+
+    # Batches are cut short at row group boundaries, so count rows rather than chunks
+    for chunk in chunks:
+        if skip_rows >= len(chunk):
+            skip_rows -= len(chunk)
+            continue
+        if skip_rows:
+            chunk = chunk.iloc[skip_rows:]
+            skip_rows = 0
+        yield chunk
+
+
+def split_before(documents: List[Dict], cutoff: Optional[datetime]) -> Tuple[List[Dict], List[Dict]]:
+    """Readings from `cutoff` on, and those before it"""
+    if cutoff is None:
+        return documents, []
+    kept, older = [], []
+    for document in documents:
+        (kept if document["timestamp"] >= cutoff else older).append(document)
+    return kept, older
+
+
+def archive_documents(documents: List[Dict]) -> List[Dict]:
+    """Merge readings into the cold archive per station-day, returns those it did not hold yet"""
+    days: Dict[Tuple[str, datetime], List[Dict]] = {}
+    for document in documents:
+        days.setdefault((document["station_id"], day_start(document["timestamp"])), []).append(document)
+
+    added = []
+    for (station_id, day), readings in days.items():
+        columns = {
+            name: [
+                (reading["timestamp"] - EPOCH).total_seconds() if name == "timestamp" else reading[name]
+                for reading in readings
+            ]
+            for name in ARCHIVE_COLUMNS
+        }
+        added.extend(readings[index] for index in cold_archive.merge_day(station_id, day, columns).tolist())
+    return added
+
+
+def reading_id(station_id: str, timestamp: datetime) -> ObjectId:
+    """Deterministic ObjectId: timestamp seconds + hash of station and timestamp"""
+    seconds = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+    digest = hashlib.blake2b(f"{station_id}|{timestamp.isoformat()}".encode(), digest_size=8).digest()
+    return ObjectId(seconds.to_bytes(4, "big") + digest)
+
+
+def to_documents(frame: pd.DataFrame, default_station: str) -> Tuple[List[Dict], int]:
+    """Reading documents for a chunk, and the number of incomplete rows skipped"""
+    frame = frame.rename(columns=COLUMN_ALIASES)
+    missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    timestamps = frame["timestamp"]
+    if pd.api.types.is_numeric_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, unit="s", utc=True, errors="coerce")
+    else:
+        timestamps = pd.to_datetime(timestamps, utc=True, errors="coerce", format="ISO8601")
+
+    columns = pd.DataFrame({
+        # Stored as naive UTC, like the readings from MQTT
+        "timestamp": timestamps.dt.tz_convert(None),
+        **{name: pd.to_numeric(frame[name], errors="coerce") for name in REQUIRED_COLUMNS[1:]}
+    })
+    if "station_id" in frame.columns:
+        columns["station_id"] = frame["station_id"].fillna(default_station).astype(str)
+    else:
+        columns["station_id"] = default_station
+
+    complete = columns.notna().all(axis=1).to_numpy()
+    columns = columns[complete]
+
+    air_values = columns["air_value"].to_numpy().round().astype(np.int64)
+    aqis = aqi_calculator.calculate_aqi_from_air_values(air_values)
+    categories = aqi_calculator.get_aqi_categories(aqis)
+
+    station_ids = columns["station_id"].tolist()
+    datetimes = columns["timestamp"].dt.to_pydatetime().tolist()
+    documents = [
+        {
+            "_id": reading_id(station_id, timestamp),
+            "station_id": station_id,
+            "timestamp": timestamp,
+            "temperature": temperature,
+            "humidity": humidity,
+            "air_value": air_value,
+            "dust_density": dust_density,
+            "aqi": aqi,
+            "aqi_category": category
+        }
+        for station_id, timestamp, temperature, humidity, air_value, dust_density, aqi, category in zip(
+            station_ids,
+            datetimes,
+            columns["temperature"].round(2).tolist(),
+            columns["humidity"].round(2).tolist(),
+            air_values.tolist(),
+            columns["dust_density"].round(2).tolist(),
+            aqis.tolist(),
+            categories.tolist()
+        )
+    ]
+    return documents, int((~complete).sum())
+
+
+class Importer:
+    """Concurrent batch writer with per-chunk checkpoints"""
+
+    def __init__(self, import_id: str, batch_size: int, concurrency: int):
+        self.import_id = import_id
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # One archive merge at a time, chunks may share a station-day
+        self.archive_lock = asyncio.Lock()
+        self.stats = {"inserted": 0, "archived": 0, "rolled_up": 0, "duplicates": 0, "expired": 0, "skipped": 0}
+
+    async def insert_batch(self, batch: List[Dict]) -> Tuple[int, int, int]:
+        """Insert one batch, returns inserted, duplicate and archived counts"""
+        async with self.semaphore:
+            inserted, duplicates = await db.insert_sensor_readings(batch, ignore_duplicates=True)
+            if settings.rollup_enabled:
+                # Rollups keep the aggregates after raw retention removes old readings
+                duplicates = set(duplicates)
+                await db.update_rollups([document for index, document in enumerate(batch) if index not in duplicates])
+            return inserted, len(duplicates), 0
+
+    async def archive_batch(self, batch: List[Dict]) -> Tuple[int, int, int]:
+        """Merge readings into the cold archive, same counts as insert_batch"""
+        async with self.archive_lock:
+            added = await asyncio.to_thread(archive_documents, batch)
+        if settings.rollup_enabled:
+            await db.update_rollups(added)
+        return 0, len(batch) - len(added), len(added)
+
+    async def rollup_batch(self, batch: List[Dict]) -> Tuple[int, int, int]:
+        """Add readings past the raw retention to the rollups only, same counts as insert_batch"""
+        async with self.semaphore:
+            await db.update_rollups(batch)
+        return 0, 0, 0
+
+    def insert_chunk(self, documents: List[Dict], archived: List[Dict], rolled_up: List[Dict] = ()) -> asyncio.Future:
+        """
+        Start inserting a chunk as concurrent batches, archiving the readings for the
+        archive and adding those past the raw retention to the rollups
+        """
+        tasks = [
+            self.insert_batch(documents[offset:offset + self.batch_size])
+            for offset in range(0, len(documents), self.batch_size)
+        ]
+        tasks.extend(
+            self.rollup_batch(rolled_up[offset:offset + self.batch_size])
+            for offset in range(0, len(rolled_up), self.batch_size)
+        )
+        if archived:
+            tasks.append(self.archive_batch(archived))
+        return asyncio.gather(*tasks)
+
+    async def checkpoint(self, rows: int, completed: bool = False):
+        """Save the source rows done so far"""
+        await db.db.imports.update_one(
+            {"_id": self.import_id},
+            {"$set": {**self.stats, "rows": rows, "completed": completed, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+
+async def import_file(args):
+    """Import the file, resuming from its checkpoint"""
+    await db.connect_db()
+
+    import_id = args.id or os.path.abspath(args.path)
+    if args.restart:
+        await db.db.imports.delete_one({"_id": import_id})
+
+    checkpoint = await db.db.imports.find_one({"_id": import_id}) or {}
+    if checkpoint.get("completed"):
+        print(f"✅ '{args.path}' was already imported ({checkpoint['inserted']} readings), use --restart to import again")
+        await db.close_db()
+        return
+
+    # Resume with the chunk size the checkpoint was taken with
+    chunk_size = checkpoint.get("chunk_size", args.chunk_size)
+    await db.db.imports.update_one({"_id": import_id}, {"$set": {"chunk_size": chunk_size}}, upsert=True)
+
+    importer = Importer(import_id, args.batch_size, args.concurrency)
+    for name in importer.stats:
+        importer.stats[name] = checkpoint.get(name, 0)
+    rows = checkpoint.get("rows", 0)
+    if rows:
+        print(f"↩️  Resuming after {rows} rows ({importer.stats['inserted']} readings already imported)")
+
+    # The raw TTL would remove older readings right away, and reads of archived days skip MongoDB
+    raw_days = retention_days("raw")
+    cutoff = datetime.utcnow() - timedelta(days=raw_days) if raw_days else None
+    if cold_archive is not None:
+        cutoff = max(filter(None, (cutoff, cold_archive.archived_until)), default=None)
+        if cutoff:
+            print(f"🗄️  Rows before {cutoff:%Y-%m-%d %H:%M} go to the cold archive")
+    elif cutoff and settings.rollup_enabled:
+        print(
+            f"⚠️  Rows before {cutoff:%Y-%m-%d %H:%M} are past RETENTION_RAW_DAYS={raw_days}, "
+            "only their rollups are updated (ARCHIVE_ENABLED is off)"
+        )
+    elif cutoff:
+        print(
+            f"⚠️  Rows before {cutoff:%Y-%m-%d %H:%M} are past RETENTION_RAW_DAYS={raw_days} "
+            "and will be skipped (ARCHIVE_ENABLED and ROLLUP_ENABLED are off)"
+        )
+
+    chunks = read_chunks(args.path, args.format, chunk_size, rows)
+    in_flight: deque = deque()
+    started = time.time()
+
+    async def finish_oldest():
+        nonlocal rows
+        chunk_rows, skipped, expired, rolled_up, pending = in_flight.popleft()
+        for inserted, duplicates, archived in await pending:
+            importer.stats["inserted"] += inserted
+            importer.stats["duplicates"] += duplicates
+            importer.stats["archived"] += archived
+        importer.stats["skipped"] += skipped
+        importer.stats["expired"] += expired
+        importer.stats["rolled_up"] += rolled_up
+        rows += chunk_rows
+        await importer.checkpoint(rows)
+
+        rate = (importer.stats["inserted"] + importer.stats["archived"]) / max(time.time() - started, 1e-9)
+        print(
+            f"   {rows} rows: {importer.stats['inserted']} inserted, {importer.stats['archived']} archived, "
+            f"{importer.stats['rolled_up']} rollups only, "
+            f"{importer.stats['duplicates']} duplicates, {importer.stats['skipped'] + importer.stats['expired']} "
+            f"skipped ({rate:.0f}/s)",
+            end="\r"
+        )
+
+    try:
+        while True:
+            # Parse the next chunk in a thread while earlier chunks are being inserted
+            frame: Optional[pd.DataFrame] = await asyncio.to_thread(next, chunks, None)
+            if frame is None:
+                break
+            documents, skipped = await asyncio.to_thread(to_documents, frame, args.station)
+            documents, older = split_before(documents, cutoff)
+            archived, rolled_up = [], []
+            if cold_archive is not None:
+                archived = older
+            elif settings.rollup_enabled:
+                # Skip only the raw insert, the rollups outlive the raw retention
+                rolled_up = older
+            expired = len(older) - len(archived) - len(rolled_up)
+            in_flight.append((
+                len(frame), skipped, expired, len(rolled_up), importer.insert_chunk(documents, archived, rolled_up)
+            ))
+            if len(in_flight) >= MAX_CHUNKS_IN_FLIGHT:
+                await finish_oldest()
+
+        while in_flight:
+            await finish_oldest()
+        await importer.checkpoint(rows, completed=True)
+    finally:
+        await db.close_db()
+
+    elapsed = time.time() - started
+    print()
+    print(f"✅ Import complete: {importer.stats['inserted']} readings in {elapsed:.1f}s")
+    if importer.stats["archived"]:
+        print(f"   {importer.stats['archived']} readings were merged into the cold archive")
+    if importer.stats["skipped"]:
+        print(f"   {importer.stats['skipped']} incomplete rows were skipped")
+    if importer.stats["rolled_up"]:
+        print(
+            f"   {importer.stats['rolled_up']} rows past RETENTION_RAW_DAYS were added to the rollups only, "
+            "enable ARCHIVE_ENABLED to keep the raw readings"
+        )
+    if importer.stats["expired"]:
+        print(f"   {importer.stats['expired']} rows past RETENTION_RAW_DAYS were skipped, enable ARCHIVE_ENABLED to keep them")
+    if raw_days and settings.rollup_enabled:
+        print(f"   Raw readings older than {raw_days} days expire; the 1m/1h rollups keep their aggregates.")
+    elif raw_days:
+        print(f"   Raw readings older than {raw_days} days expire (ROLLUP_ENABLED is off, nothing keeps their aggregates).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import sensor history from CSV, NDJSON or Parquet")
+    parser.add_argument("path", help="Input file (.csv, .ndjson/.jsonl or .parquet, optionally compressed)")
+    parser.add_argument("--format", choices=sorted(set(IMPORT_FORMATS.values())), default=None,
+                        help="Input format (default: from the file extension)")
+    parser.add_argument("--station", default=settings.station_id, help="Station for rows without station_id")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Source rows parsed at a time")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Readings per insert_many")
+    parser.add_argument("--concurrency", type=int, default=4, help="insert_many calls in flight")
+    parser.add_argument("--id", default=None, help="Checkpoint ID (default: the absolute file path)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    try:
+        args.format = args.format or detect_format(args.path)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 60)
+    print(f"  Importing {args.path} ({args.format})")
+    print("=" * 60)
+    asyncio.run(import_file(args))
+
+
+if __name__ == "__main__":
+    main()
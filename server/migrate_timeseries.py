@@ -0,0 +1,101 @@
+"""
+Copy sensor readings into the time-series collection
+Run this script once before setting SENSOR_STORAGE=timeseries
+
+Copies 'sensor_readings' in _id order and batches, saving a checkpoint after
+every batch so an interrupted run continues where it stopped. Time-series
+collections have no unique _id index, so a crash between an insert and its
+checkpoint can copy that one batch twice.
+
+Usage (from the server directory):
+    python migrate_timeseries.py --batch-size 5000
+    python migrate_timeseries.py --restart   # ignore the checkpoint
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.append('.')
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+
+from app.config import settings
+from app.database.mongo_client import db
+
+MIGRATION_ID = "sensor_readings_timeseries"
+
+
+async def migrate(batch_size: int, restart: bool):
+    """Copy all readings into the time-series collection"""
+    db.client = AsyncIOMotorClient(settings.mongodb_url)
+    db.db = db.client[settings.mongodb_db_name]
+
+    target_name = settings.sensor_timeseries_collection
+    await db.ensure_timeseries_collection(target_name)
+
+    source = db.db.sensor_readings
+    target = db.db[target_name]
+    await target.create_index([("station_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)])
+    checkpoints = db.db.migrations
+
+    if restart:
+        await checkpoints.delete_one({"_id": MIGRATION_ID})
+
+    checkpoint = await checkpoints.find_one({"_id": MIGRATION_ID})
+    last_id = checkpoint["last_id"] if checkpoint else None
+    copied = checkpoint["copied"] if checkpoint else 0
+
+    total = await source.estimated_document_count()
+    if last_id is not None:
+        print(f"↩️  Resuming after {last_id} ({copied} readings already copied)")
+
+    started = time.time()
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = await source.find(query).sort("_id", ASCENDING).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+
+        last_id = batch[-1]["_id"]
+
+        # Time-series collections reject documents without a timeField
+        readings = [reading for reading in batch if isinstance(reading.get("timestamp"), datetime)]
+        if readings:
+            await target.insert_many(readings, ordered=False)
+        copied += len(readings)
+
+        await checkpoints.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"last_id": last_id, "copied": copied, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+        rate = copied / max(time.time() - started, 1e-9)
+        print(f"   {copied}/{total} readings copied ({rate:.0f}/s)", end="\r")
+
+    print()
+    print(f"✅ Migration complete: {copied} readings in '{target_name}'")
+    print("   Set SENSOR_STORAGE=timeseries and restart the server to use it.")
+    print("   'sensor_readings' was left untouched; drop it once the new collection is verified.")
+
+    db.client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy sensor_readings into the time-series collection")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"  Migrating sensor_readings -> {settings.sensor_timeseries_collection}")
+    print("=" * 60)
+    asyncio.run(migrate(args.batch_size, args.restart))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Readings stored while a query cache loader is still running
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from app.utils.query_cache import QueryResultCache
+
+
+def reading(timestamp, value=1.0):
+    return {"station_id": "station-1", "timestamp": timestamp, "temperature": value}
+
+
+async def load_while(cache, endpoint, params, result, during):
+    """Load a result through the cache, calling `during` while the loader is suspended"""
+    release = asyncio.Event()
+    loader_calls = []
+
+    async def loader():
+        loader_calls.append(1)
+        await release.wait()
+        return result
+
+    task = asyncio.ensure_future(cache.get("station-1", endpoint, params, loader))
+    while not loader_calls:
+        await asyncio.sleep(0)
+    during()
+    release.set()
+    return await task
+
+
+def test_history_reading_added_during_load_is_kept():
+    async def run():
+        cache = QueryResultCache(bucket_seconds=3600)
+        now = datetime.utcnow()
+        stored = [reading(now - timedelta(minutes=1)), reading(now - timedelta(minutes=2))]
+        new = reading(now)
+
+        # The query ran before the new reading was stored
+        await load_while(cache, "history", 1, stored, lambda: cache.add_reading(new))
+
+        async def unexpected():
+            raise AssertionError("cached result should be used")
+
+        result = await cache.get("station-1", "history", 1, unexpected)
+        assert [r["timestamp"] for r in result] == [new["timestamp"]] + [r["timestamp"] for r in stored]
+
+    asyncio.run(run())
+
+
+def test_history_reading_already_seen_by_query_is_not_duplicated():
+    async def run():
+        cache = QueryResultCache(bucket_seconds=3600)
+        now = datetime.utcnow()
+        new = reading(now)
+        stored = [new, reading(now - timedelta(minutes=1))]
+
+        # The query ran after the new reading was stored
+        await load_while(cache, "history", 1, stored, lambda: cache.add_reading(new))
+
+        async def unexpected():
+            raise AssertionError("cached result should be used")
+
+        result = await cache.get("station-1", "history", 1, unexpected)
+        assert len(result) == 2
+
+    asyncio.run(run())
+
+
+def test_stats_load_is_not_cached_after_a_reading_arrives():
+    async def run():
+        cache = QueryResultCache(bucket_seconds=3600)
+
+        await load_while(cache, "stats", 1, {"count": 10}, lambda: cache.add_reading(reading(datetime.utcnow())))
+
+        async def reload():
+            return {"count": 11}
+
+        assert await cache.get("station-1", "stats", 1, reload) == {"count": 11}
+        assert cache.stats["invalidated"] == 1
+
+    asyncio.run(run())
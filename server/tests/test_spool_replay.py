@@ -0,0 +1,106 @@
+"""
+Spool replay into a time-series collection, which has no unique _id or
+dedup_key index to reject readings that were already stored
+"""
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.config import settings
+from app.database.mongo_client import db
+from app.ingest import SpoolReplayer
+
+
+class FakeTimeseriesCollection:
+    """Accepts every insert, like a time-series collection"""
+
+    def __init__(self, documents=()):
+        self.documents = [dict(document) for document in documents]
+
+    async def insert_many(self, documents, ordered=True):
+        self.documents.extend(dict(document) for document in documents)
+        return SimpleNamespace(inserted_ids=[document["_id"] for document in documents])
+
+    def find(self, query, projection=None):
+        # Returns every document, find_stored_readings still has to match them itself
+        async def cursor():
+            for document in self.documents:
+                yield document
+        return cursor()
+
+
+class FakeSpool:
+    def __init__(self, documents):
+        self.documents = documents
+        self.removed = []
+
+    async def seal(self):
+        return ["segment"]
+
+    def read_segment(self, path):
+        return iter([dict(document) for document in self.documents])
+
+    def remove_segment(self, path, replayed):
+        self.removed.append((path, replayed))
+
+
+def reading(timestamp, **extra):
+    return {
+        "_id": ObjectId(),
+        "station_id": "station-1",
+        "temperature": 21.5,
+        "timestamp": timestamp,
+        **extra
+    }
+
+
+def run_replay(monkeypatch, stored, spooled):
+    collection = FakeTimeseriesCollection(stored)
+    rollups = []
+
+    async def ping():
+        return True
+
+    async def update_rollups(documents):
+        rollups.extend(documents)
+
+    monkeypatch.setattr(settings, "sensor_storage", "timeseries")
+    monkeypatch.setattr(settings, "rollup_enabled", True)
+    monkeypatch.setattr(type(db), "readings", classmethod(lambda cls: collection))
+    monkeypatch.setattr(db, "ping", ping)
+    monkeypatch.setattr(db, "update_rollups", update_rollups)
+
+    replayer = SpoolReplayer(FakeSpool(spooled), batch_size=2)
+    asyncio.run(replayer.replay())
+    return replayer, collection, rollups
+
+
+def test_timeseries_replay_skips_stored_readings(monkeypatch):
+    now = datetime.utcnow()
+    same_id = reading(now - timedelta(seconds=30))
+    same_key = reading(now - timedelta(seconds=20), dedup_key="boot-1:7")
+    new = reading(now - timedelta(seconds=10), dedup_key="boot-1:8")
+    stored = [same_id, {**same_key, "_id": ObjectId()}]
+
+    replayer, collection, rollups = run_replay(monkeypatch, stored, [same_id, same_key, new])
+
+    assert len(collection.documents) == 3
+    assert [document["_id"] for document in collection.documents].count(same_id["_id"]) == 1
+    assert [document.get("dedup_key") for document in collection.documents].count("boot-1:7") == 1
+    assert replayer.duplicates == 2
+    assert [document["_id"] for document in rollups] == [new["_id"]]
+    assert replayer.spool.removed == [("segment", 3)]
+
+
+def test_timeseries_replay_is_idempotent(monkeypatch):
+    now = datetime.utcnow()
+    spooled = [reading(now - timedelta(seconds=offset)) for offset in (3, 2, 1)]
+
+    _, collection, _ = run_replay(monkeypatch, [], spooled)
+    replayer, collection, rollups = run_replay(monkeypatch, collection.documents, spooled)
+
+    assert len(collection.documents) == 3
+    assert replayer.duplicates == 3
+    assert rollups == []